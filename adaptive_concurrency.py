@@ -0,0 +1,163 @@
+import asyncio
+import os
+import threading
+import time
+import requests
+from dotenv import load_dotenv
+
+from proxy_utils import is_facebook_request
+
+load_dotenv()
+
+# Starting / lowest / highest number of requests in flight per proxy endpoint
+# and per logged-in account (override in .env)
+MAX_IN_FLIGHT_PER_PROXY = int(os.getenv('MAX_IN_FLIGHT_PER_PROXY', '8'))
+MAX_IN_FLIGHT_PER_ACCOUNT = int(os.getenv('MAX_IN_FLIGHT_PER_ACCOUNT', '8'))
+ADAPTIVE_MIN_IN_FLIGHT = int(os.getenv('ADAPTIVE_MIN_IN_FLIGHT', '1'))
+ADAPTIVE_MAX_IN_FLIGHT = int(os.getenv('ADAPTIVE_MAX_IN_FLIGHT', '32'))
+# Limit is multiplied by this on a 403/429/503 or timeout
+ADAPTIVE_BACKOFF = float(os.getenv('ADAPTIVE_BACKOFF', '0.5'))
+# Signals closer together than this count as one event (seconds)
+ADAPTIVE_COOLDOWN = float(os.getenv('ADAPTIVE_COOLDOWN', '2'))
+
+SUCCESS = "success"
+CONGESTED = "congested"
+
+# Facebook's rate-limit / soft-block statuses (see proxy_utils.is_ip_blocked)
+CONGESTION_STATUSES = (403, 429, 503)
+
+
+def classify(status_code=None, exc=None, url=None):
+    """
+    Map a response status or exception to SUCCESS, CONGESTED or None (no
+    signal). With url, only requests Facebook answers give a signal; CDN
+    image downloads say nothing about what Facebook tolerates.
+    """
+    if url is not None and not is_facebook_request(url):
+        return None
+    if exc is not None:
+        return CONGESTED if isinstance(exc, requests.exceptions.Timeout) else None
+    if status_code in CONGESTION_STATUSES:
+        return CONGESTED
+    if status_code is not None and status_code < 400:
+        return SUCCESS
+    return None
+
+
+class AIMDController:
+    """
+    In-flight request cap that adapts to what the server tolerates.
+
+    Every successful request made while the cap is in demand adds
+    1/limit to it (about +1 per round of requests); a block or rate-limit
+    signal multiplies it by ADAPTIVE_BACKOFF, at most once per cooldown
+    so a burst of 429s from one round is only counted once.
+    """
+
+    def __init__(self, initial, min_limit=None, max_limit=None, backoff=None, cooldown=None):
+        self.min_limit = max(1, min_limit or ADAPTIVE_MIN_IN_FLIGHT)
+        self.max_limit = max(self.min_limit, max_limit or ADAPTIVE_MAX_IN_FLIGHT)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff or ADAPTIVE_BACKOFF
+        self.cooldown = ADAPTIVE_COOLDOWN if cooldown is None else cooldown
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+        # (loop, future) of coroutines in acquire_async, woken by release
+        self._async_waiters = []
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def try_acquire(self):
+        with self._cond:
+            if self._in_flight >= int(self.limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self):
+        with self._cond:
+            self._waiting += 1
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._waiting -= 1
+            self._in_flight += 1
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+                self._waiting += 1
+            try:
+                await waiter[1]
+            finally:
+                with self._cond:
+                    self._waiting -= 1
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self, signal=None):
+        """Give the slot back and feed the request's outcome into the limit"""
+        with self._cond:
+            # Only grow while there is demand for more slots
+            saturated = self._waiting > 0 or self._in_flight >= int(self.limit)
+            self._in_flight -= 1
+            if signal == SUCCESS and saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif signal == CONGESTED:
+                now = time.monotonic()
+                if now - self._last_cut >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_cut = now
+            self._cond.notify_all()
+            # release may run on another thread than the waiting event loops
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:  # loop already closed
+                pass
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def _controller(scope, key, initial):
+    with _controllers_lock:
+        controller = _controllers.get((scope, key))
+        if controller is None:
+            controller = AIMDController(initial)
+            _controllers[(scope, key)] = controller
+    return controller
+
+
+def controllers_for(proxy=None, account=None):
+    """
+    Controllers a request has to pass: its proxy endpoint and, when
+    logged in, its cookie session. Always returned in the same order
+    so requests never wait on each other in a cycle.
+    """
+    controllers = [_controller('proxy', proxy or 'direct', MAX_IN_FLIGHT_PER_PROXY)]
+    if account:
+        controllers.append(_controller('account', account, MAX_IN_FLIGHT_PER_ACCOUNT))
+    return controllers
+
+
+def current_limits():
+    """{(scope, key): current limit} for logging / the UI"""
+    with _controllers_lock:
+        return {key: round(c.limit, 2) for key, c in _controllers.items()}
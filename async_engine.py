@@ -0,0 +1,343 @@
+import asyncio
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+import adaptive_concurrency
+import http_session
+import proxy_pool
+import proxy_utils
+import comment_scraper
+import post_scraper
+import group_post_scraper_v2
+import single_post_image
+from comment_scraper import convert_post_id_to_feedback_id
+from proxy_utils import rotate_static_proxy
+from retry_policy import RetryBudget, retry_steps, run_retry_async, classify_exception, PROXY_ERROR
+from rate_limiter import limiter, request_keys
+from scrape_context import ScrapeContext
+
+# aiohttp is optional: without it the engine runs the pooled requests
+# sessions from http_session in worker threads instead
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+load_dotenv()
+
+GRAPHQL_URL = "https://www.facebook.com/api/graphql/"
+
+# Max requests in flight per engine (override in .env)
+ASYNC_CONCURRENCY = int(os.getenv('ASYNC_CONCURRENCY', '100'))
+
+
+def classify_error(exc):
+    """retry_policy.classify_exception that also knows aiohttp's proxy errors"""
+    if aiohttp and isinstance(exc, aiohttp.ClientProxyConnectionError):
+        return PROXY_ERROR
+    return classify_exception(exc)
+
+
+class AsyncResponse:
+    """Minimal response object shared by the aiohttp and thread transports"""
+
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+
+class AsyncEngine:
+    """
+    Asyncio scraping engine for one account/proxy.
+
+    Usage:
+        async with AsyncEngine(cookies=cookies, fb_dtsg=dtsg, proxies=proxies) as engine:
+            comments, post_info = await fetch_comments_for_post(engine, post_id)
+    """
+
+    def __init__(self, cookies=None, fb_dtsg="", proxies=None, concurrency=None, retry_budget=None):
+        self.cookies = cookies or {}
+        self.fb_dtsg = fb_dtsg or ""
+        self.proxies = proxies
+        self.concurrency = concurrency or ASYNC_CONCURRENCY
+        self.retry_budget = retry_budget or RetryBudget()
+        self._semaphore = None
+        self._session = None
+
+    @classmethod
+    def from_context(cls, ctx, concurrency=None):
+        """Engine using a ScrapeContext's cookies, fb_dtsg and proxy"""
+        return cls(cookies=ctx.cookies, fb_dtsg=ctx.fb_dtsg, proxies=ctx.proxies, concurrency=concurrency,
+                   retry_budget=ctx.retry_budget)
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if aiohttp:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookies=self.cookies,
+                timeout=aiohttp.ClientTimeout(total=http_session.DEFAULT_TIMEOUT),
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def user_id(self):
+        return self.cookies.get("c_user", "0")
+
+    def payload(self, doc_id, variables):
+        """Standard GraphQL form body for this engine's account"""
+        return {
+            "av": self.user_id,
+            "__user": self.user_id,
+            "__a": "1",
+            "fb_dtsg": self.fb_dtsg,
+            "doc_id": doc_id,
+            "variables": json.dumps(variables),
+        }
+
+    async def _send(self, method, url, **kwargs):
+        if self._session:
+            # The thread transport does this inside http_session
+            proxy, account, doc_id = request_keys(self.proxies, self.cookies, kwargs.get('data'))
+            await limiter.acquire_async(proxy, account, doc_id)
+            controllers = adaptive_concurrency.controllers_for(proxy, account)
+            for controller in controllers:
+                await controller.acquire_async()
+            signal = None
+            started = time.monotonic()
+            try:
+                async with self._session.request(method, url, proxy=proxy, **kwargs) as resp:
+                    body = await resp.read()
+                signal = adaptive_concurrency.classify(status_code=resp.status, url=url)
+                proxy_pool.pool.record(proxy, proxy_pool.outcome_for(status_code=resp.status, url=url),
+                                       time.monotonic() - started)
+                return AsyncResponse(resp.status, body, resp.headers)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError) and proxy_utils.is_facebook_request(url):
+                    signal = adaptive_concurrency.CONGESTED
+                if isinstance(e, aiohttp.ClientProxyConnectionError):
+                    outcome = proxy_pool.PROXY_ERROR
+                else:
+                    outcome = proxy_pool.outcome_for(exc=e, url=url)
+                proxy_pool.pool.record(proxy, outcome)
+                raise
+            finally:
+                for controller in reversed(controllers):
+                    controller.release(signal)
+
+        send = http_session.post if method == "POST" else http_session.get
+        r = await asyncio.to_thread(send, url, proxies=self.proxies, cookies=self.cookies, **kwargs)
+        return AsyncResponse(r.status_code, r.content, r.headers)
+
+    def _rotate_proxy(self):
+        self.proxies = rotate_static_proxy(self.proxies) or self.proxies
+
+    async def request(self, method, url, parse=None, **kwargs):
+        """
+        Send a request with the shared retry policy (retry_policy.retry_steps,
+        as in retry_request). With parse, returns parse(r.content); empty or
+        unparsable results are retried and, if still empty after that, the
+        empty result (None if unparsable) is returned.
+        """
+        async def send():
+            async with self._semaphore:
+                return await self._send(method, url, **kwargs)
+
+        steps = retry_steps(url, parse, self.retry_budget, self._rotate_proxy, classify_error)
+        return await run_retry_async(steps, send)
+
+    async def graphql(self, friendly_name, payload, headers=None, parse=None):
+        headers = {**(headers or comment_scraper.BASE_HEADERS), "x-fb-friendly-name": friendly_name}
+        return await self.request("POST", GRAPHQL_URL, parse=parse, headers=headers, data=payload)
+
+
+# ===== COMMENTS & REPLIES =====
+
+async def fetch_comments(engine, feedback_id, on_page=None):
+    """Async fetch_comments: returns (comments, post_info)"""
+    results = []
+    cursor = None
+    post_info = None
+    first_page = True
+
+    while True:
+        payload = comment_scraper.comments_payload(feedback_id, cursor, engine.cookies, engine.fb_dtsg)
+        # Bodies that are not JSON (checkpoint pages, cut-off responses) are retried
+        j = await engine.graphql("CommentsListComponentsPaginationQuery", payload,
+                                 parse=comment_scraper.parse_json_body)
+
+        page = comment_scraper.read_comments_page(j, post_info, first_page)
+        if page is None:
+            break
+        first_page = False
+        page_comments, post_info, cursor = page
+
+        results.extend(page_comments)
+        if on_page:
+            on_page(page_comments)
+
+        if not cursor:
+            break
+
+    return results, post_info
+
+
+async def fetch_replies(engine, comment):
+    if not comment_scraper.has_replies(comment):
+        return []
+    payload = comment_scraper.replies_payload(comment["_feedback_id"], comment["_expansion_token"], engine.cookies, engine.fb_dtsg)
+    j = await engine.graphql("Depth1CommentsListPaginationQuery", payload, parse=comment_scraper.parse_json_body)
+    return comment_scraper.parse_replies(j or {})
+
+
+async def fetch_comments_for_post(engine, post_id):
+    """Async equivalent of main.fetch_comments_for_post (replies fetched while paging)"""
+    feedback_id = convert_post_id_to_feedback_id(post_id)
+    reply_tasks = []
+
+    def schedule_replies(page_comments):
+        for c in page_comments:
+            reply_tasks.append(asyncio.ensure_future(fetch_replies(engine, c)))
+
+    comments, post_info = await fetch_comments(engine, feedback_id, on_page=schedule_replies)
+    all_replies = await asyncio.gather(*reply_tasks)
+
+    all_data = []
+    for c, replies in zip(comments, all_replies):
+        c["replies"] = replies
+        all_data.append({k: v for k, v in c.items() if not k.startswith('_')})
+
+    print(f"  ✓ Found {len(all_data)} comments")
+    return all_data, post_info
+
+
+# ===== IMAGES =====
+
+async def download_image(engine, url, post_id, image_index=1, save_dir="page_post"):
+    """Async download_image: saves as {post_id}.jpg or {post_id}_2.jpg etc"""
+    if not url or not post_id:
+        return None
+
+    try:
+        post_dir = os.path.join(save_dir, str(post_id))
+        os.makedirs(post_dir, exist_ok=True)
+
+        ext = ".jpg"
+        if ".png" in url.lower():
+            ext = ".png"
+        elif ".jpeg" in url.lower():
+            ext = ".jpeg"
+
+        filename = f"{post_id}{ext}" if image_index == 1 else f"{post_id}_{image_index}{ext}"
+        r = await engine.request("GET", url)
+
+        with open(os.path.join(post_dir, filename), 'wb') as f:
+            f.write(r.content)
+
+        print(f"  📥 Downloaded image: {filename}")
+        return filename
+
+    except Exception as e:
+        print(f"  ❌ Failed to download image: {str(e)}")
+        return None
+
+
+async def fetch_remaining_images(engine, last_media_id, post_id, current_image_count, save_dir="page_post"):
+    """Async fetch_remaining_images: walks the album via nextMediaAfterNodeId"""
+    if not last_media_id or not post_id:
+        return []
+
+    remaining_photos = []
+    current_node = last_media_id
+    visited = set()
+    image_index = current_image_count + 1
+
+    while current_node and current_node not in visited and image_index <= 50:  # Max 50 images safety limit
+        visited.add(current_node)
+
+        payload = single_post_image.build_payload(current_node, post_id, engine.cookies, engine.fb_dtsg)
+
+        try:
+            r = await engine.graphql("CometPhotoRootContentQuery", payload, headers=single_post_image.HEADERS)
+        except Exception as e:
+            print(f"  ⚠️ Error fetching next image: {e}")
+            break
+
+        cleaned_blocks = post_scraper.parse_fb_response(r.content)
+        if not cleaned_blocks:
+            break
+
+        image_url = None
+        next_node = None
+        for block in cleaned_blocks:
+            if image_url is None and "currMedia" in block:
+                image_url = block["currMedia"].get("image", {}).get("uri")
+            if next_node is None and block.get("nextMediaAfterNodeId"):
+                next_node = block["nextMediaAfterNodeId"].get("id")
+
+        if image_url:
+            saved_filename = await download_image(engine, image_url, post_id, image_index, save_dir)
+            if saved_filename:
+                remaining_photos.append({
+                    'type': 'photo',
+                    'url': image_url,
+                    'saved_as': saved_filename
+                })
+                image_index += 1
+
+        if not next_node:
+            break
+        current_node = next_node
+
+    return remaining_photos
+
+
+# ===== POSTS =====
+
+async def fetch_posts(engine, target_id, kind="page", limit=10, min_comments=0, name=None, **kwargs):
+    """
+    Async fetch_posts for a page (kind="page") or group (kind="group").
+    Runs post_scraper.fetch_posts / group_post_scraper_v2.fetch_posts in a
+    worker thread with the engine's account, proxy and retry budget, so
+    dedup against the scraped index, the incremental watermark, feed
+    checkpoints and media downloads behave as in the sync crawl. Feed pages
+    are sequential anyway (each needs the previous cursor); extra keyword
+    arguments (batch_size, on_batch_complete, checkpoint, ...) are passed
+    through. Returns the post records.
+    """
+    module = group_post_scraper_v2 if kind == "group" else post_scraper
+    ctx = ScrapeContext(target_id=target_id, cookies=engine.cookies, fb_dtsg=engine.fb_dtsg,
+                        proxies=engine.proxies, name=name, retry_budget=engine.retry_budget)
+    try:
+        return await asyncio.to_thread(module.fetch_posts, limit=limit, min_comments=min_comments,
+                                       ctx=ctx, **kwargs)
+    finally:
+        # Keep the proxy the feed rotated to
+        engine.proxies = ctx.proxies
+
+
+# ===== SYNC ENTRY POINT =====
+
+def run(func, *args, cookies=None, fb_dtsg="", proxies=None, concurrency=None, **kwargs):
+    """
+    Run one engine coroutine from synchronous code, e.g.
+        run(fetch_comments_for_post, post_id, cookies=cookies)
+    """
+    async def _main():
+        async with AsyncEngine(cookies=cookies, fb_dtsg=fb_dtsg, proxies=proxies, concurrency=concurrency) as engine:
+            return await func(engine, *args, **kwargs)
+
+    return asyncio.run(_main())
@@ -0,0 +1,179 @@
+"""
+Benchmark: a full crawl (fetch_posts + fetch_comments_for_post + image
+downloads) against the local mock server.
+
+Starts benchmarks/mock_server.py in a subprocess, points the scrapers at
+it and runs main.crawl_target for one page or group in a temp directory.
+Reports posts/min, requests/sec, p50/p99 request latency and peak RSS of
+the crawler process.
+
+    python benchmarks/bench_end_to_end.py --posts 30 --latency 0.05
+    python benchmarks/bench_end_to_end.py --kind group --unlimited --reply-workers 16
+
+Proxy settings from the environment / .env are ignored so nothing leaves
+the machine. Rate limits are honoured unless --unlimited is given.
+"""
+import argparse
+import contextlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from mock_server import add_config_arguments, config_from_args  # noqa: E402
+
+
+def start_server(config):
+    args = [sys.executable, os.path.join(BENCH_DIR, "mock_server.py"), "--port", "0"]
+    for field, value in config.items():
+        args += [f"--{field.replace('_', '-')}", str(value)]
+    server = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    url = server.stdout.readline().strip()
+    if not url:
+        server.kill()
+        raise RuntimeError(f"mock server did not start: {server.stderr.read()}")
+    return server, url
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        _, err = server.communicate(timeout=5)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        _, err = server.communicate()
+    return err.strip().splitlines()[-1] if err.strip() else "{}"
+
+
+class RequestTimer:
+    """
+    Wraps requests.Session.request to record the latency of every request
+    on the wire (rate-limit and concurrency-cap waits are not included)
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+
+    def __call__(self, session, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._send(session, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.latencies.append(elapsed)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def isolate_environment(unlimited=False, reply_workers=None, **overrides):
+    """
+    Settings for an offline run; must be applied before the scrapers are
+    imported (they read .env at import time and never override set vars)
+    """
+    for name in ("PROXY", "PROXY_POOL", "HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
+        os.environ[name] = ""
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "127.0.0.1,localhost"
+    if unlimited:
+        for scope in ("PROXY", "ACCOUNT", "DOC"):
+            os.environ[f"RATE_LIMIT_{scope}_QPS"] = "0"
+    if reply_workers:
+        os.environ["REPLY_WORKERS"] = str(reply_workers)
+    for name, value in overrides.items():
+        os.environ[name] = str(value)
+
+
+def run_crawl(kind, graphql_url, posts, ctx, verbose=False, workdir=None, resume=False):
+    """
+    main.crawl_target for one page/group against graphql_url, in workdir
+    (default: a fresh temp directory). Returns (posts crawled, elapsed
+    seconds, RequestTimer, output dir).
+    """
+    import requests
+
+    import comment_scraper
+    import group_post_scraper_v2
+    import http_session
+    import main as scraper_main
+    import post_scraper
+    import single_post_image
+
+    timer = RequestTimer(requests.Session.request)
+    post_type = "group_post" if kind == "group" else "page_post"
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+
+    workdir = workdir or tempfile.mkdtemp(prefix="fb-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with mock.patch.object(requests.Session, "request", lambda *a, **kw: timer(*a, **kw)), \
+                mock.patch.object(post_scraper, "GRAPHQL_URL", graphql_url), \
+                mock.patch.object(group_post_scraper_v2, "GRAPHQL_URL", graphql_url), \
+                mock.patch.object(single_post_image, "GRAPHQL_URL", graphql_url), \
+                mock.patch.object(comment_scraper, "GRAPHQL", graphql_url), \
+                output:
+            started = time.perf_counter()
+            crawled = scraper_main.crawl_target(post_type, ctx, posts, resume=resume)
+            elapsed = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+        http_session.close_all()
+    return crawled, elapsed, timer, workdir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--kind", choices=("page", "group"), default="page")
+    parser.add_argument("--posts", type=int, default=20, help="posts to crawl")
+    parser.add_argument("--reply-workers", type=int, default=None, help="REPLY_WORKERS override")
+    parser.add_argument("--unlimited", action="store_true", help="disable the token-bucket rate limits")
+    parser.add_argument("--verbose", action="store_true", help="show the scrapers' output")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    isolate_environment(args.unlimited, args.reply_workers)
+    from scrape_context import ScrapeContext
+
+    server, url = start_server(config_from_args(args))
+    try:
+        ctx = ScrapeContext(target_id="100000000000001", name=f"Bench {args.kind}")
+        posts, elapsed, timer, workdir = run_crawl(args.kind, f"{url}/api/graphql/", args.posts, ctx, args.verbose)
+    finally:
+        served = stop_server(server)
+
+    requests_made = len(timer.latencies)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.kind} crawl: {posts} posts, {requests_made} requests ({timer.errors} errors) in {elapsed:.2f}s")
+    print(f"  posts/min     : {posts / elapsed * 60:10,.1f}")
+    print(f"  requests/sec  : {requests_made / elapsed:10,.1f}")
+    print(f"  latency p50   : {percentile(timer.latencies, 50) * 1000:10,.1f} ms")
+    print(f"  latency p99   : {percentile(timer.latencies, 99) * 1000:10,.1f} ms")
+    print(f"  peak RSS      : {peak_rss_mb:10,.1f} MiB")
+    print(f"  served        : {served}")
+    print(f"  output        : {workdir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark: goodput of the retry / proxy rotation logic under injected faults.
+
+For each failure profile (faults.PROFILES) a crawl runs against the mock
+server through a pool of fake proxies. Reports how much of the clean
+run's data still made it to disk, how many requests it took and the
+goodput (saved posts, comments, replies and images per second).
+
+    python benchmarks/bench_faults.py
+    python benchmarks/bench_faults.py --profiles rate-limited mixed --proxies 6 --dead 2
+
+Retry waits and proxy quarantine are scaled down (--base-delay,
+--max-delay, --quarantine) so a run takes seconds, not minutes; rate
+limits are off. Server and proxies run in this process.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_end_to_end import isolate_environment, run_crawl  # noqa: E402
+from fake_proxy import start_proxies  # noqa: E402
+from faults import PROFILES, FaultConfig  # noqa: E402
+from mock_server import MockServer, add_config_arguments, config_from_args  # noqa: E402
+
+# What download_image saves images as
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def saved_items(workdir):
+    """(posts, comments, replies, images) written under workdir"""
+    posts = comments = replies = images = 0
+    for folder, _, files in os.walk(workdir):
+        for name in files:
+            if name.startswith("."):  # scraped-index manifest, watermarks
+                continue
+            path = os.path.join(folder, name)
+            if name.endswith(".comments.jsonl"):  # OUTPUT_FORMAT=jsonl
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if json.loads(line)["type"] == "comment":
+                            comments += 1
+                        else:
+                            replies += 1
+            elif name.endswith(".post.json"):
+                posts += 1
+            elif name.endswith(".json"):
+                with open(path, encoding="utf-8") as f:
+                    post = json.load(f)
+                posts += 1
+                comments += len(post.get("comments") or [])
+                replies += sum(len(c.get("replies") or []) for c in post.get("comments") or [])
+            elif name.endswith(IMAGE_EXTENSIONS):
+                images += 1
+    return posts, comments, replies, images
+
+
+def run_profile(name, args, seed):
+    import proxy_pool
+    from retry_policy import RetryBudget
+    from scrape_context import ScrapeContext
+
+    server_faults, proxy_faults = PROFILES[name]
+    server = MockServer(faults=FaultConfig(seed=seed, **server_faults), **config_from_args(args)).start()
+    proxies = start_proxies(args.proxies, FaultConfig(seed=seed + 1, **proxy_faults), args.dead)
+    proxy_pool.pool = proxy_pool.ProxyPool([p.url for p in proxies])
+    first = proxy_pool.pool.best()
+    ctx = ScrapeContext(target_id="100000000000001", name=f"Bench {args.kind}",
+                        proxies={"http": first, "https": first}, retry_budget=RetryBudget(args.budget))
+    try:
+        _, elapsed, timer, workdir = run_crawl(args.kind, server.graphql_url, args.posts, ctx, args.verbose)
+    finally:
+        server.stop()
+        for p in proxies:
+            p.stop()
+
+    faults = sum(v for k, v in server.counts.items() if k.startswith("fault:"))
+    faults += sum(v for p in proxies for k, v in p.counts.items() if k.startswith("fault:"))
+    items = saved_items(workdir)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"elapsed": elapsed, "attempts": len(timer.latencies), "faults": faults,
+            "items": items, "budget_left": ctx.retry_budget.remaining}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+    parser.add_argument("--kind", choices=("page", "group"), default="page")
+    parser.add_argument("--posts", type=int, default=6)
+    parser.add_argument("--proxies", type=int, default=4, help="fake proxy ports in the pool")
+    parser.add_argument("--dead", type=int, default=0, help="how many of them refuse connections")
+    parser.add_argument("--budget", type=int, default=200, help="job retry budget")
+    parser.add_argument("--base-delay", type=float, default=0.05, help="RETRY_BASE_DELAY")
+    parser.add_argument("--max-delay", type=float, default=0.5, help="RETRY_MAX_DELAY")
+    parser.add_argument("--quarantine", type=float, default=1.0, help="PROXY_QUARANTINE_SECONDS")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show the scrapers' output")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    isolate_environment(unlimited=True,
+                        RETRY_BASE_DELAY=args.base_delay, RETRY_MAX_DELAY=args.max_delay,
+                        RETRY_AFTER_MAX=args.max_delay,
+                        PROXY_QUARANTINE_SECONDS=args.quarantine, PROXY_QUARANTINE_MAX=args.quarantine * 8)
+
+    # The clean run is the reference for completeness and goodput
+    profiles = ["clean"] + [p for p in args.profiles if p != "clean"]
+    results = {name: run_profile(name, args, args.seed) for name in profiles}
+    clean = results["clean"]
+    clean_items = sum(clean["items"]) or 1
+    clean_goodput = clean_items / clean["elapsed"]
+
+    print(f"{args.kind} crawl of {args.posts} posts through {args.proxies} proxies ({args.dead} dead)\n")
+    print(f"  {'profile':<14} {'time s':>7} {'requests':>9} {'faults':>7} {'budget':>7} "
+          f"{'posts/cmts/replies/imgs':>24} {'complete':>9} {'items/s':>9} {'goodput':>8}")
+    for name, r in results.items():
+        items = sum(r["items"])
+        goodput = items / r["elapsed"]
+        print(f"  {name:<14} {r['elapsed']:>7.2f} {r['attempts']:>9} {r['faults']:>7} {r['budget_left']:>7} "
+              f"{'/'.join(map(str, r['items'])):>24} {items / clean_items:>9.0%} {goodput:>9,.0f} "
+              f"{goodput / clean_goodput:>8.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark: reel/video detection on an album-heavy feed.
+
+Compares the old str(media).lower() scan with media_types.is_reel_or_video_story
+and checks both give the same answer on every story.
+
+    python benchmarks/bench_media_detection.py --stories 500 --album-size 40
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_types import is_reel_or_video_story  # noqa: E402
+from synthetic import album_heavy_feed  # noqa: E402
+
+
+def legacy_is_reel_or_video_post(node):
+    """post_scraper.is_reel_or_video_post before media_types (stringifies every media dict)"""
+    story_type = node.get("__typename", "")
+    if "reel" in story_type.lower():
+        return True
+    content = node.get("comet_sections", {}).get("content", {})
+    if "reel" in content.get("__typename", "").lower():
+        return True
+    for att in node.get("attachments") or []:
+        attachment = (att.get("styles") or {}).get("attachment") or {}
+        single_media = attachment.get("media")
+        if single_media:
+            if single_media.get("__typename", "") == "Video":
+                return True
+            if "reel" in str(single_media).lower():
+                return True
+        for m in attachment.get("all_subattachments", {}).get("nodes", []):
+            media_node = m.get("media") or {}
+            if media_node.get("__typename") == "Video":
+                return True
+            if "reel" in str(media_node).lower():
+                return True
+    return False
+
+
+def bench(func, feed, repeat):
+    best = min(timeit.repeat(lambda: [func(node) for node in feed], number=1, repeat=repeat))
+    return len(feed) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stories", type=int, default=300)
+    parser.add_argument("--album-size", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    feed = album_heavy_feed(args.stories, args.album_size)
+
+    mismatches = [n["post_id"] for n in feed if legacy_is_reel_or_video_post(n) != is_reel_or_video_story(n)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} stories classified differently, e.g. {mismatches[:3]}")
+        return 1
+
+    flagged = sum(is_reel_or_video_story(n) for n in feed)
+    print(f"{len(feed)} stories, album size {args.album_size}, {flagged} reel/video")
+
+    legacy = bench(legacy_is_reel_or_video_post, feed, args.repeat)
+    typed = bench(is_reel_or_video_story, feed, args.repeat)
+    print(f"  str() scan      : {legacy:12,.0f} stories/sec")
+    print(f"  typed detector  : {typed:12,.0f} stories/sec  ({typed / legacy:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Benchmark: response parsing and Story-node extraction on the fixture corpus.
+
+Times parse_fb_response on every fixture, fb_json on the comment / reply
+responses, and extract_comment_count, is_reel_or_video_post and
+extract_media on the Story nodes of the feed fixtures. Reports ops/sec
+and the peak memory allocated per op (tracemalloc).
+
+    python benchmarks/bench_parsers.py
+    python benchmarks/bench_parsers.py --save baseline.json
+    python benchmarks/bench_parsers.py --compare baseline.json --tolerance 0.2
+
+--fixtures points at another directory of <friendly name>.txt bodies,
+e.g. freshly recorded (and anonymized) responses once payloads grow.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import comment_scraper  # noqa: E402
+import group_post_scraper_v2  # noqa: E402
+import post_scraper  # noqa: E402
+from fb_parser import parse_fb_response  # noqa: E402
+
+TIMELINE = "ProfileCometTimelineFeedRefetchQuery"
+GROUP_FEED = "GroupsCometFeedRegularStoriesPaginationQuery"
+COMMENTS = "CommentsListComponentsPaginationQuery"
+REPLIES = "Depth1CommentsListPaginationQuery"
+PHOTO = "CometPhotoRootContentQuery"
+DOC_NAMES = (TIMELINE, GROUP_FEED, COMMENTS, REPLIES, PHOTO)
+
+
+def load_fixtures(folder):
+    fixtures = {}
+    for name in DOC_NAMES:
+        path = os.path.join(folder, f"{name}.txt")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+def story_nodes(fixtures):
+    """Story nodes of the feed fixtures, collected the way the scrapers do"""
+    nodes = []
+    if TIMELINE in fixtures:
+        nodes.extend(post_scraper.collect_story_nodes(parse_fb_response(fixtures[TIMELINE]))[0])
+    if GROUP_FEED in fixtures:
+        for item in parse_fb_response(fixtures[GROUP_FEED]):
+            nodes.extend(group_post_scraper_v2.collect_story_nodes(item))
+    return nodes
+
+
+def extract_media_offline(node):
+    """post_scraper.extract_media without downloads or follow-up photo queries"""
+    return post_scraper.extract_media(node, node.get("post_id"))
+
+
+def cases(fixtures):
+    """(label, callable, ops per call)"""
+    out = []
+    for name, body in fixtures.items():
+        out.append((f"parse_fb_response[{name}]", lambda body=body: parse_fb_response(body), 1))
+    for name in (COMMENTS, REPLIES):
+        if name in fixtures:
+            text = fixtures[name].decode("utf-8")
+            out.append((f"fb_json[{name}]", lambda text=text: comment_scraper.fb_json(text), 1))
+
+    nodes = story_nodes(fixtures)
+    if nodes:
+        for label, func in (("extract_comment_count", post_scraper.extract_comment_count),
+                            ("is_reel_or_video_post", post_scraper.is_reel_or_video_post),
+                            ("extract_media", extract_media_offline)):
+            out.append((f"{label}[{len(nodes)} stories]",
+                        lambda func=func: [func(n) for n in nodes], len(nodes)))
+    return out
+
+
+def ops_per_sec(func, ops, repeat):
+    # Enough calls per sample to run for ~0.2s
+    number = 1
+    while timeit.timeit(func, number=number) < 0.2 and number < 1 << 20:
+        number *= 2
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return ops * number / best
+
+
+def peak_bytes_per_op(func, ops):
+    tracemalloc.start()
+    try:
+        func()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        return (tracemalloc.get_traced_memory()[1] - base) / ops
+    finally:
+        tracemalloc.stop()
+
+
+def compare(results, baseline, tolerance):
+    """Labels whose ops/sec dropped by more than tolerance against the baseline"""
+    regressions = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if before and result["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append((label, before["ops_per_sec"], result["ops_per_sec"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", default=os.path.join(BENCH_DIR, "fixtures"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON (a baseline)")
+    parser.add_argument("--compare", metavar="FILE", help="fail on ops/sec regressions against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ops/sec drop (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"❌ No fixtures in {args.fixtures} (run benchmarks/make_fixtures.py)")
+        return 1
+    for name, body in fixtures.items():
+        print(f"  {name:<46} {len(body):>10,} bytes")
+    print()
+
+    results = {}
+    with mock.patch.object(post_scraper, "download_image", return_value="image.jpg"), \
+            mock.patch.object(post_scraper, "fetch_remaining_images", return_value=[]), \
+            mock.patch("builtins.print"):
+        for label, func, ops in cases(fixtures):
+            post_scraper._image_counters.clear()
+            results[label] = {"ops_per_sec": ops_per_sec(func, ops, args.repeat),
+                              "peak_bytes_per_op": peak_bytes_per_op(func, ops)}
+
+    print(f"  {'case':<62} {'ops/sec':>12} {'peak KiB/op':>12}")
+    for label, result in results.items():
+        print(f"  {label:<62} {result['ops_per_sec']:>12,.0f} {result['peak_bytes_per_op'] / 1024:>12,.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for label, before, after in regressions:
+                print(f"  {label}: {before:,.0f} → {after:,.0f} ops/sec")
+            return 1
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark: resuming a crawl that was interrupted in the middle of a feed page.
+
+Crawls a page or group against the in-process mock server three times:
+once uninterrupted for reference, once killed while the feed is being
+read (the Nth post's media extraction raises), and once resumed from that
+run's checkpoint in the same directory. Reports the requests each run
+made and fails when the resumed crawl saves a post twice or does not end
+up with the same posts as the reference run.
+
+    python benchmarks/bench_resume.py --kind group --posts 6 --crash-at 3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_end_to_end import isolate_environment, run_crawl  # noqa: E402
+from mock_server import MockServer, add_config_arguments, config_from_args  # noqa: E402
+
+
+class Killed(BaseException):
+    """Stands in for the process being killed (not caught by the scrapers)"""
+
+
+def crawl(args, server, workdir, resume=False, crash_at=None):
+    """One crawl in workdir; returns (post ids saved, in order, requests made, killed)"""
+    import group_post_scraper_v2
+    import main as scraper_main
+    import post_scraper
+    from scrape_context import ScrapeContext
+
+    module = group_post_scraper_v2 if args.kind == "group" else post_scraper
+    real_extract_media = module.extract_media
+    real_save = scraper_main.save_post_comments
+    calls = {"media": 0}
+    saved = []
+
+    def extract_media(*a, **kw):
+        calls["media"] += 1
+        if crash_at and calls["media"] >= crash_at:
+            raise Killed()
+        return real_extract_media(*a, **kw)
+
+    def save_post_comments(post_type, post_id, *a, **kw):
+        saved.append(post_id)
+        return real_save(post_type, post_id, *a, **kw)
+
+    ctx = ScrapeContext(target_id="100000000000001", name=f"Bench {args.kind}")
+    killed = False
+    with mock.patch.object(module, "extract_media", extract_media), \
+            mock.patch.object(scraper_main, "save_post_comments", save_post_comments):
+        try:
+            _, _, timer, _ = run_crawl(args.kind, server.graphql_url, args.posts, ctx, args.verbose,
+                                       workdir=workdir, resume=resume)
+            requests_made = len(timer.latencies)
+        except Killed:
+            killed = True
+            requests_made = None
+    return saved, requests_made, killed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--kind", choices=("page", "group"), default="group")
+    parser.add_argument("--posts", type=int, default=6, help="posts to crawl")
+    parser.add_argument("--crash-at", type=int, default=3,
+                        help="kill the crawl while extracting the media of this post (1-based)")
+    parser.add_argument("--verbose", action="store_true", help="show the scrapers' output")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    isolate_environment(unlimited=True)
+    server = MockServer(**config_from_args(args)).start()
+    reference_dir = tempfile.mkdtemp(prefix="fb-bench-")
+    resume_dir = tempfile.mkdtemp(prefix="fb-bench-")
+    try:
+        reference, reference_requests, _ = crawl(args, server, reference_dir)
+        before_kill = server.counts.copy()
+        _, _, killed = crawl(args, server, resume_dir, crash_at=args.crash_at)
+        killed_requests = sum(server.counts.values()) - sum(before_kill.values())
+        resumed, resumed_requests, _ = crawl(args, server, resume_dir, resume=True)
+    finally:
+        server.stop()
+        shutil.rmtree(reference_dir, ignore_errors=True)
+        shutil.rmtree(resume_dir, ignore_errors=True)
+
+    twice = sorted(post_id for post_id, n in Counter(resumed).items() if n > 1)
+    missing = sorted(set(reference) - set(resumed))
+    extra = sorted(set(resumed) - set(reference))
+    print(f"{args.kind} crawl of {args.posts} posts, killed at post {args.crash_at}\n")
+    print(f"  uninterrupted : {len(reference)} posts saved, {reference_requests} requests")
+    print(f"  killed        : {'yes' if killed else 'no (finished before --crash-at)'}, "
+          f"{killed_requests} requests")
+    print(f"  resumed       : {len(resumed)} saves of {len(set(resumed))} posts, {resumed_requests} requests")
+
+    failures = []
+    if twice:
+        failures.append(f"saved more than once: {twice}")
+    if missing:
+        failures.append(f"not saved: {missing}")
+    if extra:
+        failures.append(f"not in the uninterrupted run: {extra}")
+    for failure in failures:
+        print(f"  FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Local fake HTTP forward proxy with fault injection.
+
+Relays plain-http requests (absolute-form, as requests sends them to an
+http:// proxy) to the mock server, injecting proxy-side faults (see
+faults.py): 407s and connection resets before forwarding, slow drips
+and the rest on the relayed response. A "dead" proxy refuses every
+connection, like a port that stopped listening.
+
+    python benchmarks/fake_proxy.py --count 4 --dead 1 --http-407 0.1
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from faults import FaultConfig, add_fault_arguments, faults_from_args  # noqa: E402
+
+# Headers that describe the connection, not the payload
+HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "proxy-connection",
+               "te", "trailers", "transfer-encoding", "upgrade", "content-length", "content-type"}
+# Faults the proxy answers with itself, without contacting the target
+EARLY_FAULTS = ("http_407", "reset")
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._forward("GET")
+
+    def do_POST(self):
+        self._forward("POST")
+
+    def _forward(self, method):
+        faults = self.server.faults
+        fault = faults.pick()
+        self.server.count("requests")
+        if fault:
+            self.server.count(f"fault:{fault}")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        if fault in EARLY_FAULTS:
+            faults.apply(self, fault, 407, b"", "text/plain")
+            return
+
+        target = urlsplit(self.path)
+        if target.scheme != "http" or not target.hostname:
+            self.send_error(400, "fake proxy only relays absolute http:// URLs")
+            return
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS | {"host"}}
+        if body is not None:
+            headers["Content-Type"] = self.headers.get("Content-Type", "application/x-www-form-urlencoded")
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+        try:
+            path = target.path + (f"?{target.query}" if target.query else "")
+            conn.request(method, path or "/", body=body, headers=headers)
+            upstream = conn.getresponse()
+            payload = upstream.read()
+        except (OSError, http.client.HTTPException):
+            self.server.count("upstream_errors")
+            self.send_error(502, "upstream unreachable")
+            return
+        finally:
+            conn.close()
+
+        relayed = {k: v for k, v in upstream.getheaders() if k.lower() not in HOP_HEADERS}
+        faults.apply(self, fault, upstream.status, payload,
+                     upstream.getheader("Content-Type", "application/octet-stream"), relayed)
+
+
+class FakeProxy(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, faults=None, dead=False):
+        super().__init__((host, port), ProxyHandler)
+        self.faults = faults or FaultConfig()
+        self.dead = dead
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._counts_lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def start(self):
+        if self.dead:
+            # Stop listening: connections to the port are refused
+            self.socket.close()
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            return self
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if not self.dead:
+            self.shutdown()
+        self.server_close()
+
+
+def start_proxies(count, faults=None, dead=0):
+    """count fake proxies sharing one fault config; the first `dead` of them refuse connections"""
+    faults = faults or FaultConfig()
+    return [FakeProxy(faults=faults, dead=i < dead).start() for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1, help="number of proxy ports")
+    parser.add_argument("--dead", type=int, default=0, help="how many of them refuse connections")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    proxies = start_proxies(args.count, FaultConfig(**faults_from_args(args)), args.dead)
+    # First line is machine-readable: PROXY_POOL value
+    print(",".join(p.url for p in proxies), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps({p.url: p.counts for p in proxies}), file=sys.stderr)
+        for p in proxies:
+            p.stop()
+
+
+if __name__ == "__main__":
+    main()
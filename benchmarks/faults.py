@@ -0,0 +1,110 @@
+"""
+Fault injection for the mock server and the fake proxy.
+
+A FaultConfig holds the rate of each fault (0..1, drawn once per request):
+
+    http_407    407 Proxy Authentication Required
+    http_429    429 Too Many Requests (with Retry-After when retry_after is set)
+    http_503    503 Service Unavailable
+    checkpoint  HTTP 200 with a checkpoint / login-wall HTML body
+    reset       connection closed without a response
+    slow        the body is dripped out in drip_bytes chunks every drip_delay seconds
+    truncated   HTTP 200 with only the first half of the body
+
+PROFILES names the failure mixes bench_faults.py runs, as
+(server faults, proxy faults) keyword dicts.
+"""
+import random
+import socket
+import time
+
+FAULTS = ("http_407", "http_429", "http_503", "checkpoint", "reset", "slow", "truncated")
+
+CHECKPOINT_BODY = (
+    b"<!DOCTYPE html><html><head><title>Security Check</title></head><body>"
+    b'<form action="/checkpoint/?next=https%3A%2F%2Fwww.facebook.com%2F" method="post">'
+    b"You must log in to continue.</form></body></html>"
+)
+
+
+class FaultConfig:
+    def __init__(self, http_407=0.0, http_429=0.0, http_503=0.0, checkpoint=0.0, reset=0.0,
+                 slow=0.0, truncated=0.0, drip_bytes=512, drip_delay=0.02, retry_after=None, seed=None):
+        self.rates = {"http_407": http_407, "http_429": http_429, "http_503": http_503,
+                      "checkpoint": checkpoint, "reset": reset, "slow": slow, "truncated": truncated}
+        self.drip_bytes = drip_bytes
+        self.drip_delay = drip_delay
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+
+    def __bool__(self):
+        return any(self.rates.values())
+
+    def pick(self):
+        """Fault for the next request, or None"""
+        draw = self._rng.random()
+        for fault in FAULTS:
+            draw -= self.rates[fault]
+            if draw < 0:
+                return fault
+        return None
+
+    def apply(self, handler, fault, status, body, content_type, headers=None):
+        """Write the response for handler (a BaseHTTPRequestHandler) with fault applied"""
+        if fault == "reset":
+            handler.close_connection = True
+            try:
+                handler.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+        if fault == "http_407":
+            status, body, content_type = 407, b"Proxy Authentication Required", "text/plain"
+            headers = {"Proxy-Authenticate": 'Basic realm="proxy"'}
+        elif fault in ("http_429", "http_503"):
+            status, body, content_type = int(fault[5:]), b"", "text/html"
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+        elif fault == "checkpoint":
+            status, body, content_type = 200, CHECKPOINT_BODY, "text/html; charset=utf-8"
+        elif fault == "truncated":
+            body = body[:len(body) // 2]
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if fault != "slow":
+            handler.wfile.write(body)
+            return
+        for start in range(0, len(body), self.drip_bytes):
+            handler.wfile.write(body[start:start + self.drip_bytes])
+            handler.wfile.flush()
+            time.sleep(self.drip_delay)
+
+
+PROFILES = {
+    "clean": ({}, {}),
+    "proxy-auth": ({}, {"http_407": 0.2}),
+    "proxy-resets": ({}, {"reset": 0.15}),
+    "rate-limited": ({"http_429": 0.2, "retry_after": 0}, {}),
+    "overloaded": ({"http_503": 0.2}, {}),
+    "checkpoint": ({"checkpoint": 0.1}, {}),
+    "server-resets": ({"reset": 0.1}, {}),
+    "slow-drip": ({"slow": 0.2}, {}),
+    "truncated": ({"truncated": 0.1}, {}),
+    "mixed": ({"http_429": 0.05, "http_503": 0.05, "checkpoint": 0.03, "truncated": 0.03, "slow": 0.05},
+              {"http_407": 0.05, "reset": 0.05}),
+}
+
+
+def add_fault_arguments(parser, prefix=""):
+    """FaultConfig rates as --<prefix><fault> options"""
+    for fault in FAULTS:
+        parser.add_argument(f"--{prefix}{fault.replace('_', '-')}", type=float, default=0.0,
+                            help=f"rate of {fault} faults (0..1)")
+
+
+def faults_from_args(args, prefix=""):
+    return {fault: getattr(args, f"{prefix}{fault}".replace("-", "_")) for fault in FAULTS}
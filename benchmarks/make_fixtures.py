@@ -0,0 +1,31 @@
+"""
+Write the fixture corpus: one synthetic, anonymized response per GraphQL
+doc the scrapers use, to benchmarks/fixtures/<friendly name>.txt.
+
+The files are committed so benchmark runs always parse the same bytes;
+re-run this only when the payload shapes in synthetic.py change.
+
+    python benchmarks/make_fixtures.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import RESPONSES  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def main():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, build in RESPONSES.items():
+        path = os.path.join(FIXTURES_DIR, f"{name}.txt")
+        body = build()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        print(f"💾 {path} ({len(body.encode('utf-8')):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
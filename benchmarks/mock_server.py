@@ -0,0 +1,272 @@
+"""
+Local stand-in for Facebook's /api/graphql/ and the scontent image host.
+
+Serves the feed, comment, reply and photo queries from the synthetic
+response builders (the same ones that generate benchmarks/fixtures/),
+with configurable latency, payload sizes and page counts, plus images
+under /v/... . Image URIs in the payloads point back at this server.
+Faults (see faults.py) can be injected into any share of the responses.
+
+    python benchmarks/mock_server.py --port 8765 --latency 0.05 --pages 5
+    python benchmarks/mock_server.py --profile mixed
+    python benchmarks/mock_server.py --http-429 0.1 --truncated 0.05
+
+Or in-process:
+
+    with MockServer(pages=3) as server:
+        post_scraper.GRAPHQL_URL = server.graphql_url
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from faults import PROFILES, FaultConfig, add_fault_arguments, faults_from_args  # noqa: E402
+
+TIMELINE = "ProfileCometTimelineFeedRefetchQuery"
+GROUP_FEED = "GroupsCometFeedRegularStoriesPaginationQuery"
+COMMENTS = "CommentsListComponentsPaginationQuery"
+REPLIES = "Depth1CommentsListPaginationQuery"
+PHOTO = "CometPhotoRootContentQuery"
+
+# doc_id -> friendly name, as sent by the scrapers
+DOC_IDS = {
+    "25430544756617998": TIMELINE,
+    "25716860671307636": GROUP_FEED,
+    "27806180149070312": COMMENTS,
+    "26570577339199586": REPLIES,
+    "26168653472729001": PHOTO,
+}
+
+
+def _seed(*parts):
+    """Stable seed per (query, target, page) so every page has its own ids"""
+    return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:12], 16)
+
+
+def _page(cursor, prefix):
+    if isinstance(cursor, str) and cursor.startswith(prefix):
+        return int(cursor[len(prefix):])
+    return 0
+
+
+class MockConfig:
+    """What the server answers with; every field can be changed while it runs"""
+
+    def __init__(self, latency=0.0, jitter=0.0, pages=5, stories=3, album_size=5, photo_chain=2,
+                 comment_pages=2, comments=20, replies=5, image_bytes=30_000):
+        self.latency = latency            # seconds added to every response
+        self.jitter = jitter              # uniform extra latency, 0..jitter seconds
+        self.pages = pages                # feed pages per target
+        self.stories = stories            # stories per feed page
+        self.album_size = album_size      # photos per album (5 triggers the photo query path)
+        self.photo_chain = photo_chain    # extra photos served by CometPhotoRootContentQuery
+        self.comment_pages = comment_pages
+        self.comments = comments          # comments per page
+        self.replies = replies            # replies per comment
+        self.image_bytes = image_bytes
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this keep-alive
+    # responses wait on delayed ACKs (~40ms each)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    # ----- routing -----
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+        name = DOC_IDS.get(form.get("doc_id")) or self.headers.get("x-fb-friendly-name")
+        try:
+            variables = json.loads(form.get("variables") or "{}")
+        except ValueError:
+            variables = {}
+        build = self.server.routes.get(name)
+        if build is None or not self.path.startswith("/api/graphql"):
+            self._send(404, b"not found", "text/plain")
+            return
+        self.server.count(name)
+        self._delay()
+        self._respond(self.server.localize(build(variables)).encode(), "text/html; charset=utf-8")
+
+    def do_GET(self):
+        if not self.path.startswith("/v/"):
+            self._send(404, b"not found", "text/plain")
+            return
+        self.server.count("image")
+        self._delay()
+        self._respond(self.server.image, "image/jpeg")
+
+    # ----- helpers -----
+
+    def _delay(self):
+        config = self.server.config
+        delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _respond(self, body, content_type):
+        """200 response, unless a fault is drawn for this request"""
+        fault = self.server.faults.pick()
+        if fault:
+            self.server.count(f"fault:{fault}")
+        self.server.faults.apply(self, fault, 200, body, content_type)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, handler=MockHandler, faults=None, **config):
+        super().__init__((host, port), handler)
+        self.config = MockConfig(**config)
+        self.faults = faults or FaultConfig()
+        self.routes = {
+            TIMELINE: self.timeline,
+            GROUP_FEED: self.group_feed,
+            COMMENTS: self.comments,
+            REPLIES: self.replies,
+            PHOTO: self.photo,
+        }
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graphql_url(self):
+        return f"{self.url}/api/graphql/"
+
+    @property
+    def image(self):
+        size = self.config.image_bytes
+        return b"\xff\xd8\xff\xe0" + b"\0" * max(0, size - 6) + b"\xff\xd9"
+
+    def localize(self, body):
+        """Point image URIs at this server instead of the made-up CDN"""
+        return body.replace(synthetic.CDN, f"{self.url}/v/t39.30808-6")
+
+    def count(self, name):
+        with self._counts_lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    # ----- responses -----
+
+    def timeline(self, variables):
+        page = _page(variables.get("cursor"), "page:")
+        return synthetic.timeline_response(
+            stories=self.config.stories, album_size=self.config.album_size,
+            seed=_seed(TIMELINE, variables.get("id"), page),
+            has_next=page + 1 < self.config.pages, end_cursor=f"page:{page + 1}")
+
+    def group_feed(self, variables):
+        page = _page(variables.get("cursor"), "page:")
+        deferred = self.config.stories // 2
+        return synthetic.group_feed_response(
+            stories=self.config.stories - deferred, deferred=deferred, album_size=self.config.album_size,
+            seed=_seed(GROUP_FEED, variables.get("id"), page),
+            has_next=page + 1 < self.config.pages, end_cursor=f"page:{page + 1}")
+
+    def comments(self, variables):
+        page = _page(variables.get("commentsAfterCursor"), "comments:")
+        return synthetic.comments_response(
+            comments=self.config.comments, seed=_seed(COMMENTS, variables.get("id"), page),
+            has_next=page + 1 < self.config.comment_pages, end_cursor=f"comments:{page + 1}")
+
+    def replies(self, variables):
+        return synthetic.replies_response(replies=self.config.replies, seed=_seed(REPLIES, variables.get("id")))
+
+    def photo(self, variables):
+        # nodeID of the n-th extra photo of a chain ends in "~n"
+        node_id = str(variables.get("nodeID") or "")
+        root, _, step = node_id.partition("~")
+        step = int(step) + 1 if step.isdigit() else 1
+        return synthetic.photo_response(
+            seed=_seed(PHOTO, node_id), has_next=step < self.config.photo_chain, next_id=f"{root}~{step}")
+
+    # ----- lifecycle -----
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser):
+    """MockConfig fields as command line options (shared with the benchmarks)"""
+    defaults = MockConfig()
+    for field, value in vars(defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value)
+
+
+def config_from_args(args):
+    return {field: getattr(args, field) for field in vars(MockConfig())}
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="server faults of a bench_faults.py profile")
+    parser.add_argument("--retry-after", type=int, default=None, help="Retry-After sent with 429/503 faults")
+    add_config_arguments(parser)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    faults = dict(PROFILES[args.profile][0]) if args.profile else faults_from_args(args)
+    if args.retry_after is not None:
+        faults["retry_after"] = args.retry_after
+    server = MockServer(args.host, args.port, faults=FaultConfig(**faults), **config_from_args(args))
+    # First line is machine-readable so benchmarks can start this as a subprocess
+    print(server.url, flush=True)
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.counts), file=sys.stderr)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
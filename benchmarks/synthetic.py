@@ -0,0 +1,237 @@
+"""
+Synthetic, anonymized Facebook GraphQL payloads for the benchmarks.
+
+Shapes follow what the scrapers read (Story nodes, attachments, albums,
+feedback / comment counts); every id, name and URL is made up.
+"""
+import json
+import random
+
+CDN = "https://scontent.example.invalid/v/t39.30808-6"
+
+
+def _id(rng, digits=16):
+    return str(rng.randrange(10 ** (digits - 1), 10 ** digits))
+
+
+def photo_media(rng):
+    media_id = _id(rng)
+    uri = f"{CDN}/{_id(rng, 9)}_{media_id}_n.jpg?stp=dst-jpg_s960x960&_nc_cat=1&oh=00_{_id(rng, 12)}"
+    return {
+        "__typename": "Photo",
+        "id": media_id,
+        "image": {"uri": uri, "height": 960, "width": 720},
+        "photo_image": {"uri": uri, "height": 960, "width": 720},
+        "url": f"https://www.facebook.com/photo/?fbid={media_id}&set=pcb.{_id(rng)}",
+        "accessibility_caption": "May be an image of 2 people, people smiling and text",
+        "owner": {"__typename": "User", "id": _id(rng), "name": "Example Person"},
+        "focus": {"x": 0.5, "y": 0.5},
+        "viewer_image": {"height": 2048, "width": 1536},
+        "blurred_image": {"uri": uri + "&blur=1"},
+    }
+
+
+def video_media(rng, reel=False):
+    media_id = _id(rng)
+    return {
+        "__typename": "Video",
+        "id": media_id,
+        "playable_url": f"https://video.example.invalid/v/{media_id}.mp4",
+        "url": f"https://www.facebook.com/{'reel' if reel else 'watch/?v='}/{media_id}",
+        "image": {"uri": f"{CDN}/{media_id}_thumb.jpg"},
+        "owner": {"__typename": "User", "id": _id(rng)},
+    }
+
+
+def _feedback(rng, comments):
+    return {
+        "id": f"ZmVlZGJhY2s6{_id(rng)}",
+        "comment_rendering_instance": {"comments": {"total_count": comments}},
+        "owning_profile": {"__typename": "Page", "name": "Example Page", "id": _id(rng)},
+        "associated_group": {"name": "Example Group", "id": _id(rng)},
+    }
+
+
+def story_node(rng, kind="album", album_size=20, comments=None, typename="Story"):
+    """
+    One feed Story node.
+    kind: "album" (album_size photos), "photo", "video", "reel" or "text"
+    """
+    post_id = _id(rng)
+    attachment = {}
+    if kind == "album":
+        attachment = {"all_subattachments": {"count": album_size,
+                                             "nodes": [{"media": photo_media(rng)} for _ in range(album_size)]}}
+    elif kind == "photo":
+        attachment = {"media": photo_media(rng)}
+    elif kind in ("video", "reel"):
+        attachment = {"media": video_media(rng, reel=kind == "reel")}
+
+    return {
+        "__typename": typename,
+        "id": f"UzpfS{_id(rng)}",
+        "post_id": post_id,
+        "permalink_url": f"https://www.facebook.com/permalink.php?story_fbid={post_id}",
+        "feedback": _feedback(rng, rng.randrange(0, 500) if comments is None else comments),
+        "attachments": [{"styles": {"attachment": attachment}}] if attachment else [],
+        "comet_sections": {
+            "content": {
+                "__typename": "CometFeedStoryDefaultContentStrategy",
+                "story": {
+                    "message": {"text": "Example post text " * rng.randrange(1, 20)},
+                    "actors": [{"__typename": "Page", "name": "Example Page", "id": _id(rng)}],
+                },
+            },
+        },
+    }
+
+
+def album_heavy_feed(stories=200, album_size=20, seed=1):
+    """Mostly large photo albums with a few photos, videos, reels and text posts mixed in"""
+    rng = random.Random(seed)
+    kinds = ["album"] * 6 + ["photo", "video", "reel", "text"]
+    return [story_node(rng, rng.choice(kinds), album_size) for _ in range(stories)]
+
+
+# ===== FULL RESPONSES (one per doc_id) =====
+
+def _dumps(docs):
+    """Serialize documents the way /api/graphql/ does: for (;;); prefix, one per line"""
+    return "for (;;);" + "\n".join(json.dumps(d, ensure_ascii=False, separators=(",", ":")) for d in docs)
+
+
+def _extensions(rng, final=True):
+    return {"is_final": final, "server_metadata": {"request_start_time_ms": rng.randrange(10 ** 12, 10 ** 13)}}
+
+
+def timeline_response(stories=10, album_size=12, seed=2, has_next=True, end_cursor=None):
+    """ProfileCometTimelineFeedRefetchQuery page"""
+    rng = random.Random(seed)
+    kinds = ["album", "album", "photo", "text", "video"]
+    edges = [{"node": story_node(rng, rng.choice(kinds), album_size), "cursor": _id(rng, 24)}
+             for _ in range(stories)]
+    return _dumps([{
+        "data": {"node": {
+            "__typename": "User",
+            "id": _id(rng),
+            "timeline_list_feed_units": {
+                "edges": edges,
+                "page_info": {"has_next_page": has_next,
+                              "end_cursor": (end_cursor or f"AQHR{_id(rng, 30)}") if has_next else None},
+            },
+        }},
+        "extensions": _extensions(rng),
+    }])
+
+
+def group_feed_response(stories=3, deferred=2, album_size=8, seed=3, has_next=True, end_cursor=None):
+    """GroupsCometFeedRegularStoriesPaginationQuery page: initial stories, deferred chunks, page_info"""
+    rng = random.Random(seed)
+    kinds = ["album", "photo", "text", "reel"]
+    docs = [{
+        "data": {"node": {
+            "__typename": "Group",
+            "id": _id(rng),
+            "group_feed": {"edges": [{"node": story_node(rng, rng.choice(kinds), album_size)}
+                                     for _ in range(stories)]},
+        }},
+        "extensions": _extensions(rng, final=False),
+    }]
+    for i in range(deferred):
+        docs.append({
+            "label": "GroupsCometFeedRegularStories_paginationGroup$stream$GroupsCometFeedRegularStories_group_group_feed",
+            "path": ["node", "group_feed", "edges", stories + i],
+            "data": {"node": story_node(rng, rng.choice(kinds), album_size), "cursor": _id(rng, 24)},
+            "extensions": _extensions(rng, final=False),
+        })
+    docs.append({
+        "label": "GroupsCometFeedRegularStories_paginationGroup$defer$GroupsCometFeedRegularStories_group_group_feed$page_info",
+        "path": ["node", "group_feed"],
+        "data": {"page_info": {"has_next_page": has_next,
+                               "end_cursor": (end_cursor or f"Cg8{_id(rng, 30)}") if has_next else None}},
+        "extensions": _extensions(rng),
+    })
+    return _dumps(docs)
+
+
+def _comment_node(rng, replies=True):
+    feedback_id = f"ZmVlZGJhY2s6{_id(rng)}_{_id(rng)}"
+    return {
+        "id": f"Y29tbWVudDo{_id(rng)}",
+        "legacy_fbid": _id(rng),
+        "body": {"text": "Example comment text " * rng.randrange(1, 8)},
+        "author": {"__typename": "User", "id": _id(rng), "name": "Example Person"},
+        "created_time": rng.randrange(1_600_000_000, 1_700_000_000),
+        "feedback": {
+            "id": feedback_id,
+            "reactors": {"count_reduced": str(rng.randrange(0, 300))},
+            "expansion_info": {"expansion_token": f"MToxN{_id(rng, 20)}" if replies else None},
+            "replies_fields": {"total_count": rng.randrange(1, 30) if replies else 0},
+        },
+    }
+
+
+def comments_response(comments=50, seed=4, has_next=True, end_cursor=None):
+    """CommentsListComponentsPaginationQuery page"""
+    rng = random.Random(seed)
+    post = story_node(rng, "album", 6)
+    edges = []
+    for _ in range(comments):
+        node = _comment_node(rng, replies=rng.random() < 0.4)
+        node["parent_post_story"] = {"id": post["id"], "attachments": [{"media": {"id": _id(rng)}}]}
+        edges.append({"node": node, "cursor": _id(rng, 24)})
+    return _dumps([{
+        "data": {"node": {
+            "__typename": "Feedback",
+            "id": f"ZmVlZGJhY2s6{post['post_id']}",
+            "comment_rendering_instance_for_feed_location": {"comments": {
+                "edges": edges,
+                "page_info": {"has_next_page": has_next,
+                              "end_cursor": (end_cursor or f"MTpQ{_id(rng, 30)}") if has_next else None},
+            }},
+        }},
+        "extensions": _extensions(rng),
+    }])
+
+
+def replies_response(replies=20, seed=5):
+    """Depth1CommentsListPaginationQuery response"""
+    rng = random.Random(seed)
+    return _dumps([{
+        "data": {"node": {
+            "__typename": "Feedback",
+            "id": f"ZmVlZGJhY2s6{_id(rng)}",
+            "replies_connection": {
+                "edges": [{"node": _comment_node(rng, replies=False), "cursor": _id(rng, 24)}
+                          for _ in range(replies)],
+                "page_info": {"has_next_page": False, "end_cursor": None},
+            },
+        }},
+        "extensions": _extensions(rng),
+    }])
+
+
+def photo_response(seed=6, has_next=True, next_id=None):
+    """CometPhotoRootContentQuery response for one album photo"""
+    rng = random.Random(seed)
+    media = photo_media(rng)
+    return _dumps([
+        {"data": {"currMedia": media,
+                  "nextMediaAfterNodeId": {"id": next_id or _id(rng)} if has_next else None,
+                  "prevMediaBeforeNodeId": {"id": _id(rng)}},
+         "extensions": _extensions(rng, final=False)},
+        {"label": "CometPhotoRootContentQuery$defer$CometPhotoRootContent_tahoe",
+         "path": ["currMedia"],
+         "data": {"creation_story": {"id": f"UzpfS{_id(rng)}", "comet_sections": {"message": {"text": "Example caption"}}}},
+         "extensions": _extensions(rng)},
+    ])
+
+
+# doc friendly name -> builder (fixture file is benchmarks/fixtures/<name>.txt)
+RESPONSES = {
+    "ProfileCometTimelineFeedRefetchQuery": timeline_response,
+    "GroupsCometFeedRegularStoriesPaginationQuery": group_feed_response,
+    "CommentsListComponentsPaginationQuery": comments_response,
+    "Depth1CommentsListPaginationQuery": replies_response,
+    "CometPhotoRootContentQuery": photo_response,
+}
@@ -0,0 +1,152 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where crawls keep what they need to resume after being interrupted (override in .env)
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', '.checkpoints')
+
+
+def _checkpoint_path(post_type, name):
+    folder = os.path.join(CHECKPOINT_DIR, post_type)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, name)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class FeedCheckpoint:
+    """
+    Resume point of one page / group crawl, kept in
+    CHECKPOINT_DIR/{post_type}/{target_id}.feed.json:
+
+        cursor     the feed page to fetch next (None = the first page)
+        collected  posts taken from the feed so far (they count towards the limit)
+        pending    those posts not yet saved with their comments
+
+    The file is rewritten atomically on every change. Without resume an
+    old checkpoint of the target is discarded.
+    """
+
+    def __init__(self, post_type, target_id, resume=False):
+        self.path = _checkpoint_path(post_type, f"{target_id}.feed.json")
+        state = {}
+        if resume:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    state = json.load(f)
+            except (FileNotFoundError, ValueError):
+                state = {}
+        else:
+            _remove(self.path)
+        self.resumed = bool(state)
+        self.cursor = state.get("cursor")
+        self.collected = state.get("collected", 0)
+        self.pending = state.get("pending", [])
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cursor": self.cursor, "collected": self.collected, "pending": self.pending},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def add_post(self, post):
+        """A post was taken from the feed"""
+        self.pending.append(post)
+        self.collected += 1
+        self._save()
+
+    def page_done(self, next_cursor):
+        """Every story of the current feed page was handled; resume at next_cursor"""
+        self.cursor = next_cursor
+        self._save()
+
+    def post_done(self, post_id):
+        """A post was saved with its comments"""
+        self.pending = [p for p in self.pending if p.get("post_id") != post_id]
+        self._save()
+
+    def clear(self):
+        _remove(self.path)
+
+
+class CommentCheckpoint:
+    """
+    Comment pages of one post fetched so far, kept in
+    CHECKPOINT_DIR/{post_type}/{post_id}.comments.jsonl. One line is
+    appended (and synced) per page once all its comments have their
+    replies:
+
+        {"cursor": <next page or null>, "post_info": ..., "comments": [...]}
+
+    A line cut off by a crash (unparsable or missing its newline) is
+    dropped when the file is reopened with resume, so the checkpoint
+    always ends at a whole page. A null cursor
+    means the last page was reached.
+    """
+
+    def __init__(self, post_type, post_id, resume=False):
+        self.path = _checkpoint_path(post_type, f"{post_id}.comments.jsonl")
+        self.pages = 0
+        self.cursor = None
+        self.post_info = None
+        self.done = False
+        if resume:
+            self._load()
+        else:
+            _remove(self.path)
+
+    def _load(self):
+        valid = 0
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    # A page counts once its newline is written: a crash can
+                    # leave a line that parses but is still unterminated
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        page = json.loads(line)
+                    except ValueError:
+                        break
+                    valid += len(line)
+                    self.pages += 1
+                    self.cursor = page.get("cursor")
+                    self.post_info = page.get("post_info") or self.post_info
+                    self.done = not self.cursor
+        except FileNotFoundError:
+            return
+        # Cut a torn last line so later pages are appended after a whole one
+        with open(self.path, "r+b") as f:
+            f.truncate(valid)
+
+    def saved_pages(self):
+        """(next_cursor, comments) of every checkpointed page, in order (read lazily)"""
+        if not self.pages:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                page = json.loads(line)
+                yield page.get("cursor"), page["comments"]
+
+    def add_page(self, next_cursor, post_info, comments):
+        line = json.dumps({"cursor": next_cursor, "post_info": post_info, "comments": comments},
+                          ensure_ascii=False, separators=(",", ":"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pages += 1
+        self.cursor = next_cursor
+        self.post_info = post_info or self.post_info
+        self.done = not next_cursor
+
+    def clear(self):
+        _remove(self.path)
@@ -1,7 +1,9 @@
-import requests
+import base64
 import json
-import time
 import os
+from retry_policy import retry_request
+from field_paths import COMMENTS_BLOCK_PATHS, REPLY_COUNT_PATHS, REPLY_EDGES_PATHS
+from scrape_context import ScrapeContext
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -25,57 +27,13 @@ FB_DTSG = ""
 if PROXY:
     print(f"Using proxy: {PROXY}")
 
-# ========= RETRY HELPER =========
-def retry_request(url, headers, data, proxies, cookies=None, max_retries=5):
-    """Make a POST request with retry logic"""
-    global PROXIES
-    from proxy_utils import rotate_static_proxy, is_proxy_infra_error, is_ip_blocked
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            r = requests.post(url, headers=headers, data=data, proxies=proxies, cookies=cookies, timeout=30)
-            if r.status_code == 200:
-                return r
-            if is_proxy_infra_error(status_code=r.status_code):
-                print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy auth failed (HTTP {r.status_code}) — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            elif is_ip_blocked(status_code=r.status_code, response_text=r.text):
-                print(f"  🛑 Attempt {attempt}/{max_retries}: Facebook blocked this IP (HTTP {r.status_code}) — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            else:
-                print(f"  ⚠️ Attempt {attempt}/{max_retries}: Status {r.status_code}")
-        except requests.exceptions.ProxyError as e:
-            print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy unreachable — rotating static proxy...")
-            new_p = rotate_static_proxy()
-            if new_p:
-                proxies = new_p
-                PROXIES = new_p
-        except Exception as e:
-            if is_proxy_infra_error(exc=e):
-                print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy connection error — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            else:
-                print(f"  ⚠️ Attempt {attempt}/{max_retries}: {str(e)}")
-
-        if attempt < max_retries:
-            wait_time = attempt * 2
-            print(f"  ⏳ Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
-
-    raise Exception(f"Failed after {max_retries} attempts")
+def default_context(cookies=None):
+    """Build a ScrapeContext from this module's globals (legacy callers)"""
+    return ScrapeContext(cookies=cookies, fb_dtsg=FB_DTSG, proxies=PROXIES)
 
 # ===== PAYLOADS =====
 
-def comments_payload(feedback_id, cursor=None, cookies=None):
+def comments_payload(feedback_id, cursor=None, cookies=None, fb_dtsg=None):
     # Extract user ID from cookies if available
     user_id = "0"
     if cookies and "c_user" in cookies:
@@ -85,7 +43,7 @@ def comments_payload(feedback_id, cursor=None, cookies=None):
         "av": user_id,
         "__user": user_id,
         "__a": "1",
-        "fb_dtsg": FB_DTSG if FB_DTSG else "",
+        "fb_dtsg": fb_dtsg if fb_dtsg is not None else FB_DTSG,
         "fb_api_caller_class": "RelayModern",
         "server_timestamps": "true",
         "doc_id": "27806180149070312",
@@ -108,7 +66,7 @@ def comments_payload(feedback_id, cursor=None, cookies=None):
     }
 
 
-def replies_payload(comment_feedback_id, expansion_token, cookies=None):
+def replies_payload(comment_feedback_id, expansion_token, cookies=None, fb_dtsg=None):
     # Extract user ID from cookies if available
     user_id = "0"
     if cookies and "c_user" in cookies:
@@ -118,7 +76,7 @@ def replies_payload(comment_feedback_id, expansion_token, cookies=None):
         "av": user_id,
         "__user": user_id,
         "__a": "1",
-        "fb_dtsg": FB_DTSG if FB_DTSG else "",
+        "fb_dtsg": fb_dtsg if fb_dtsg is not None else FB_DTSG,
         "fb_api_caller_class": "RelayModern",
         "server_timestamps": "true",
         "doc_id": "26570577339199586",
@@ -161,116 +119,73 @@ def fb_json(response_text):
     return json.loads(first)
 
 
-def fetch_comments(feedback_id, cookies=None):
-    results = []
-    cursor = None
-    response_count = 0
-    post_info = None  # Store parent post info from first response
+def extract_post_info(comment_node):
+    """Extract the parent post story id and first media id from a comment node"""
+    parent_post_story = comment_node.get("parent_post_story", {})
+    if not parent_post_story:
+        return None
 
-    while True:
-        headers = {**BASE_HEADERS, "x-fb-friendly-name": "CommentsListComponentsPaginationQuery"}
-        r = retry_request(
-            GRAPHQL,
-            headers,
-            comments_payload(feedback_id, cursor, cookies),
-            PROXIES,
-            cookies=cookies
-        )
-        j = fb_json(r.text)
-        
-        # Save each JSON response for inspection
-        response_count += 1
-        # with open(f"response_{response_count}.json", "w", encoding="utf-8") as f:
-        #     json.dump(j, f, ensure_ascii=False, indent=2)
-        # print(f"💾 Saved response_{response_count}.json")
-        
-        comments_block = (
-            j.get("data", {})
-             .get("node", {})
-             .get("comment_rendering_instance_for_feed_location", {})
-             .get("comments", {})
-        )
+    post_info = {
+        "post_story_id": parent_post_story.get("id"),
+        "media_id": None
+    }
 
-        edges = comments_block.get("edges", [])
-        if not edges:
-            break
+    # Extract first media ID
+    attachments = parent_post_story.get("attachments", [])
+    for attachment in attachments:
+        media = attachment.get("media", {})
+        if media and media.get("id"):
+            post_info["media_id"] = media.get("id")
+            break  # Only get first one
 
-        for e in edges:
-            n = e["node"]
-            fb = n["feedback"]
-
-            # Extract parent_post_story info from first response
-            if response_count == 1 and post_info is None:
-                parent_post_story = n.get("parent_post_story", {})
-                
-                if parent_post_story:
-                    post_info = {
-                        "post_story_id": parent_post_story.get("id"),
-                        "media_id": None
-                    }
-                    
-                    # Extract first media ID
-                    attachments = parent_post_story.get("attachments", [])
-                    for attachment in attachments:
-                        media = attachment.get("media", {})
-                        if media and media.get("id"):
-                            post_info["media_id"] = media.get("id")
-                            break  # Only get first one
-                    
-                    print(f"📎 Extracted post info: {post_info}")
-
-            # Extract reaction count
-            reactors = fb.get("reactors", {})
-            total_reactions = reactors.get("count_reduced", "0")
-            
-            results.append({
-                # "comment_id": n["legacy_fbid"],
-                # "author": n["author"]["name"],
-                "text": (n.get("body") or {}).get("text", ""),
-                "reaction_count": total_reactions,
-                "_feedback_id": fb["id"],  # Internal use only (for fetching replies)
-                "_expansion_token": fb["expansion_info"]["expansion_token"]  # Internal use only
-            })
-
-        cursor = comments_block.get("page_info", {}).get("end_cursor")
-        #break
-        if not cursor:
-            break
+    return post_info
 
-        #time.sleep(0.4)
 
-    return results, post_info
+def parse_comments_page(j):
+    """
+    Parse one CommentsListComponentsPaginationQuery response.
+    Returns (page_comments, edges, next_cursor).
+    """
+    comments_block = COMMENTS_BLOCK_PATHS.get(j) or {}
 
-# ===== FETCH REPLIES =====
+    edges = comments_block.get("edges", [])
+    page_comments = []
+    for e in edges:
+        n = e["node"]
+        fb = n["feedback"]
 
-def fetch_replies(comment, cookies=None):
-    headers = {**BASE_HEADERS, "x-fb-friendly-name": "Depth1CommentsListPaginationQuery"}
-    r = retry_request(
-        GRAPHQL,
-        headers,
-        replies_payload(comment["_feedback_id"], comment["_expansion_token"], cookies),
-        PROXIES,
-        cookies=cookies
-    )
+        # Extract reaction count
+        reactors = fb.get("reactors", {})
+        total_reactions = reactors.get("count_reduced", "0")
+
+        page_comments.append({
+            # "comment_id": n["legacy_fbid"],
+            # "author": n["author"]["name"],
+            "text": (n.get("body") or {}).get("text", ""),
+            "reaction_count": total_reactions,
+            "_feedback_id": fb["id"],  # Internal use only (for fetching replies)
+            "_expansion_token": (fb.get("expansion_info") or {}).get("expansion_token"),  # Internal use only
+            "_reply_count": REPLY_COUNT_PATHS.get(fb)  # Internal use only (None = not in the response)
+        })
+
+    cursor = comments_block.get("page_info", {}).get("end_cursor")
+    return page_comments, edges, cursor
 
-    j = fb_json(r.text)
+
+def parse_replies(j):
+    """Parse one Depth1CommentsListPaginationQuery response into reply dicts"""
     replies = []
 
-    edges = (
-        j.get("data", {})
-         .get("node", {})
-         .get("replies_connection", {})
-         .get("edges", [])
-    )
+    edges = REPLY_EDGES_PATHS.get(j) or []
 
     for e in edges:
         n = e["node"]
         fb = n.get("feedback", {})
-        
+
         # Extract reaction count
         reactors = fb.get("reactors", {})
         total_reactions = reactors.get("count_reduced", "0")
-        
+
         replies.append({
             # "reply_id": n["legacy_fbid"],
             # "author": n["author"]["name"],
@@ -280,6 +195,122 @@ def fetch_replies(comment, cookies=None):
 
     return replies
 
+
+def convert_post_id_to_feedback_id(post_id):
+    """Convert post_id to feedback_id using base64 encoding"""
+    feedback_id = base64.b64encode(f"feedback:{post_id}".encode()).decode()
+    return feedback_id
+
+
+def parse_json_body(body):
+    """fb_json for a raw response body (bytes); for retry_request(parse=...)"""
+    return fb_json(body.decode("utf-8", errors="replace"))
+
+
+def read_comments_page(j, post_info=None, first_page=False):
+    """
+    (page_comments, post_info, next_cursor) of one parsed comments
+    response, or None when it has no comments. On the first page the
+    parent post info is extracted from the comments; later pages pass
+    the post_info found then. Shared by iter_comment_pages and
+    async_engine.fetch_comments.
+    """
+    page_comments, edges, next_cursor = parse_comments_page(j or {})
+    if not edges:
+        return None
+    if first_page:
+        for e in edges:
+            post_info = extract_post_info(e["node"])
+            if post_info:
+                print(f"📎 Extracted post info: {post_info}")
+                break
+    return page_comments, post_info, next_cursor
+
+
+def iter_comment_pages(feedback_id, cookies=None, ctx=None, cursor=None):
+    """
+    Yield (page_comments, post_info, next_cursor) for each page of
+    top-level comments, following the cursor. Only one page is held at a
+    time; post_info is the parent post info from the first page (None if
+    it has none); next_cursor is None on the last page.
+    ctx: ScrapeContext with cookies, fb_dtsg and proxy (defaults to module globals).
+    cursor: start after this page instead of at the first one (resuming).
+    """
+    ctx = ctx or default_context(cookies)
+    post_info = None  # Parent post info from the first response
+    first_page = True
+    headers = {**BASE_HEADERS, "x-fb-friendly-name": "CommentsListComponentsPaginationQuery"}
+
+    while True:
+        # Bodies that are not JSON (checkpoint pages, cut-off responses) are retried
+        j = retry_request(
+            GRAPHQL,
+            headers,
+            comments_payload(feedback_id, cursor, ctx.cookies, ctx.fb_dtsg),
+            ctx,
+            parse=parse_json_body
+        )
+
+        page = read_comments_page(j, post_info, first_page)
+        if page is None:
+            break
+        first_page = False
+        page_comments, post_info, next_cursor = page
+        yield page
+
+        cursor = next_cursor
+        if not cursor:
+            break
+
+
+def fetch_comments(feedback_id, cookies=None, on_page=None, ctx=None):
+    """
+    Fetch every top-level comment of a post, following the cursor.
+
+    on_page: optional callback(page_comments) called with each page of
+    comments as soon as it is parsed, before the next page is requested,
+    so callers can start fetching replies while pagination continues.
+    ctx: ScrapeContext with cookies, fb_dtsg and proxy (defaults to module globals).
+    Holds every comment in memory; use iter_comment_pages for large posts.
+    """
+    results = []
+    post_info = None
+    for page_comments, post_info, _ in iter_comment_pages(feedback_id, cookies, ctx):
+        results.extend(page_comments)
+        if on_page:
+            on_page(page_comments)
+
+    return results, post_info
+
+# ===== FETCH REPLIES =====
+
+def has_replies(comment):
+    """
+    Whether a reply request for this comment can return anything: its
+    feedback reports replies, or carries no count but can be expanded
+    """
+    if not comment.get("_expansion_token"):
+        return False
+    count = comment.get("_reply_count")
+    return count is None or count > 0
+
+
+def fetch_replies(comment, cookies=None, ctx=None):
+    """Replies of one comment from parse_comments_page; [] without a request when it has none"""
+    if not has_replies(comment):
+        return []
+    ctx = ctx or default_context(cookies)
+    headers = {**BASE_HEADERS, "x-fb-friendly-name": "Depth1CommentsListPaginationQuery"}
+    j = retry_request(
+        GRAPHQL,
+        headers,
+        replies_payload(comment["_feedback_id"], comment["_expansion_token"], ctx.cookies, ctx.fb_dtsg),
+        ctx,
+        parse=parse_json_body
+    )
+
+    return parse_replies(j or {})
+
 # ===== RUN =====
 
 if __name__ == "__main__":
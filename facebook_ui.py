@@ -1,27 +1,25 @@
 import sys
 import os
 import json
-import time
 import re
-import requests
 from urllib.parse import parse_qs
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                              QTextEdit, QComboBox, QSpinBox, QTabWidget,
                              QProgressBar, QGroupBox, QMessageBox, QDialog,
-                             QDialogButtonBox, QFrame)
+                             QDialogButtonBox, QFrame, QCheckBox)
 from PyQt6.QtCore import QThread, pyqtSignal, Qt
 from PyQt6.QtGui import QFont, QTextCursor
 
 # Import scraper modules
 from main import (extract_user_id_from_url, extract_group_id_from_url, 
-                 extract_post_id_from_url, fetch_comments_for_post, save_post_data)
+                 extract_post_id_from_url, save_post_comments)
 from post_scraper import fetch_posts as fetch_page_posts
 from group_post_scraper_v2 import fetch_posts as fetch_group_posts
-import post_scraper
-import group_post_scraper_v2
 import single_post_image
-import comment_scraper
+from scrape_context import ScrapeContext
+from multi_target import crawl_targets, PARALLEL_TARGETS
+from checkpoints import FeedCheckpoint
 from proxy_utils import select_proxy
 
 
@@ -365,13 +363,14 @@ class ScraperThread(QThread):
         self.params = params
         self.cookies = cookies  # Cookie dictionary
         self.fb_dtsg = fb_dtsg  # FB_DTSG token
+        self.proxies = None  # Chosen in _apply_proxy()
     
     def log(self, message):
         """Emit log message"""
         self.log_signal.emit(message)
 
     def _apply_proxy(self):
-        """Select the right proxy type and push it to all scraper modules."""
+        """Select the right proxy type for this job."""
         has_cookies = bool(self.cookies)
         proxies = select_proxy(has_cookies)
 
@@ -388,11 +387,12 @@ class ScraperThread(QThread):
         else:
             self.log("⚠️  No proxy configured")
 
-        # Push to all scraper modules
-        comment_scraper.PROXIES     = proxies
-        post_scraper.PROXIES        = proxies
-        group_post_scraper_v2.PROXIES = proxies
-        single_post_image.PROXIES   = proxies
+        self.proxies = proxies
+
+    def _new_context(self, target_id=None):
+        """Fresh per-target ScrapeContext carrying this job's cookies, dtsg and proxy"""
+        return ScrapeContext(target_id=target_id, cookies=self.cookies,
+                             fb_dtsg=self.fb_dtsg, proxies=self.proxies)
 
     def run(self):
         """Run the scraping task"""
@@ -413,23 +413,16 @@ class ScraperThread(QThread):
         """Scrape one or more posts"""
         urls = self.params['urls']  # List of URLs
         
-        # Set FB_DTSG for comment and image scrapers
-        if self.fb_dtsg:
-            comment_scraper.FB_DTSG = self.fb_dtsg
-            single_post_image.FB_DTSG = self.fb_dtsg
-        else:
-            comment_scraper.FB_DTSG = ""
-            single_post_image.FB_DTSG = ""
-        
         total = len(urls)
         self.progress_signal.emit(0, total)
         
         for i, url in enumerate(urls, 1):
             self.log(f"\n[{i}/{total}] Processing URL: {url}")
+            ctx = self._new_context()
             
             # Extract post ID from URL
             self.log(f"  Extracting post ID...")
-            post_id = extract_post_id_from_url(url, cookies=self.cookies)
+            post_id = extract_post_id_from_url(url, cookies=self.cookies, ctx=ctx)
             
             if not post_id:
                 self.log(f"  ❌ Could not extract post ID from URL")
@@ -440,16 +433,16 @@ class ScraperThread(QThread):
             
             try:
                 self.log(f"  Fetching comments...")
-                comments, post_info = fetch_comments_for_post(post_id, cookies=self.cookies)
-                
-                # Save data
                 post_data = {
                     "post_id": post_id,
                     "type": "simple_post",
-                    "post_info": post_info
+                    "post_info": None  # filled in from the comments
                 }
                 
-                save_post_data("simple_post", post_id, post_data, comments)
+                # Comments are written as they are fetched
+                save_post_comments("simple_post", post_id, post_data, ctx=ctx,
+                                   resume=self.params.get('resume', False))
+                post_info = post_data["post_info"]
                 self.log(f"  💾 Saved to simple_post/{post_id}/{post_id}.json")
             except Exception as e:
                 self.log(f"  ❌ Error processing post {post_id}: {e}")
@@ -471,14 +464,12 @@ class ScraperThread(QThread):
                     while current_node and current_node not in visited:
                         visited.add(current_node)
                         
-                        payload = single_post_image.build_payload(current_node, post_id, self.cookies)
-                        r = requests.post(single_post_image.GRAPHQL_URL, 
-                                        headers=single_post_image.HEADERS, 
-                                        data=payload, 
-                                        cookies=self.cookies,
-                                        proxies=single_post_image.PROXIES)
+                        payload = single_post_image.build_payload(current_node, post_id, ctx.cookies, ctx.fb_dtsg)
+                        r = ctx.post(single_post_image.GRAPHQL_URL, 
+                                     headers=single_post_image.HEADERS, 
+                                     data=payload)
                         
-                        cleaned_blocks = single_post_image.process_raw_graphql(r.text)
+                        cleaned_blocks = single_post_image.process_raw_graphql(r.content)
                         if not cleaned_blocks:
                             break
                         
@@ -491,7 +482,7 @@ class ScraperThread(QThread):
                         
                         if image_url:
                             image_count += 1
-                            filename = single_post_image.download_image(image_url, image_folder, post_id, image_count)
+                            filename = single_post_image.download_image(image_url, image_folder, post_id, image_count, ctx=ctx)
                             if filename:
                                 self.log(f"    ✓ Downloaded {filename}")
                         
@@ -515,161 +506,174 @@ class ScraperThread(QThread):
                     self.log(f"  ⚠️ Error fetching images: {e}")
             
             self.progress_signal.emit(i, total)
-            time.sleep(1)  # Be nice to the server
         
         self.finished_signal.emit(True, f"Successfully scraped {total} post(s)")
     
     def scrape_page_posts(self):
-        """Scrape posts from one or more pages"""
+        """Scrape posts from one or more pages (several at once when parallel > 1)"""
         urls = self.params['urls']  # List of URLs
-        count = self.params['count']
+        parallel = self.params.get('parallel', 1)
         
         total_pages = len(urls)
-        all_posts_count = 0
+        if parallel > 1 and total_pages > 1:
+            self.log(f"Crawling up to {parallel} pages at once")
+        
+        # target_id starts as the URL and is replaced by the extracted page ID
+        contexts = [self._new_context(url) for url in urls]
+        results = crawl_targets(
+            contexts,
+            lambda ctx: self._scrape_page(ctx, contexts.index(ctx) + 1, total_pages),
+            parallel=parallel
+        )
+        all_posts_count = sum(result or 0 for _, result, _ in results)
         
-        for page_num, url in enumerate(urls, 1):
-            self.log(f"\n[Page {page_num}/{total_pages}] Processing URL: {url}")
+        self.finished_signal.emit(True, f"Successfully scraped {all_posts_count} posts from {total_pages} page(s)")
+    
+    def _scrape_page(self, ctx, page_num, total_pages):
+        """Scrape one page URL with its own context; returns the number of posts"""
+        url = ctx.target_id
+        count = self.params['count']
+        self.log(f"\n[Page {page_num}/{total_pages}] Processing URL: {url}")
+        
+        # Extract page ID from URL
+        self.log(f"  Extracting page ID...")
+        page_id = extract_user_id_from_url(url, cookies=self.cookies, ctx=ctx)
+        
+        if not page_id:
+            self.log(f"  ❌ Could not extract page ID from URL")
+            return 0
+        
+        self.log(f"  ✅ Extracted Page ID: {page_id}")
+        
+        try:
+            # Per-page context (target id, cookies, fb_dtsg, proxy, page name)
+            ctx.target_id = page_id
             
-            # Extract page ID from URL
-            self.log(f"  Extracting page ID...")
-            page_id = extract_user_id_from_url(url, cookies=self.cookies)
+            min_comments = self.params.get('min_comments', 0)
+            batch_size = 2  # Process in batches of 10
             
-            if not page_id:
-                self.log(f"  ❌ Could not extract page ID from URL")
-                continue
+            # Define callback to process each batch
+            def process_batch(batch_posts, total_so_far, total_limit):
+                self.log(f"  Processing batch of {len(batch_posts)} posts ({total_so_far}/{total_limit})...")
+                for i, post in enumerate(batch_posts, 1):
+                    post_id = post.get("post_id")
+                    if not post_id:
+                        self.log(f"    [{i}/{len(batch_posts)}] ⚠️ Skipping post with no ID")
+                        continue
+                    
+                    self.log(f"    [{i}/{len(batch_posts)}] Processing post {post_id}...")
+                    
+                    try:
+                        # The post is saved even if comments fail (with those fetched so far)
+                        save_post_comments("page_post", post_id, post, ctx=ctx, resume=resume)
+                        checkpoint.post_done(post_id)
+                        self.log(f"      ✓ Saved to page_post/{post_id}/{post_id}.json")
+                    except Exception as e:
+                        self.log(f"      ❌ Error fetching comments: {e}")
             
-            self.log(f"  ✅ Extracted Page ID: {page_id}")
+            # Feed position and unsaved posts are checkpointed as the crawl goes
+            resume = self.params.get('resume', False)
+            checkpoint = FeedCheckpoint("page_post", page_id, resume)
+            leftover = list(checkpoint.pending)
+            if leftover:
+                self.log(f"  ↩️ Finishing {len(leftover)} posts left over from the interrupted crawl...")
+                process_batch(leftover, len(leftover), count)
             
-            try:
-                # Update the USER_ID in post_scraper
-                post_scraper.USER_ID = page_id
-                post_scraper.BASE_HEADERS["referer"] = f"https://www.facebook.com/profile.php?id={page_id}"
-                
-                # Update cookies and fb_dtsg in post_scraper if provided
-                if self.cookies:
-                    post_scraper.COOKIES = self.cookies
-                else:
-                    post_scraper.COOKIES = {}
-                
-                if self.fb_dtsg:
-                    post_scraper.FB_DTSG = self.fb_dtsg
-                    comment_scraper.FB_DTSG = self.fb_dtsg
-                else:
-                    post_scraper.FB_DTSG = ""
-                    comment_scraper.FB_DTSG = ""
-                
-                min_comments = self.params.get('min_comments', 0)
-                batch_size = 2  # Process in batches of 10
-                
-                # Define callback to process each batch
-                def process_batch(batch_posts, total_so_far, total_limit):
-                    self.log(f"  Processing batch of {len(batch_posts)} posts ({total_so_far}/{total_limit})...")
-                    for i, post in enumerate(batch_posts, 1):
-                        post_id = post.get("post_id")
-                        if not post_id:
-                            self.log(f"    [{i}/{len(batch_posts)}] ⚠️ Skipping post with no ID")
-                            continue
-                        
-                        self.log(f"    [{i}/{len(batch_posts)}] Processing post {post_id}...")
-                        
-                        try:
-                            comments, _ = fetch_comments_for_post(post_id, cookies=self.cookies)
-                            save_post_data("page_post", post_id, post, comments)
-                            self.log(f"      ✓ Saved to page_post/{post_id}/{post_id}.json")
-                            time.sleep(1)  # Be nice to the server
-                        except Exception as e:
-                            self.log(f"      ❌ Error fetching comments: {e}")
-                            # Save post data even if comments fail
-                            save_post_data("page_post", post_id, post, [])
-                
-                self.log(f"  Fetching {count} posts from page {page_id} (batch size: {batch_size})...")
-                posts = fetch_page_posts(count, min_comments, batch_size=batch_size, on_batch_complete=process_batch)
-                
-                self.log(f"  ✓ Completed: {len(posts)} posts processed")
-                
-                all_posts_count += len(posts)
-                
-            except Exception as e:
-                self.log(f"  ❌ Error processing page: {e}")
-                continue
-        
-        self.finished_signal.emit(True, f"Successfully scraped {all_posts_count} posts from {total_pages} page(s)")
+            self.log(f"  Fetching {count} posts from page {page_id} (batch size: {batch_size})...")
+            posts = fetch_page_posts(count, min_comments, batch_size=batch_size, on_batch_complete=process_batch, ctx=ctx,
+                                     checkpoint=checkpoint)
+            if not checkpoint.pending:
+                checkpoint.clear()
+            
+            self.log(f"  ✓ Completed: {len(leftover) + len(posts)} posts processed")
+            return len(leftover) + len(posts)
+            
+        except Exception as e:
+            self.log(f"  ❌ Error processing page: {e}")
+            return 0
     
     def scrape_group_posts(self):
-        """Scrape posts from one or more groups"""
+        """Scrape posts from one or more groups (several at once when parallel > 1)"""
         urls = self.params['urls']  # List of URLs
-        count = self.params['count']
+        parallel = self.params.get('parallel', 1)
         
         total_groups = len(urls)
-        all_posts_count = 0
+        if parallel > 1 and total_groups > 1:
+            self.log(f"Crawling up to {parallel} groups at once")
+        
+        # target_id starts as the URL and is replaced by the extracted group ID
+        contexts = [self._new_context(url) for url in urls]
+        results = crawl_targets(
+            contexts,
+            lambda ctx: self._scrape_group(ctx, contexts.index(ctx) + 1, total_groups),
+            parallel=parallel
+        )
+        all_posts_count = sum(result or 0 for _, result, _ in results)
+        
+        self.finished_signal.emit(True, f"Successfully scraped {all_posts_count} posts from {total_groups} group(s)")
+    
+    def _scrape_group(self, ctx, group_num, total_groups):
+        """Scrape one group URL with its own context; returns the number of posts"""
+        url = ctx.target_id
+        count = self.params['count']
+        self.log(f"\n[Group {group_num}/{total_groups}] Processing URL: {url}")
+        
+        # Extract group ID from URL
+        self.log(f"  Extracting group ID...")
+        group_id = extract_group_id_from_url(url, cookies=self.cookies, ctx=ctx)
+        
+        if not group_id:
+            self.log(f"  ❌ Could not extract group ID from URL")
+            return 0
+        
+        self.log(f"  ✅ Extracted Group ID: {group_id}")
         
-        for group_num, url in enumerate(urls, 1):
-            self.log(f"\n[Group {group_num}/{total_groups}] Processing URL: {url}")
+        try:
+            # Per-group context (target id, cookies, fb_dtsg, proxy, group name)
+            ctx.target_id = group_id
             
-            # Extract group ID from URL
-            self.log(f"  Extracting group ID...")
-            group_id = extract_group_id_from_url(url, cookies=self.cookies)
+            min_comments = self.params.get('min_comments', 0)
+            batch_size = 2  # Process in batches of 10
             
-            if not group_id:
-                self.log(f"  ❌ Could not extract group ID from URL")
-                continue
+            # Define callback to process each batch
+            def process_batch(batch_posts, total_so_far, total_limit):
+                self.log(f"  Processing batch of {len(batch_posts)} posts ({total_so_far}/{total_limit})...")
+                for i, post in enumerate(batch_posts, 1):
+                    post_id = post.get("post_id")
+                    if not post_id:
+                        self.log(f"    [{i}/{len(batch_posts)}] ⚠️ Skipping post with no ID")
+                        continue
+                    
+                    self.log(f"    [{i}/{len(batch_posts)}] Processing post {post_id}...")
+                    
+                    try:
+                        # The post is saved even if comments fail (with those fetched so far)
+                        save_post_comments("group_post", post_id, post, ctx=ctx, resume=resume)
+                        checkpoint.post_done(post_id)
+                        self.log(f"      ✓ Saved to group_post/{post_id}/{post_id}.json")
+                    except Exception as e:
+                        self.log(f"      ❌ Error fetching comments: {e}")
             
-            self.log(f"  ✅ Extracted Group ID: {group_id}")
+            # Feed position and unsaved posts are checkpointed as the crawl goes
+            resume = self.params.get('resume', False)
+            checkpoint = FeedCheckpoint("group_post", group_id, resume)
+            leftover = list(checkpoint.pending)
+            if leftover:
+                self.log(f"  ↩️ Finishing {len(leftover)} posts left over from the interrupted crawl...")
+                process_batch(leftover, len(leftover), count)
             
-            try:
-                # Update the GROUP_ID in group_post_scraper_v2
-                group_post_scraper_v2.GROUP_ID = group_id
-                group_post_scraper_v2.HEADERS["referer"] = f"https://www.facebook.com/groups/{group_id}/"
-                
-                # Update cookies and fb_dtsg in group_post_scraper_v2 if provided
-                if self.cookies:
-                    group_post_scraper_v2.COOKIES = self.cookies
-                else:
-                    group_post_scraper_v2.COOKIES = {}
-                
-                if self.fb_dtsg:
-                    group_post_scraper_v2.FB_DTSG = self.fb_dtsg
-                    comment_scraper.FB_DTSG = self.fb_dtsg
-                else:
-                    group_post_scraper_v2.FB_DTSG = ""
-                    comment_scraper.FB_DTSG = ""
-                
-                min_comments = self.params.get('min_comments', 0)
-                batch_size = 2  # Process in batches of 10
-                
-                # Define callback to process each batch
-                def process_batch(batch_posts, total_so_far, total_limit):
-                    self.log(f"  Processing batch of {len(batch_posts)} posts ({total_so_far}/{total_limit})...")
-                    for i, post in enumerate(batch_posts, 1):
-                        post_id = post.get("post_id")
-                        if not post_id:
-                            self.log(f"    [{i}/{len(batch_posts)}] ⚠️ Skipping post with no ID")
-                            continue
-                        
-                        self.log(f"    [{i}/{len(batch_posts)}] Processing post {post_id}...")
-                        
-                        try:
-                            comments, _ = fetch_comments_for_post(post_id, cookies=self.cookies)
-                            save_post_data("group_post", post_id, post, comments)
-                            self.log(f"      ✓ Saved to group_post/{post_id}/{post_id}.json")
-                            time.sleep(1)  # Be nice to the server
-                        except Exception as e:
-                            self.log(f"      ❌ Error fetching comments: {e}")
-                            # Save post data even if comments fail
-                            save_post_data("group_post", post_id, post, [])
-                
-                self.log(f"  Fetching {count} posts from group {group_id} (batch size: {batch_size})...")
-                posts = fetch_group_posts(count, min_comments, batch_size=batch_size, on_batch_complete=process_batch)
-                
-                self.log(f"  ✓ Completed: {len(posts)} posts processed")
-                
-                all_posts_count += len(posts)
-                
-            except Exception as e:
-                self.log(f"  ❌ Error processing group: {e}")
-                continue
-        
-        self.finished_signal.emit(True, f"Successfully scraped {all_posts_count} posts from {total_groups} group(s)")
+            self.log(f"  Fetching {count} posts from group {group_id} (batch size: {batch_size})...")
+            posts = fetch_group_posts(count, min_comments, batch_size=batch_size, on_batch_complete=process_batch, ctx=ctx,
+                                      checkpoint=checkpoint)
+            if not checkpoint.pending:
+                checkpoint.clear()
+            
+            self.log(f"  ✓ Completed: {len(leftover) + len(posts)} posts processed")
+            return len(leftover) + len(posts)
+            
+        except Exception as e:
+            self.log(f"  ❌ Error processing group: {e}")
+            return 0
 
 
 class FacebookScraperUI(QMainWindow):
@@ -760,6 +764,11 @@ class FacebookScraperUI(QMainWindow):
         self.simple_post_urls.setMaximumHeight(100)
         input_layout.addWidget(self.simple_post_urls)
         
+        # Resume from checkpoints
+        self.simple_resume = QCheckBox("Resume interrupted crawl")
+        self.simple_resume.setToolTip("Continue each post from the comment pages an interrupted run already fetched.")
+        input_layout.addWidget(self.simple_resume)
+        
         layout.addWidget(input_group)
         
         # Scrape button
@@ -819,6 +828,24 @@ class FacebookScraperUI(QMainWindow):
         comment_layout.addStretch()
         input_layout.addLayout(comment_layout)
         
+        # Parallel targets
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(QLabel("Pages crawled in parallel:"))
+        self.page_parallel = QSpinBox()
+        self.page_parallel.setMinimum(1)
+        self.page_parallel.setMaximum(64)
+        self.page_parallel.setValue(PARALLEL_TARGETS)
+        self.page_parallel.setToolTip("How many pages from the URL list are scraped at the same time.")
+        parallel_layout.addWidget(self.page_parallel)
+        parallel_layout.addStretch()
+        input_layout.addLayout(parallel_layout)
+        
+        # Resume from checkpoints
+        self.page_resume = QCheckBox("Resume interrupted crawl")
+        self.page_resume.setToolTip("Continue each page from where an interrupted run stopped: its feed position, "
+                                      "unsaved posts and fetched comment pages.")
+        input_layout.addWidget(self.page_resume)
+        
         layout.addWidget(input_group)
         
         # Scrape button
@@ -878,6 +905,24 @@ class FacebookScraperUI(QMainWindow):
         comment_layout.addStretch()
         input_layout.addLayout(comment_layout)
         
+        # Parallel targets
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(QLabel("Groups crawled in parallel:"))
+        self.group_parallel = QSpinBox()
+        self.group_parallel.setMinimum(1)
+        self.group_parallel.setMaximum(64)
+        self.group_parallel.setValue(PARALLEL_TARGETS)
+        self.group_parallel.setToolTip("How many groups from the URL list are scraped at the same time.")
+        parallel_layout.addWidget(self.group_parallel)
+        parallel_layout.addStretch()
+        input_layout.addLayout(parallel_layout)
+        
+        # Resume from checkpoints
+        self.group_resume = QCheckBox("Resume interrupted crawl")
+        self.group_resume.setToolTip("Continue each group from where an interrupted run stopped: its feed position, "
+                                      "unsaved posts and fetched comment pages.")
+        input_layout.addWidget(self.group_resume)
+        
         layout.addWidget(input_group)
         
         # Scrape button
@@ -906,7 +951,7 @@ class FacebookScraperUI(QMainWindow):
         
         # Start scraping in background thread
         self.log(f"Starting simple post scraper for {len(urls)} URL(s)...")
-        params = {'urls': urls}
+        params = {'urls': urls, 'resume': self.simple_resume.isChecked()}
         self.start_scraping("simple_post", params)
     
     def scrape_page_posts(self):
@@ -914,6 +959,8 @@ class FacebookScraperUI(QMainWindow):
         urls_text = self.page_urls.toPlainText().strip()
         count = self.page_post_count.value()
         min_comments = self.page_min_comments.value()
+        parallel = self.page_parallel.value()
+        resume = self.page_resume.isChecked()
         
         if not urls_text:
             self.show_error("Please enter page URLs")
@@ -929,7 +976,8 @@ class FacebookScraperUI(QMainWindow):
         # Start scraping in background thread
         comment_filter_msg = f" with min {min_comments} comments" if min_comments > 0 else ""
         self.log(f"Starting page posts scraper for {len(urls)} page(s) (fetching {count} posts each{comment_filter_msg})...")
-        params = {'urls': urls, 'count': count, 'min_comments': min_comments}
+        params = {'urls': urls, 'count': count, 'min_comments': min_comments, 'parallel': parallel,
+                  'resume': resume}
         self.start_scraping("page_posts", params)
     
     def scrape_group_posts(self):
@@ -937,6 +985,8 @@ class FacebookScraperUI(QMainWindow):
         urls_text = self.group_urls.toPlainText().strip()
         count = self.group_post_count.value()
         min_comments = self.group_min_comments.value()
+        parallel = self.group_parallel.value()
+        resume = self.group_resume.isChecked()
         
         if not urls_text:
             self.show_error("Please enter group URLs")
@@ -952,7 +1002,8 @@ class FacebookScraperUI(QMainWindow):
         # Start scraping in background thread
         comment_filter_msg = f" with min {min_comments} comments" if min_comments > 0 else ""
         self.log(f"Starting group posts scraper for {len(urls)} group(s) (fetching {count} posts each{comment_filter_msg})...")
-        params = {'urls': urls, 'count': count, 'min_comments': min_comments}
+        params = {'urls': urls, 'count': count, 'min_comments': min_comments, 'parallel': parallel,
+                  'resume': resume}
         self.start_scraping("group_posts", params)
     
     def start_scraping(self, scraper_type, params):
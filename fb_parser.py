@@ -0,0 +1,150 @@
+import json
+
+# orjson is optional: when installed, newline-separated documents are
+# decoded with it straight from bytes
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FOR_LOOP_PREFIX = "for (;;);"
+_decoder = json.JSONDecoder()
+
+
+def _strip_prefix(text):
+    text = text.lstrip()
+    while text.startswith(FOR_LOOP_PREFIX):
+        text = text[len(FOR_LOOP_PREFIX):].lstrip()
+    return text
+
+
+def _orjson_documents(body):
+    docs = []
+    for line in body.splitlines():
+        line = line.strip()
+        if line.startswith(FOR_LOOP_PREFIX.encode()):
+            line = line[len(FOR_LOOP_PREFIX):].strip()
+        if line:
+            docs.append(orjson.loads(line))
+    return docs
+
+
+def iter_documents(body):
+    """
+    Yield every JSON document of a GraphQL response.
+
+    Facebook answers with a `for (;;);`-prefixed stream of JSON documents
+    (one per line for deferred / streamed chunks). body may be bytes or
+    str; each document is decoded once with JSONDecoder.raw_decode, and
+    anything that is not valid JSON is skipped up to the next line.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        if orjson is not None:
+            try:
+                yield from _orjson_documents(body)
+                return
+            except orjson.JSONDecodeError:
+                pass  # not one document per line: fall back to raw_decode
+        body = body.decode("utf-8", errors="replace")
+
+    text = _strip_prefix(body)
+    pos = 0
+    n = len(text)
+    while pos < n:
+        while pos < n and text[pos].isspace():
+            pos += 1
+        if text.startswith(FOR_LOOP_PREFIX, pos):
+            pos += len(FOR_LOOP_PREFIX)
+            continue
+        if pos >= n:
+            break
+        try:
+            doc, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            newline = text.find("\n", pos)
+            if newline == -1:
+                break
+            pos = newline + 1
+            continue
+        yield doc
+
+
+def iter_stream_documents(lines):
+    """
+    Yield JSON documents from a streamed response as soon as each one is
+    complete. lines is an iterable of bytes/str lines, e.g.
+    response.iter_lines(); a document split over several lines is
+    buffered until it decodes.
+    """
+    buffer = ""
+    for line in lines:
+        if isinstance(line, (bytes, bytearray)):
+            line = line.decode("utf-8", errors="replace")
+        buffer = _strip_prefix(buffer + line) if not buffer else buffer + "\n" + line
+        while buffer:
+            if buffer[0] not in "{[":
+                # Not the start of a document: drop the line
+                newline = buffer.find("\n")
+                buffer = _strip_prefix(buffer[newline + 1:]) if newline != -1 else ""
+                continue
+            try:
+                doc, end = _decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break  # incomplete: wait for more lines
+            yield doc
+            buffer = _strip_prefix(buffer[end:])
+    if buffer.strip():
+        # Whatever is left never became valid JSON; salvage what we can
+        yield from iter_documents(buffer)
+
+
+def iter_stream_blocks(lines):
+    """Cleaned "data" blocks of a streamed response, yielded chunk by chunk"""
+    for doc in iter_stream_documents(lines):
+        yield from clean_data_blocks(data_blocks(doc))
+
+
+def data_blocks(doc, blocks=None):
+    """
+    Collect the objects stored under "data" keys of one document, in
+    document order, without looking inside a block once it is taken
+    (the same blocks the old brace-counting extractor returned).
+    """
+    if blocks is None:
+        blocks = []
+    if isinstance(doc, dict):
+        for key, value in doc.items():
+            if key == "data" and isinstance(value, dict):
+                blocks.append(value)
+            elif isinstance(value, (dict, list)):
+                data_blocks(value, blocks)
+    elif isinstance(doc, list):
+        for item in doc:
+            if isinstance(item, (dict, list)):
+                data_blocks(item, blocks)
+    return blocks
+
+
+def extract_data_blocks(body):
+    """All "data" blocks of a response, uncleaned"""
+    blocks = []
+    for doc in iter_documents(body):
+        data_blocks(doc, blocks)
+    return blocks
+
+
+def clean_data_blocks(blocks):
+    """Drop the "errors" / "extensions" keys Facebook adds to data blocks"""
+    cleaned = []
+    for block in blocks:
+        if not isinstance(block, dict):
+            continue
+        block.pop("errors", None)
+        block.pop("extensions", None)
+        cleaned.append(block)
+    return cleaned
+
+
+def parse_fb_response(body):
+    """Cleaned "data" blocks of a GraphQL response (bytes or str)"""
+    return clean_data_blocks(extract_data_blocks(body))
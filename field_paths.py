@@ -0,0 +1,168 @@
+import threading
+
+# A later path is moved to the front once it has this many more hits than the current first one
+REORDER_MARGIN = 64
+
+
+def _keys(path):
+    return tuple(int(k) if k.isdigit() else k for k in path.split("."))
+
+
+def _step(parent, key, leaf, safe):
+    """Source for one step down a path"""
+    if safe:
+        if isinstance(key, int):
+            return f"{parent}[{key}] if type({parent}) is list and len({parent}) > {key} else None"
+        return f"{parent}.get({key!r}) if type({parent}) is dict else None"
+    # Fast form: missing/null intermediates become the shared empty dict;
+    # anything that is not a dict/list raises and the safe form is used
+    if isinstance(key, int):
+        step = f"{parent}[{key}] if len({parent}) > {key} else None"
+    else:
+        step = f"{parent}.get({key!r})"
+    return step if leaf else f"({step}) or EMPTY"
+
+
+class FieldPaths:
+    """
+    Alternative locations of one field in Facebook's GraphQL payloads.
+
+    Paths are declared once as dotted strings ("a.b.0.c", digits index
+    into lists), optionally paired with a transform applied to the value
+    found there. They are compiled into one straight-line function that
+    walks each shared prefix only once and returns the first value that
+    is not None, in declared order. Hits are counted per path.
+
+    interchangeable=True declares the paths as layout variants of one
+    value, so whichever resolves gives the same answer. Only then, when a
+    later path becomes the most common one, the function is recompiled
+    with that path first; otherwise the declared order decides which
+    value wins and never changes with crawl history.
+    """
+
+    def __init__(self, name, paths, interchangeable=False):
+        self.name = name
+        self.interchangeable = interchangeable
+        self._paths = [(p, None) if isinstance(p, str) else tuple(p) for p in paths]
+        self._hits = [0] * len(self._paths)
+        self._order = list(range(len(self._paths)))
+        self._lock = threading.Lock()
+        self._compile()
+        FIELDS[name] = self
+
+    def _source(self, safe):
+        fn = "get_safe" if safe else "get"
+        indent = "    " if safe else "        "
+        lines = []
+        names = {(): "o"}
+        first = self._order[0]
+        for i in self._order:
+            path, transform = self._paths[i]
+            keys = _keys(path)
+            for depth in range(1, len(keys) + 1):
+                prefix = keys[:depth]
+                if prefix not in names:
+                    names[prefix] = f"n{len(names)}"
+                    step = _step(names[keys[:depth - 1]], keys[depth - 1], depth == len(keys), safe)
+                    lines.append(f"{indent}{names[prefix]} = {step}")
+            value = names[keys]
+            if transform is not None:
+                lines.append(f"{indent}v = t{i}({value}) if {value} is not None else None")
+                value = "v"
+            lines.append(f"{indent}if {value} is not None:")
+            lines.append(f"{indent}    hits[{i}] += 1")
+            if i != first and self.interchangeable:
+                lines.append(f"{indent}    if hits[{i}] > hits[{first}] + {REORDER_MARGIN}: reorder()")
+            lines.append(f"{indent}    return {value}")
+        lines.append(f"{indent}return default")
+        if safe:
+            return "\n".join([f"def {fn}(o, default=None):"] + lines)
+        return "\n".join([f"def {fn}(o, default=None):", "    try:"] + lines + [
+            "    except (AttributeError, TypeError, KeyError):",
+            "        return get_safe(o, default)",
+        ])
+
+    def _compile(self):
+        namespace = {"hits": self._hits, "reorder": self._reorder, "EMPTY": {}}
+        for i, (_, transform) in enumerate(self._paths):
+            if transform is not None:
+                namespace[f"t{i}"] = transform
+        exec(self._source(safe=True), namespace)
+        exec(self._source(safe=False), namespace)
+        self.get = namespace["get"]
+
+    def _reorder(self):
+        with self._lock:
+            self._order = sorted(self._order, key=lambda i: -self._hits[i])
+            self._compile()
+
+    def stats(self):
+        """{path: hits}, most used first"""
+        return {self._paths[i][0]: self._hits[i] for i in sorted(self._order, key=lambda i: -self._hits[i])}
+
+
+# name -> FieldPaths, for path_stats()
+FIELDS = {}
+
+
+def path_stats():
+    """Hit counts of every declared field, e.g. to spot a layout change"""
+    return {name: field.stats() for name, field in FIELDS.items()}
+
+
+def _group_name(to):
+    if isinstance(to, dict) and to.get("__typename") == "Group":
+        return to.get("name")
+    return None
+
+
+_UFI_TARGET = "comet_sections.feedback.story.story_ufi_container.story.feedback_context.feedback_target_with_context"
+
+# Comment count of a feed Story node (page and group feeds)
+COMMENT_COUNT_PATHS = FieldPaths("comment_count", [
+    "feedback.comment_rendering_instance.comments.total_count",
+    f"{_UFI_TARGET}.comment_rendering_instance.comments.total_count",
+    f"{_UFI_TARGET}.comet_ufi_summary_and_actions_renderer.feedback.comment_rendering_instance.comments.total_count",
+    # old structure
+    "comet_sections.feedback.story.feedback_context.feedback_target_with_context.comment_rendering_instance.comments.total_count",
+    "feedback.comments_count_summary_renderer.feedback.comment_rendering_instance.comments.total_count",
+    f"{_UFI_TARGET}.comet_ufi_summary_and_actions_renderer.feedback.comments_count_summary_renderer.feedback.comment_rendering_instance.comments.total_count",
+], interchangeable=True)
+
+# Page / profile name of a Story node
+PAGE_NAME_PATHS = FieldPaths("page_name", [
+    "comet_sections.content.story.actors.0.name",
+    "feedback.owning_profile.name",
+    "feedback.owning_profile.short_name",
+])
+
+# Group name of a Story node
+GROUP_NAME_PATHS = FieldPaths("group_name", [
+    ("comet_sections.context_layout.story.comet_sections.title.story.to", _group_name),
+    "comet_sections.content.story.target_group.name",
+    "feedback.associated_group.name",
+])
+
+# Creation time (unix seconds) of a Story node
+CREATION_TIME_PATHS = FieldPaths("creation_time", [
+    "comet_sections.context_layout.story.comet_sections.metadata.0.story.creation_time",
+    "comet_sections.timestamp.story.creation_time",
+    "creation_time",
+])
+
+# Top-level comments connection of a CommentsListComponentsPaginationQuery response
+COMMENTS_BLOCK_PATHS = FieldPaths("comments_block", [
+    "data.node.comment_rendering_instance_for_feed_location.comments",
+])
+
+# Reply count of a comment's feedback (CommentsListComponentsPaginationQuery edges)
+REPLY_COUNT_PATHS = FieldPaths("reply_count", [
+    "replies_fields.total_count",
+    "replies_fields.count",
+    "replies_connection.count",
+])
+
+# Reply edges of a Depth1CommentsListPaginationQuery response
+REPLY_EDGES_PATHS = FieldPaths("reply_edges", [
+    "data.node.replies_connection.edges",
+])
@@ -1,8 +1,14 @@
-import requests
 import json
-import time
 import os
 import uuid
+import http_session
+from field_paths import COMMENT_COUNT_PATHS, GROUP_NAME_PATHS
+from media_types import is_reel_or_video_story
+from fb_parser import parse_fb_response, iter_stream_blocks
+from retry_policy import retry_stream
+from scrape_context import ScrapeContext, sanitize_folder_name
+from storage import get_storage
+from watermark import FeedWatermark
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -37,81 +43,12 @@ if PROXY:
 
 
 def extract_group_name(node):
-    """Extract group name from post node"""
-    try:
-        # Try from context_layout > story > comet_sections > title > story > to
-        context_layout = node.get('comet_sections', {}).get('context_layout', {})
-        story = context_layout.get('story', {})
-        title_section = story.get('comet_sections', {}).get('title', {})
-        title_story = title_section.get('story', {})
-        to_obj = title_story.get('to', {})
-        if to_obj.get('__typename') == 'Group':
-            return to_obj.get('name')
-        
-        # Try from content > story > target_group (if available)
-        content = node.get('comet_sections', {}).get('content', {})
-        content_story = content.get('story', {})
-        target_group = content_story.get('target_group', {})
-        if target_group and 'name' in target_group:
-            return target_group.get('name')
-        
-        # Try from feedback > associated_group
-        feedback = node.get('feedback', {})
-        associated_group = feedback.get('associated_group', {})
-        if associated_group and 'name' in associated_group:
-            return associated_group.get('name')
-        
-        return None
-    except Exception:
-        return None
-
-# ========= RETRY HELPER =========
-def retry_request(url, headers, data, proxies, max_retries=5):
-    """Make a POST request with retry logic"""
-    global PROXIES
-    from proxy_utils import rotate_static_proxy, is_proxy_infra_error, is_ip_blocked
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            r = requests.post(url, headers=headers, data=data, proxies=proxies, cookies=COOKIES, timeout=30)
-            if r.status_code == 200:
-                return r
-            if is_proxy_infra_error(status_code=r.status_code):
-                print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy auth failed (HTTP {r.status_code}) — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            elif is_ip_blocked(status_code=r.status_code, response_text=r.text):
-                print(f"  🛽 Attempt {attempt}/{max_retries}: Facebook blocked this IP (HTTP {r.status_code}) — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            else:
-                print(f"  ⚠️ Attempt {attempt}/{max_retries}: Status {r.status_code}")
-        except requests.exceptions.ProxyError as e:
-            print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy unreachable — rotating static proxy...")
-            new_p = rotate_static_proxy()
-            if new_p:
-                proxies = new_p
-                PROXIES = new_p
-        except Exception as e:
-            if is_proxy_infra_error(exc=e):
-                print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy connection error — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            else:
-                print(f"  ⚠️ Attempt {attempt}/{max_retries}: {str(e)}")
-
-        if attempt < max_retries:
-            wait_time = attempt * 2
-            print(f"  ⏳ Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
+    """Extract group name from post node (paths declared in field_paths.GROUP_NAME_PATHS)"""
+    return GROUP_NAME_PATHS.get(node)
 
-    raise Exception(f"Failed after {max_retries} attempts")
+def default_context():
+    """Build a ScrapeContext from this module's globals (legacy callers)"""
+    return ScrapeContext(target_id=GROUP_ID, cookies=COOKIES, fb_dtsg=FB_DTSG, proxies=PROXIES, name=GROUP_NAME)
 
 
 def download_image(url, post_id, image_index=1, save_dir="group_post"):
@@ -136,7 +73,7 @@ def download_image(url, post_id, image_index=1, save_dir="group_post"):
         filepath = os.path.join(post_dir, filename)
         
         # Download the image
-        response = requests.get(url, timeout=30)
+        response = http_session.get(url)
         response.raise_for_status()
         
         # Save the image
@@ -151,10 +88,11 @@ def download_image(url, post_id, image_index=1, save_dir="group_post"):
         return None
 
 
-def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir="group_post"):
+def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir="group_post", ctx=None):
     """Fetch remaining images using media ID iteration (for posts with 5+ images)"""
     if not last_media_id or not post_id:
         return []
+    ctx = ctx or default_context()
     
     print(f"  🔄 Fetching remaining images after image #{current_image_count}...")
     
@@ -189,21 +127,21 @@ def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir
         }
         
         payload = {
-            "av": COOKIES.get("c_user", "0"),
-            "__user": COOKIES.get("c_user", "0"),
+            "av": ctx.user_id,
+            "__user": ctx.user_id,
             "__a": "1",
-            "fb_dtsg": FB_DTSG if FB_DTSG else "",
+            "fb_dtsg": ctx.fb_dtsg,
             "doc_id": DOC_ID_PHOTO,
             "variables": json.dumps(variables)
         }
         
         try:
-            r = requests.post(GRAPHQL_URL, headers=HEADERS_PHOTO, data=payload, proxies=PROXIES, cookies=COOKIES, timeout=30)
+            r = ctx.post(GRAPHQL_URL, headers=HEADERS_PHOTO, data=payload)
             if r.status_code != 200:
                 break
             
             # Parse response
-            cleaned_blocks = parse_fb_response(r.text)
+            cleaned_blocks = parse_fb_response(r.content)
             if not cleaned_blocks:
                 break
             
@@ -235,7 +173,6 @@ def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir
             
             if next_node:
                 current_node = next_node
-                time.sleep(0.5)  # Small delay between requests
             else:
                 break  # No more images
                 
@@ -249,174 +186,19 @@ def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir
     return remaining_photos
 
 
-def extract_data_blocks(raw_text):
-    """Extract all 'data' blocks from raw text"""
-    blocks = []
-    i = 0
-    n = len(raw_text)
-
-    while True:
-        idx = raw_text.find('"data"', i)
-        if idx == -1:
-            break
-
-        brace_start = raw_text.find('{', idx)
-        if brace_start == -1:
-            break
-
-        depth = 0
-        for j in range(brace_start, n):
-            if raw_text[j] == '{':
-                depth += 1
-            elif raw_text[j] == '}':
-                depth -= 1
-                if depth == 0:
-                    block_text = raw_text[brace_start:j+1]
-                    try:
-                        block = json.loads(block_text)
-                        blocks.append(block)
-                    except Exception:
-                        pass
-                    i = j + 1
-                    break
-        else:
-            break
-
-    return blocks
-
-
-def clean_data_blocks(blocks):
-    """Clean unwanted keys from data blocks"""
-    cleaned = []
-
-    for block in blocks:
-        if not isinstance(block, dict):
-            continue
-
-        block.pop("errors", None)
-        block.pop("extensions", None)
-
-        cleaned.append(block)
-
-    return cleaned
-
-
-def parse_fb_response(text):
-    """Parse Facebook response using the same logic as post_scraper"""
-    text = text.replace("for (;;);", "").strip()
-    extracted = extract_data_blocks(text)
-    cleaned = clean_data_blocks(extracted)
-    return cleaned
-
-
 def extract_comment_count(node):
-    """Extract comment count from post node"""
-    try:
-        # Path 1: feedback.comment_rendering_instance.comments.total_count
-        comment_count = node.get("feedback", {}).get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 2: comet_sections.feedback.story.story_ufi_container.story.feedback_context.feedback_target_with_context.comment_rendering_instance.comments.total_count
-        comet_sections = node.get("comet_sections", {})
-        feedback_section = comet_sections.get("feedback", {})
-        story = feedback_section.get("story", {})
-        story_ufi_container = story.get("story_ufi_container", {})
-        ufi_story = story_ufi_container.get("story", {})
-        feedback_context = ufi_story.get("feedback_context", {})
-        feedback_target = feedback_context.get("feedback_target_with_context", {})
-        comment_count = feedback_target.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 3: comet_sections.feedback.story.story_ufi_container.story.feedback_context.feedback_target_with_context.comet_ufi_summary_and_actions_renderer.feedback.comment_rendering_instance.comments.total_count
-        comet_ufi = feedback_target.get("comet_ufi_summary_and_actions_renderer", {}).get("feedback", {})
-        comment_count = comet_ufi.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 4: comet_sections.feedback.story.feedback_context.feedback_target_with_context.comment_rendering_instance.comments.total_count (old structure)
-        comet_sections = node.get("comet_sections", {})
-        feedback_section = comet_sections.get("feedback", {})
-        story = feedback_section.get("story", {})
-        feedback_context = story.get("feedback_context", {})
-        feedback_target = feedback_context.get("feedback_target_with_context", {})
-        comment_count = feedback_target.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 5: feedback.comments_count_summary_renderer.feedback.comment_rendering_instance.comments.total_count
-        comments_renderer = node.get("feedback", {}).get("comments_count_summary_renderer", {}).get("feedback", {})
-        comment_count = comments_renderer.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 6: comet_sections.feedback.story.story_ufi_container.story.feedback_context.feedback_target_with_context.comet_ufi_summary_and_actions_renderer.feedback.comments_count_summary_renderer.feedback.comment_rendering_instance.comments.total_count
-        comet_sections = node.get("comet_sections", {})
-        feedback_section = comet_sections.get("feedback", {})
-        story = feedback_section.get("story", {})
-        story_ufi_container = story.get("story_ufi_container", {})
-        ufi_story = story_ufi_container.get("story", {})
-        feedback_context = ufi_story.get("feedback_context", {})
-        feedback_target = feedback_context.get("feedback_target_with_context", {})
-        comet_ufi = feedback_target.get("comet_ufi_summary_and_actions_renderer", {}).get("feedback", {})
-        comments_count_renderer = comet_ufi.get("comments_count_summary_renderer", {}).get("feedback", {})
-        comment_count = comments_count_renderer.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-            
-        return 0
-    except Exception:
-        return 0
+    """Extract comment count from post node (paths declared in field_paths.COMMENT_COUNT_PATHS)"""
+    return COMMENT_COUNT_PATHS.get(node, 0)
 
 
 def is_reel_or_video_post(node):
-    """Check if the post is a reel or video post"""
+    """Check if the post is a reel or video post (see media_types.is_reel_or_video_story)"""
     if not node or node.get('__typename') != 'Story':
         return False
-    
-    # Check for reel in story type or anywhere in node
-    node_typename = node.get('__typename', '')
-    if 'reel' in node_typename.lower():
-        return True
-    
-    # Check comet_sections for reel content
-    comet_sections = node.get('comet_sections', {})
-    content = comet_sections.get('content', {})
-    
-    content_typename = content.get('__typename', '')
-    if 'reel' in content_typename.lower():
-        return True
-    
-    # Check attachments for video/reel content
-    attachments = node.get('attachments', [])
-    for attachment in attachments:
-        # Check for video media type
-        if 'media' in attachment and attachment['media'].get('__typename') == 'Video':
-            return True
-        
-        # Check for reel substring in media object
-        if 'media' in attachment and 'reel' in str(attachment['media']).lower():
-            return True
-        
-        # Check in styles > attachment > media for video or reel
-        styles_media = attachment.get('styles', {}).get('attachment', {}).get('media', {})
-        if styles_media.get('__typename') == 'Video':
-            return True
-        if 'reel' in str(styles_media).lower():
-            return True
-        
-        # Check all_subattachments for videos or reels
-        for subattachment in attachment.get('all_subattachments', {}).get('nodes', []):
-            if 'media' in subattachment and subattachment['media'].get('__typename') == 'Video':
-                return True
-            if 'media' in subattachment and 'reel' in str(subattachment['media']).lower():
-                return True
-    
-    return False
+    return is_reel_or_video_story(node)
 
 
-def extract_media(node, post_id, save_dir="group_post"):
+def extract_media(node, post_id, save_dir="group_post", ctx=None):
     """Extract photo and video URLs from a post"""
     media = {
         'photos': [],
@@ -478,22 +260,21 @@ def extract_media(node, post_id, save_dir="group_post"):
     
     # Fetch remaining images if we have exactly 5 photos (indicating there may be more)
     if image_index == 5 and last_media_id:
-        remaining_photos = fetch_remaining_images(last_media_id, post_id, image_index, save_dir)
+        remaining_photos = fetch_remaining_images(last_media_id, post_id, image_index, save_dir, ctx=ctx)
         media['photos'].extend(remaining_photos)
     
     return media
 
 
 def post_already_exists(post_id, base_folder, name_folder):
-    """Check if a post has already been scraped by checking if its JSON file exists"""
+    """Check if a post has already been scraped (its file or database row exists)"""
     if not post_id or not name_folder:
         return False
     
-    post_file = os.path.join(base_folder, name_folder, str(post_id), f"{post_id}.json")
-    return os.path.exists(post_file)
+    return get_storage().post_exists(base_folder, name_folder, post_id)
 
 
-def extract_post_data(node, group_name=None):
+def extract_post_data(node, group_name=None, ctx=None):
     """Extract relevant data from a post node"""
     if not node or node.get('__typename') != 'Story':
         return None
@@ -519,15 +300,11 @@ def extract_post_data(node, group_name=None):
         group_name = extract_group_name(node)
     
     # Sanitize group name folder
-    if group_name:
-        name_folder = "".join(c for c in group_name if c.isalnum() or c in (' ', '-', '_')).strip()
-        if not name_folder:
-            name_folder = "Unknown"
-    else:
-        name_folder = "Unknown"
+    name_folder = sanitize_folder_name(group_name)
     
     # Prepare save directory for media
     media_save_dir = os.path.join("group_post", name_folder)
+    media = extract_media(node, post_id, media_save_dir, ctx=ctx)
     
     post_data = {
         'id': node.get('id'),
@@ -536,8 +313,8 @@ def extract_post_data(node, group_name=None):
         'comment_count': comment_count,
         'group_name': group_name,
         'permalink': node.get('permalink_url', ''),
-        'photos': extract_media(node, post_id, media_save_dir)['photos'],
-        'videos': extract_media(node, post_id, media_save_dir)['videos']
+        'photos': media['photos'],
+        'videos': media['videos']
     }
     
     # Save individual post to folder structure: group_post/{group_name}/{post_id}/{post_id}.json
@@ -552,7 +329,61 @@ def extract_post_data(node, group_name=None):
     return post_data
 
 
-def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None):
+def group_feed_variables(group_id, cursor=None):
+    """GraphQL variables for one GroupsCometFeedRegularStoriesPaginationQuery page"""
+    return {
+        "count": 3,
+        "cursor": cursor,
+        "feedLocation": "GROUP",
+        "feedType": "DISCUSSION",
+        "feedbackSource": 0,
+        "filterTopicId": None,
+        "focusCommentID": None,
+        "privacySelectorRenderLocation": "COMET_STREAM",
+        "renderLocation": "group",
+        "scale": 2,
+        #"sortingSetting": "TOP_POSTS",
+        "stream_initial_count": 1,
+        "useDefaultActor": False,
+        "id": group_id,
+    }
+
+
+def collect_story_nodes(item):
+    """Collect Story nodes from one parsed response item (direct or inside Group edges)"""
+    story_nodes = []
+    if not isinstance(item, dict):
+        return story_nodes
+
+    node = item.get('node', {})
+    node_typename = node.get('__typename')
+
+    # Direct Story node
+    if node_typename == 'Story':
+        story_nodes.append(node)
+
+    # Story nodes inside Group edges
+    elif node_typename == 'Group':
+        edges = node.get('group_feed', {}).get('edges', [])
+        for edge in edges:
+            edge_node = edge.get('node', {})
+            if edge_node.get('__typename') == 'Story':
+                story_nodes.append(edge_node)
+
+    return story_nodes
+
+
+def find_next_cursor(item):
+    """Return the end_cursor if this response item carries page_info with a next page"""
+    if isinstance(item, dict) and 'page_info' in item:
+        page_info = item['page_info']
+        if page_info.get('has_next_page'):
+            return page_info.get('end_cursor')
+    return None
+
+
+def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None, ctx=None,
+                stop_after_known=None, checkpoint=None, on_changed=None):
     """Fetch posts from Facebook group
     
     Args:
@@ -560,11 +391,32 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
         min_comments: Minimum number of comments required for a post to be included (0 = no filter)
         batch_size: Number of posts to fetch before calling on_batch_complete callback
         on_batch_complete: Optional callback function(batch_posts, total_so_far, limit) called after each batch
+        ctx: ScrapeContext for the group (defaults to GROUP_ID/COOKIES/FB_DTSG/PROXIES globals)
+        stop_after_known: Incremental crawl: stop after this many consecutive posts already
+            covered by the group's watermark (defaults to INCREMENTAL_STOP_AFTER, 0 = off)
+        checkpoint: Optional checkpoints.FeedCheckpoint. Pagination starts at its cursor, posts
+            it already collected count towards limit, and it is updated after each post and page
+        on_changed: Optional callback(post_id, comment_count) for already scraped posts whose
+            comment count differs from the saved one (see main.refresh_post_comments)
     """
-    global GROUP_NAME
+    ctx = ctx or default_context()
+    headers = {**HEADERS, "referer": f"https://www.facebook.com/groups/{ctx.target_id}/"}
     all_posts = []
     batch_posts = []
+    scraped = None  # ScrapedIndex of this target, loaded once its name is known
+    watermark = FeedWatermark("group_post", ctx.target_id, stop_after_known)
+    feed_done = False  # reached the watermark or the end of the feed
     cursor = None
+    # Posts collected by this run or left pending by the interrupted one: a
+    # resumed page (or a re-sent stream) delivers them again, and they are
+    # only marked scraped once saved with their comments
+    collected_ids = set()
+    if checkpoint:
+        cursor = checkpoint.cursor
+        limit -= checkpoint.collected
+        collected_ids.update(p.get("post_id") for p in checkpoint.pending)
+        if checkpoint.resumed:
+            print(f"↩️ Resuming the feed after {checkpoint.collected} posts")
     page_num = 1
     
     if min_comments > 0:
@@ -576,93 +428,34 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
     while len(all_posts) < limit:
         print(f"\nFetching page {page_num}...")
         
-        variables = {
-            "count": 3,
-            "cursor": cursor,
-            "feedLocation": "GROUP",
-            "feedType": "DISCUSSION",
-            "feedbackSource": 0,
-            "filterTopicId": None,
-            "focusCommentID": None,
-            "privacySelectorRenderLocation": "COMET_STREAM",
-            "renderLocation": "group",
-            "scale": 2,
-            #"sortingSetting": "TOP_POSTS",
-            "stream_initial_count": 1,
-            "useDefaultActor": False,
-            "id": GROUP_ID,
-        }
+        variables = group_feed_variables(ctx.target_id, cursor)
         
         payload = {
-            "av": COOKIES.get("c_user", "0"),
-            "__user": COOKIES.get("c_user", "0"),
+            "av": ctx.user_id,
+            "__user": ctx.user_id,
             "__a": "1",
-            "fb_dtsg": FB_DTSG if FB_DTSG else "",
+            "fb_dtsg": ctx.fb_dtsg,
             "doc_id": DOC_ID,
             "variables": json.dumps(variables),
         }
         
-        # Retry loop for empty response handling
-        max_empty_retries = 3
-        empty_retry_count = 0
-        data = []
+        # The feed is streamed: each chunk (initial stories, deferred
+        # stories, page_info) is handled as soon as it arrives.
+        # Empty bodies are retried by the shared retry policy.
+        data = retry_stream(GRAPHQL_URL, headers, payload, ctx, iter_stream_blocks)
         
-        while empty_retry_count < max_empty_retries:
-            try:
-                r = retry_request(GRAPHQL_URL, HEADERS, payload, PROXIES)
-                r.raise_for_status()
-            except requests.RequestException as e:
-                print(f"Request failed: {e}")
-                break
-            
-            # Parse the response
-            data = parse_fb_response(r.text)
-            
-            if data and len(data) > 0:
-                # Got valid data, break retry loop
-                break
-            else:
-                empty_retry_count += 1
-                if empty_retry_count < max_empty_retries:
-                    print(f"  ⚠️ Empty response, retrying ({empty_retry_count}/{max_empty_retries})...")
-                    time.sleep(2)  # Wait before retry
-                else:
-                    print(f"  ❌ Empty response after {max_empty_retries} attempts, skipping page")
-        
-        if not data or len(data) == 0:
-            print("❌ No data received after retries, stopping pagination")
-            break
-        
-        # Save raw response for debugging
-        # with open(f"group_raw_page_{page_num}.json", "w", encoding="utf-8") as f:
-        #     json.dump(data, f, ensure_ascii=False, indent=2)
-        # print(f"Saved group_raw_page_{page_num}.json")
-        
-        # Extract posts from the response array
+        # Extract posts from the response chunks
         posts_found = 0
+        items_seen = 0
         next_cursor = None
         
         for item in data:
+            items_seen += 1
             if not isinstance(item, dict):
                 continue
             
-            node = item.get('node', {})
-            node_typename = node.get('__typename')
-            
             # Collect Story nodes from multiple sources
-            story_nodes = []
-            
-            # Direct Story node
-            if node_typename == 'Story':
-                story_nodes.append(node)
-            
-            # Story nodes inside Group edges
-            elif node_typename == 'Group':
-                edges = node.get('group_feed', {}).get('edges', [])
-                for edge in edges:
-                    edge_node = edge.get('node', {})
-                    if edge_node.get('__typename') == 'Story':
-                        story_nodes.append(edge_node)
+            story_nodes = collect_story_nodes(item)
             
             # Process all found Story nodes
             for story_node in story_nodes:
@@ -678,24 +471,39 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
                     continue
                 
                 # Extract group name from first post if not set
-                if not GROUP_NAME:
-                    GROUP_NAME = extract_group_name(story_node)
-                    if GROUP_NAME:
-                        print(f"📂 Group name: {GROUP_NAME}")
+                if not ctx.name:
+                    ctx.name = extract_group_name(story_node)
+                    if ctx.name:
+                        print(f"📂 Group name: {ctx.name}")
                 
-                # Check if post already exists
+                # Check if post already exists (index loaded once per group)
                 temp_post_id = story_node.get('post_id')
-                temp_group_name = GROUP_NAME or extract_group_name(story_node)
-                if temp_group_name:
-                    temp_name_folder = "".join(c for c in temp_group_name if c.isalnum() or c in (' ', '-', '_')).strip() or "Unknown"
-                    if post_already_exists(temp_post_id, "group_post", temp_name_folder):
-                        print(f"  ⏭️  Skipping already scraped post: {temp_post_id}")
-                        continue
+                saved = False
+                if ctx.name and temp_post_id:
+                    if scraped is None:
+                        scraped = get_storage().scraped_index("group_post", ctx.name_folder)
+                    saved = temp_post_id in scraped
+                if temp_post_id and watermark.see(story_node, temp_post_id, saved):
+                    print(f"  ⏹️  {watermark.covered_run} posts in a row already crawled, stopping (incremental)")
+                    feed_done = True
+                    break
+                if saved:
+                    if on_changed:
+                        if get_storage().saved_comment_count("group_post", ctx.name_folder, temp_post_id) != comment_count:
+                            on_changed(temp_post_id, comment_count)
+                    print(f"  ⏭️  Skipping already scraped post: {temp_post_id}")
+                    continue
+                if temp_post_id and temp_post_id in collected_ids:
+                    print(f"  ⏭️  Skipping already collected post: {temp_post_id}")
+                    continue
                 
-                post_data = extract_post_data(story_node, GROUP_NAME)
+                post_data = extract_post_data(story_node, ctx.name, ctx=ctx)
                 if post_data:
+                    collected_ids.add(post_data['post_id'])
                     batch_posts.append(post_data)
                     all_posts.append(post_data)
+                    if checkpoint:
+                        checkpoint.add_post(post_data)
                     posts_found += 1
                     print(f"  - Found post: {post_data['post_id']}")
                     
@@ -709,31 +517,41 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
                         break
             
             # Break outer loop if limit reached
-            if len(all_posts) >= limit:
+            if len(all_posts) >= limit or feed_done:
                 break
             
             # Look for pagination info
-            if 'page_info' in item:
-                page_info = item['page_info']
-                if page_info.get('has_next_page'):
-                    next_cursor = page_info.get('end_cursor')
+            next_cursor = find_next_cursor(item) or next_cursor
+        data.close()  # stop downloading the rest of the page once the limit is hit
+        
+        if feed_done:
+            break
+        
+        if not items_seen:
+            print("❌ No data received after retries, stopping pagination")
+            break
         
         print(f"Found {posts_found} posts on this page")
         
+        # Every story of this page was handled: a resumed crawl starts at the next one
+        if checkpoint and next_cursor and len(all_posts) < limit:
+            checkpoint.page_done(next_cursor)
+        
         # Check if we should continue
         if not next_cursor or len(all_posts) >= limit:
             print("No more pages or reached limit. Stopping.")
+            feed_done = not next_cursor
             break
         
         cursor = next_cursor
         page_num += 1
-        time.sleep(2)  # Be nice to the server
     
     # Process any remaining posts in the final batch
     if batch_posts and on_batch_complete:
         print(f"\n📦 Final batch: {len(batch_posts)} posts. Total: {len(all_posts)}/{limit}")
         on_batch_complete(batch_posts, len(all_posts), limit)
     
+    watermark.close(complete=feed_done)
     return all_posts
 
 
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+import adaptive_concurrency
+import proxy_pool
+from rate_limiter import limiter, request_keys
+
+load_dotenv()
+
+# Keep-alive connections kept open per proxy endpoint (override in .env)
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
+DEFAULT_TIMEOUT = 30
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _proxy_url(proxies):
+    if not proxies:
+        return None
+    return proxies.get('https') or proxies.get('http')
+
+
+def _session_key(proxies, cookies):
+    """
+    One session per (proxy endpoint, Facebook account).
+    Sessions are split by account so cookies Facebook sets on one
+    login never leak into requests made with another.
+    """
+    account = (cookies or {}).get('c_user', '0')
+    return (_proxy_url(proxies) or 'direct', account)
+
+
+def _new_session(proxies):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if proxies:
+        session.proxies.update(proxies)
+    return session
+
+
+def get_session(proxies=None, cookies=None):
+    """
+    Return the pooled keep-alive session for this proxy + account.
+    Re-using it skips the TCP/TLS (and proxy CONNECT) handshake on
+    every request after the first one to a host.
+    """
+    key = _session_key(proxies, cookies)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _new_session(proxies)
+            _sessions[key] = session
+    return session
+
+
+def _send(method, url, proxies, cookies, timeout, **kwargs):
+    """
+    Send through the pooled session once the rate limiter and the
+    adaptive in-flight caps (per proxy and per account) allow it, then
+    report the outcome back so the caps can grow or shrink (and to the
+    proxy pool). Only responses from Facebook itself count as blocks.
+    """
+    session = get_session(proxies, cookies)
+    proxy, account, doc_id = request_keys(proxies, cookies, kwargs.get('data'))
+    limiter.acquire(proxy, account, doc_id)
+
+    controllers = adaptive_concurrency.controllers_for(proxy, account)
+    for controller in controllers:
+        controller.acquire()
+    signal = None
+    started = time.monotonic()
+    try:
+        r = session.request(method, url, proxies=proxies, cookies=cookies, timeout=timeout, **kwargs)
+        signal = adaptive_concurrency.classify(status_code=r.status_code, url=url)
+        proxy_pool.pool.record(proxy, proxy_pool.outcome_for(status_code=r.status_code, url=url),
+                               time.monotonic() - started)
+        return r
+    except Exception as e:
+        signal = adaptive_concurrency.classify(exc=e, url=url)
+        proxy_pool.pool.record(proxy, proxy_pool.outcome_for(exc=e, url=url))
+        raise
+    finally:
+        for controller in reversed(controllers):
+            controller.release(signal)
+
+
+def post(url, proxies=None, cookies=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Drop-in replacement for requests.post that goes through the session pool"""
+    return _send("POST", url, proxies, cookies, timeout, **kwargs)
+
+
+def get(url, proxies=None, cookies=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """Drop-in replacement for requests.get that goes through the session pool"""
+    return _send("GET", url, proxies, cookies, timeout, **kwargs)
+
+
+def close_all():
+    """Close every pooled session (call when a scrape job finishes)"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
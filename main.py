@@ -1,23 +1,32 @@
 import base64
-import json
 import os
-import time
-import requests
 import re
+import http_session
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from html import unescape
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Number of comments whose replies are fetched in parallel (override in .env)
+REPLY_WORKERS = int(os.getenv('REPLY_WORKERS', '8'))
+
 # Import scraper modules
-from comment_scraper import fetch_comments, fetch_replies, fb_json, GRAPHQL, PROXIES
+from comment_scraper import fetch_replies, fb_json, GRAPHQL, PROXIES
+from comment_scraper import default_context, iter_comment_pages, has_replies, convert_post_id_to_feedback_id
+from post_writer import clean_comment
+from storage import get_storage
+from checkpoints import CommentCheckpoint, FeedCheckpoint
+from scrape_context import ScrapeContext
+from multi_target import crawl_targets, PARALLEL_TARGETS
 from post_scraper import fetch_posts as fetch_page_posts, extract_media as extract_page_media, parse_fb_response as parse_page_response
 from group_post_scraper_v2 import fetch_posts as fetch_group_posts
 from single_post_image import fetch_all_images
 
 
-def extract_user_id_from_url(url, cookies=None):
+def extract_user_id_from_url(url, cookies=None, ctx=None):
     """Extract Facebook User ID from a profile URL"""
     # First, try to extract ID directly from URL
     url_patterns = [
@@ -41,7 +50,8 @@ def extract_user_id_from_url(url, cookies=None):
     
     try:
         print(f"  No ID in URL, fetching page: {url}")
-        response = requests.get(url, headers=headers, cookies=cookies, proxies=PROXIES, timeout=20)
+        proxies = ctx.proxies if ctx else PROXIES
+        response = http_session.get(url, headers=headers, cookies=cookies, proxies=proxies, timeout=20)
         html = response.text
         
         # Try multiple patterns to find user ID in HTML
@@ -67,7 +77,7 @@ def extract_user_id_from_url(url, cookies=None):
         return None
 
 
-def extract_group_id_from_url(url, cookies=None):
+def extract_group_id_from_url(url, cookies=None, ctx=None):
     """Extract Facebook Group ID from a group URL"""
     # First, try to extract ID directly from URL
     url_patterns = [
@@ -91,7 +101,8 @@ def extract_group_id_from_url(url, cookies=None):
     
     try:
         print(f"  No ID in URL, fetching group page: {url}")
-        response = requests.get(url, headers=headers, cookies=cookies, proxies=PROXIES, timeout=20)
+        proxies = ctx.proxies if ctx else PROXIES
+        response = http_session.get(url, headers=headers, cookies=cookies, proxies=proxies, timeout=20)
         html = response.text
         
         # Try multiple patterns to find group ID in HTML
@@ -117,7 +128,7 @@ def extract_group_id_from_url(url, cookies=None):
         return None
 
 
-def extract_post_id_from_url(url, cookies=None):
+def extract_post_id_from_url(url, cookies=None, ctx=None):
     """Extract Facebook Post ID from a post URL"""
     
     # First, try to extract post ID directly from URL patterns (no fetch needed)
@@ -141,7 +152,8 @@ def extract_post_id_from_url(url, cookies=None):
     
     try:
         print(f"  No direct ID in URL, fetching post: {url}")
-        response = requests.get(url, headers=headers, cookies=cookies, proxies=PROXIES, timeout=20)
+        proxies = ctx.proxies if ctx else PROXIES
+        response = http_session.get(url, headers=headers, cookies=cookies, proxies=proxies, timeout=20)
         html = response.text
         
         post_id = None
@@ -197,72 +209,183 @@ def extract_post_id_from_url(url, cookies=None):
         return None
 
 
-def convert_post_id_to_feedback_id(post_id):
-    """Convert post_id to feedback_id using base64 encoding"""
-    feedback_id = base64.b64encode(f"feedback:{post_id}".encode()).decode()
-    return feedback_id
+class CommentStream:
+    """
+    Comments of one post, with their replies, yielded in the original
+    order as they are fetched.
 
+    Reply requests for each page run on up to max_workers threads
+    (defaults to REPLY_WORKERS) while earlier comments are handed out and
+    the next page is fetched. At most one page plus a few comments per
+    worker wait for their replies at any time, so memory stays flat no
+    matter how many comments the post has. post_info is set once the
+    first page has been parsed.
+    ctx: ScrapeContext with cookies, fb_dtsg and proxy (defaults to module globals).
+    checkpoint: optional checkpoints.CommentCheckpoint. Its pages are
+    yielded first and fetching continues after them; each new page is
+    appended to it once all its comments have been handed out.
+    cursor: start after this comment page instead of at the first one.
+    cursor_state is {"after": cursor, "seen": n} for the last page
+    handed out in full: requesting after that cursor returns the page
+    again, whose first n comments were already seen (see
+    refresh_post_comments).
+    """
 
-def fetch_comments_for_post(post_id, cookies=None):
-    """Fetch all comments and replies for a given post_id"""
-    feedback_id = convert_post_id_to_feedback_id(post_id)
-    print(f"  Fetching comments for post {post_id}...")
-    print(f"  Using feedback_id: {feedback_id}")
-    
-    all_data = []
-    comments, post_info = fetch_comments(feedback_id, cookies=cookies)
-    
-    for c in comments:
-        print(f"    🗨️ {c.get('text', '')[:50]}...")
-        c["replies"] = fetch_replies(c, cookies=cookies)
-        
-        for r in c["replies"]:
+    def __init__(self, post_id, cookies=None, max_workers=None, ctx=None, checkpoint=None, cursor=None):
+        self.post_id = post_id
+        self.ctx = ctx or default_context(cookies)
+        self.workers = max(1, max_workers or REPLY_WORKERS)
+        self.checkpoint = checkpoint
+        self.cursor = cursor
+        self.post_info = None
+        self.count = 0
+        self.cursor_state = None
+
+    def _finish(self, comment, future):
+        comment["replies"] = future.result() if future else []
+        print(f"    🗨️ {comment.get('text', '')[:50]}...")
+        for r in comment["replies"]:
             print(f"       ↳ {r.get('text', '')[:50]}...")
-        
-        # Remove internal fields before appending
-        c_clean = {k: v for k, v in c.items() if not k.startswith('_')}
-        all_data.append(c_clean)
-    
-    print(f"  ✓ Found {len(all_data)} comments")
-    return all_data, post_info
+        self.count += 1
+        # Internal fields (_feedback_id, ...) stay for the storage backend; writers drop them
+        return comment
+
+    def __iter__(self):
+        feedback_id = convert_post_id_to_feedback_id(self.post_id)
+        print(f"  Fetching comments for post {self.post_id}...")
+        print(f"  Using feedback_id: {feedback_id}")
+
+        checkpoint = self.checkpoint
+        cursor = self.cursor
+        if checkpoint and checkpoint.pages:
+            self.post_info = checkpoint.post_info
+            for next_cursor, page_comments in checkpoint.saved_pages():
+                self.count += len(page_comments)
+                yield from page_comments
+                self.cursor_state = {"after": cursor, "seen": len(page_comments)}
+                cursor = next_cursor
+            print(f"  ↩️ Resumed {self.count} comments from {checkpoint.pages} checkpointed page(s)")
+            if checkpoint.done:
+                print(f"  ✓ Found {self.count} comments")
+                return
+
+        window = self.workers * 4
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for page_comments, post_info, next_cursor in iter_comment_pages(feedback_id, ctx=self.ctx, cursor=cursor):
+                self.post_info = post_info or self.post_info
+                # Reply requests only for comments whose feedback reports replies
+                for c in page_comments:
+                    future = pool.submit(fetch_replies, c, ctx=self.ctx) if has_replies(c) else None
+                    pending.append((c, future))
+                # Page end marker: recorded once the comments before it are out
+                pending.append((None, (cursor, next_cursor, page_comments)))
+                cursor = next_cursor
+                while len(pending) > window:
+                    yield from self._take(pending.popleft())
+            while pending:
+                yield from self._take(pending.popleft())
+
+        print(f"  ✓ Found {self.count} comments")
+
+    def _take(self, item):
+        comment, future = item
+        if comment is None:
+            page_cursor, next_cursor, page_comments = future
+            self.cursor_state = {"after": page_cursor, "seen": len(page_comments)}
+            if self.checkpoint:
+                self.checkpoint.add_page(next_cursor, self.post_info, page_comments)
+            return
+        yield self._finish(comment, future)
+
+
+def fetch_comments_for_post(post_id, cookies=None, max_workers=None, ctx=None):
+    """Fetch all comments and replies for a given post_id (see CommentStream); returns (comments, post_info)"""
+    stream = CommentStream(post_id, cookies, max_workers, ctx)
+    comments = [clean_comment(c) for c in stream]
+    return comments, stream.post_info
 
 
 def save_post_data(post_type, post_id, post_data, comments_data):
     """Save post and comments data in organized folder structure"""
-    # For simple_post type, save directly under post_id (no intermediate name folder)
-    if post_type == "simple_post":
-        folder_path = os.path.join(post_type, post_id)
-    else:
-        # For page_post and group_post, use name folder structure
-        # Extract page/group name from post_data
-        name = post_data.get('page_name') or post_data.get('group_name')
-        
-        # Sanitize folder name
-        if name:
-            name_folder = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
-            if not name_folder:
-                name_folder = "Unknown"
-        else:
-            name_folder = "Unknown"
-        
-        # Create folder structure: [post_type]/[page_name or group_name]/[post_id]/
-        folder_path = os.path.join(post_type, name_folder, post_id)
-    
-    os.makedirs(folder_path, exist_ok=True)
-    
-    # Combine post and comments in single file
-    combined_data = {
-        **post_data,
-        "comments": comments_data
-    }
-    
-    # Save as {post_id}.json
-    output_file = os.path.join(folder_path, f"{post_id}.json")
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(combined_data, f, ensure_ascii=False, indent=2)
+    writer = get_storage().open_post(post_type, post_id, post_data)
+    for comment in comments_data:
+        writer.add_comment(comment)
+    output_file = writer.close()
     print(f"  💾 Saved to {output_file}")
 
 
+def save_post_comments(post_type, post_id, post_data, cookies=None, ctx=None, resume=False):
+    """
+    Stream a post's comments (with replies) straight into storage (files
+    in OUTPUT_FORMAT json or jsonl, or SQLite; see storage). If fetching
+    fails, the post is still saved with the comments fetched so far and
+    the error is raised. A "post_info" key left as
+    None in post_data is filled in from the comments.
+    Comment pages are checkpointed as they complete (see checkpoints);
+    with resume, a checkpoint left by an interrupted run is picked up
+    instead of starting again at the first page.
+    Returns the number of comments saved.
+    """
+    checkpoint = CommentCheckpoint(post_type, post_id, resume)
+    stream = CommentStream(post_id, cookies=cookies, ctx=ctx, checkpoint=checkpoint)
+    target_id = ctx.target_id if ctx else None
+    with get_storage().open_post(post_type, post_id, post_data, target_id) as writer:
+        try:
+            for comment in stream:
+                writer.add_comment(comment)
+        finally:
+            if "post_info" in post_data and post_data["post_info"] is None:
+                post_data["post_info"] = stream.post_info
+            # Where a later refresh picks up (see refresh_post_comments)
+            post_data["comment_cursor"] = stream.cursor_state
+    checkpoint.clear()
+    return writer.count
+
+
+def refresh_post_comments(post_type, post_id, comment_count, name_folder=None, cookies=None, ctx=None):
+    """
+    Bring a saved post up to date with its new comment_count without
+    fetching it all again. The stored comments are kept up to the last
+    comment page the post was saved with. That page is fetched again,
+    along with its replies and any pages after it, and its stored copy
+    is replaced. Posts saved without a "comment_cursor" are scraped in
+    full. Returns the number of comments added.
+    """
+    storage = get_storage()
+    post_data = storage.load_post(post_type, name_folder, post_id)
+    if post_data is None or not post_data.get("comment_cursor"):
+        post_data = {k: v for k, v in (post_data or {"post_id": post_id}).items() if k != "comments"}
+        post_data["comment_count"] = comment_count
+        return save_post_comments(post_type, post_id, post_data, cookies, ctx)
+
+    comments = post_data.pop("comments", [])
+    state = post_data["comment_cursor"]
+    kept = comments[:max(0, len(comments) - state["seen"])]
+    print(f"  🔄 Refreshing: {post_data.get('comment_count')} → {comment_count} comments, "
+          f"keeping {len(kept)} saved ones")
+
+    stream = CommentStream(post_id, cookies=cookies, ctx=ctx, cursor=state["after"])
+    target_id = ctx.target_id if ctx else None
+    with storage.open_post(post_type, post_id, post_data, target_id) as writer:
+        for comment in kept:
+            writer.add_comment(comment)
+        try:
+            for comment in stream:
+                writer.add_comment(comment)
+        except BaseException:
+            # The refetch failed part-way: keep the stored rest of the last
+            # page. A refetch that finished is written as fetched, since
+            # comments may have been deleted since the last save.
+            for comment in comments[writer.count:]:
+                writer.add_comment(comment)
+            raise
+        finally:
+            post_data["comment_count"] = comment_count
+            post_data["comment_cursor"] = stream.cursor_state or state
+    return writer.count - len(comments)
+
+
 def display_menu():
     """Display the main menu"""
     print("\n" + "="*60)
@@ -276,6 +399,18 @@ def display_menu():
     print("="*60)
 
 
+def ask_resume():
+    """Ask whether to continue an interrupted crawl from its checkpoint"""
+    answer = input("Resume from the last checkpoint if there is one? (y/N): ").strip().lower()
+    return answer in ("y", "yes")
+
+
+def ask_refresh():
+    """Ask whether already scraped posts with new comments should be refreshed"""
+    answer = input("Refresh already scraped posts whose comment count changed? (y/N): ").strip().lower()
+    return answer in ("y", "yes")
+
+
 def scrape_simple_post():
     """Scrape comments from a single post"""
     print("\n--- SIMPLE POST SCRAPER ---")
@@ -309,17 +444,21 @@ def scrape_simple_post():
         print("❌ Invalid choice")
         return
     
-    print(f"\nFetching comments for post {post_id}...")
-    comments, post_info = fetch_comments_for_post(post_id)
+    resume = ask_resume()
     
-    # Save data
+    print(f"\nFetching comments for post {post_id}...")
     post_data = {
         "post_id": post_id,
         "type": "simple_post",
-        "post_info": post_info
+        "post_info": None  # filled in from the comments
     }
     
-    save_post_data("simple_post", post_id, post_data, comments)
+    # Comments are written as they are fetched
+    try:
+        save_post_comments("simple_post", post_id, post_data, resume=resume)
+    except Exception as e:
+        print(f"  ❌ Error fetching comments: {e}")
+    post_info = post_data["post_info"]
     
     # Fetch images if media_id is available
     if post_info and post_info.get("media_id"):
@@ -345,9 +484,9 @@ def scrape_simple_post():
                     visited.add(current_node)
                     
                     payload = single_post_image.build_payload(current_node, p_id)
-                    r = requests.post(single_post_image.GRAPHQL_URL, headers=single_post_image.HEADERS, data=payload)
+                    r = http_session.post(single_post_image.GRAPHQL_URL, headers=single_post_image.HEADERS, data=payload)
                     
-                    cleaned_blocks = single_post_image.process_raw_graphql(r.text)
+                    cleaned_blocks = single_post_image.process_raw_graphql(r.content)
                     if not cleaned_blocks:
                         break
                     
@@ -364,7 +503,7 @@ def scrape_simple_post():
                         filename = f"{post_id}.jpg" if image_count == 1 else f"{post_id}_{image_count}.jpg"
                         filepath = os.path.join(image_folder, filename)
                         try:
-                            r_img = requests.get(image_url, proxies=single_post_image.PROXIES, timeout=30)
+                            r_img = http_session.get(image_url, proxies=single_post_image.PROXIES)
                             r_img.raise_for_status()
                             with open(filepath, "wb") as f:
                                 f.write(r_img.content)
@@ -397,16 +536,81 @@ def scrape_simple_post():
     print(f"\n✅ Done! Saved to simple_post/{post_id}/")
 
 
+def crawl_target(post_type, ctx, count, resume=False, refresh=False):
+    """
+    Fetch posts for one page/group context, then comments for each post.
+    Progress is checkpointed (see checkpoints); with resume, an
+    interrupted crawl of the target carries on where it stopped. With
+    refresh, already scraped posts met in the feed whose comment count
+    changed get their new comments (refresh_post_comments).
+    """
+    fetch_posts = fetch_group_posts if post_type == "group_post" else fetch_page_posts
+    kind = "group" if post_type == "group_post" else "page"
+    checkpoint = FeedCheckpoint(post_type, ctx.target_id, resume)
+    
+    # Posts taken from the feed by the interrupted run but not saved yet
+    posts = list(checkpoint.pending)
+    if posts:
+        print(f"\n↩️ {len(posts)} posts left over from the interrupted crawl")
+    
+    print(f"\nFetching {count} posts from {kind} {ctx.target_id}...")
+    changed = []
+    on_changed = (lambda post_id, comment_count: changed.append((post_id, comment_count))) if refresh else None
+    posts += fetch_posts(count, ctx=ctx, checkpoint=checkpoint, on_changed=on_changed)
+    
+    print(f"\n✓ Found {len(posts)} posts. Now fetching comments...")
+    
+    # Fetch comments for each post
+    for i, post in enumerate(posts, 1):
+        post_id = post.get("post_id")
+        if not post_id:
+            print(f"\n[{i}/{len(posts)}] ⚠️ Skipping post with no ID")
+            continue
+        
+        print(f"\n[{i}/{len(posts)}] Processing post {post_id}...")
+        
+        try:
+            # The post is saved even if comments fail (with those fetched so far)
+            save_post_comments(post_type, post_id, post, ctx=ctx, resume=resume)
+            checkpoint.post_done(post_id)
+        except Exception as e:
+            print(f"  ❌ Error fetching comments: {e}")
+    
+    # Failed posts stay in the checkpoint for a resumed run
+    if not checkpoint.pending:
+        checkpoint.clear()
+    
+    if changed:
+        print(f"\n🔄 Refreshing {len(changed)} already scraped posts with new comments...")
+    for i, (post_id, comment_count) in enumerate(changed, 1):
+        print(f"\n[{i}/{len(changed)}] Refreshing post {post_id}...")
+        try:
+            added = refresh_post_comments(post_type, post_id, comment_count, ctx.name_folder, ctx=ctx)
+            print(f"  ✓ {added} new comments")
+        except Exception as e:
+            print(f"  ❌ Error refreshing comments: {e}")
+    
+    return len(posts)
+
+
+def crawl_many(post_type, target_ids, count, parallel=None, resume=False, refresh=False):
+    """Crawl several pages/groups at once with a fair, globally capped scheduler"""
+    contexts = [ScrapeContext(target_id=target_id, proxies=PROXIES) for target_id in target_ids]
+    results = crawl_targets(contexts, lambda ctx: crawl_target(post_type, ctx, count, resume, refresh),
+                            parallel=parallel)
+    return sum(result or 0 for _, result, _ in results)
+
+
 def scrape_page_posts():
-    """Scrape posts and comments from a page"""
+    """Scrape posts and comments from one or more pages"""
     print("\n--- PAGE POST SCRAPER ---")
     print("\nChoose input method:")
     print("  1. Enter Page URL (auto-extract ID)")
-    print("  2. Enter Page/User ID directly")
+    print("  2. Enter Page/User ID(s) directly (comma-separated for several)")
     
     input_choice = input("Your choice (1 or 2): ").strip()
     
-    page_id = None
+    page_ids = []
     
     if input_choice == "1":
         page_url = input("Enter Page URL: ").strip()
@@ -419,10 +623,11 @@ def scrape_page_posts():
         if not page_id:
             print("❌ Could not extract User ID from URL")
             return
+        page_ids = [page_id]
     
     elif input_choice == "2":
-        page_id = input("Enter Page/User ID: ").strip()
-        if not page_id:
+        page_ids = [p.strip() for p in input("Enter Page/User ID(s): ").split(",") if p.strip()]
+        if not page_ids:
             print("❌ Invalid page ID")
             return
     
@@ -435,48 +640,28 @@ def scrape_page_posts():
     except ValueError:
         print("❌ Invalid number")
         return
+    resume = ask_resume()
+    refresh = ask_refresh()
     
-    # Update the USER_ID in post_scraper
-    import post_scraper
-    post_scraper.USER_ID = page_id
-    post_scraper.BASE_HEADERS["referer"] = f"https://www.facebook.com/profile.php?id={page_id}"
-    
-    print(f"\nFetching {count} posts from page {page_id}...")
-    posts = fetch_page_posts(count)
-    
-    print(f"\n✓ Found {len(posts)} posts. Now fetching comments...")
-    
-    # Fetch comments for each post
-    for i, post in enumerate(posts, 1):
-        post_id = post.get("post_id")
-        if not post_id:
-            print(f"\n[{i}/{len(posts)}] ⚠️ Skipping post with no ID")
-            continue
-        
-        print(f"\n[{i}/{len(posts)}] Processing post {post_id}...")
-        
-        try:
-            comments, _ = fetch_comments_for_post(post_id)
-            save_post_data("page_post", post_id, post, comments)
-            time.sleep(1)  # Be nice to the server
-        except Exception as e:
-            print(f"  ❌ Error fetching comments: {e}")
-            # Save post data even if comments fail
-            save_post_data("page_post", post_id, post, [])
+    if len(page_ids) == 1:
+        total = crawl_target("page_post", ScrapeContext(target_id=page_ids[0], proxies=PROXIES), count, resume, refresh)
+    else:
+        print(f"\nCrawling {len(page_ids)} pages (up to {PARALLEL_TARGETS} at once)...")
+        total = crawl_many("page_post", page_ids, count, resume=resume, refresh=refresh)
     
-    print(f"\n✅ Done! Saved {len(posts)} posts to page_post/")
+    print(f"\n✅ Done! Saved {total} posts to page_post/")
 
 
 def scrape_group_posts():
-    """Scrape posts and comments from a group"""
+    """Scrape posts and comments from one or more groups"""
     print("\n--- GROUP POST SCRAPER ---")
     print("\nChoose input method:")
     print("  1. Enter Group URL (auto-extract ID)")
-    print("  2. Enter Group ID directly")
+    print("  2. Enter Group ID(s) directly (comma-separated for several)")
     
     input_choice = input("Your choice (1 or 2): ").strip()
     
-    group_id = None
+    group_ids = []
     
     if input_choice == "1":
         group_url = input("Enter Group URL: ").strip()
@@ -489,10 +674,11 @@ def scrape_group_posts():
         if not group_id:
             print("❌ Could not extract Group ID from URL")
             return
+        group_ids = [group_id]
     
     elif input_choice == "2":
-        group_id = input("Enter Group ID: ").strip()
-        if not group_id:
+        group_ids = [g.strip() for g in input("Enter Group ID(s): ").split(",") if g.strip()]
+        if not group_ids:
             print("❌ Invalid group ID")
             return
     
@@ -505,36 +691,16 @@ def scrape_group_posts():
     except ValueError:
         print("❌ Invalid number")
         return
+    resume = ask_resume()
+    refresh = ask_refresh()
     
-    # Update the GROUP_ID in group_post_scraper_v2
-    import group_post_scraper_v2
-    group_post_scraper_v2.GROUP_ID = group_id
-    group_post_scraper_v2.HEADERS["referer"] = f"https://www.facebook.com/groups/{group_id}/"
-    
-    print(f"\nFetching {count} posts from group {group_id}...")
-    posts = fetch_group_posts(count)
-    
-    print(f"\n✓ Found {len(posts)} posts. Now fetching comments...")
-    
-    # Fetch comments for each post
-    for i, post in enumerate(posts, 1):
-        post_id = post.get("post_id")
-        if not post_id:
-            print(f"\n[{i}/{len(posts)}] ⚠️ Skipping post with no ID")
-            continue
-        
-        print(f"\n[{i}/{len(posts)}] Processing post {post_id}...")
-        
-        try:
-            comments, _ = fetch_comments_for_post(post_id)
-            save_post_data("group_post", post_id, post, comments)
-            time.sleep(1)  # Be nice to the server
-        except Exception as e:
-            print(f"  ❌ Error fetching comments: {e}")
-            # Save post data even if comments fail
-            save_post_data("group_post", post_id, post, [])
+    if len(group_ids) == 1:
+        total = crawl_target("group_post", ScrapeContext(target_id=group_ids[0], proxies=PROXIES), count, resume, refresh)
+    else:
+        print(f"\nCrawling {len(group_ids)} groups (up to {PARALLEL_TARGETS} at once)...")
+        total = crawl_many("group_post", group_ids, count, resume=resume, refresh=refresh)
     
-    print(f"\n✅ Done! Saved {len(posts)} posts to group_post/")
+    print(f"\n✅ Done! Saved {total} posts to group_post/")
 
 
 def main():
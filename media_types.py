@@ -0,0 +1,70 @@
+import re
+
+VIDEO_TYPENAMES = {"Video"}
+# Keys only video/reel media carry
+VIDEO_KEYS = frozenset({"playable_url", "playable_url_quality_hd", "browser_native_hd_url",
+                        "browser_native_sd_url", "video_id", "playable_duration_in_ms",
+                        "is_reel", "reel_id", "reel", "video_reel", "reels_video"})
+# Fields that may hold a reel link
+URL_KEYS = ("url", "uri", "permalink_url", "href", "shareable_url", "video_url")
+REEL_URL = re.compile(r"/reels?/|[?&]reel_id=", re.IGNORECASE)
+
+
+def is_reel_typename(typename):
+    return isinstance(typename, str) and "reel" in typename.lower()
+
+
+def is_video_or_reel_media(media):
+    """
+    True when a media dict is a video or reel.
+
+    Only looks at what identifies the media type, without stringifying
+    the whole (often large) dict: its __typename, video/reel-only keys,
+    and reel links in its URL fields.
+    """
+    if not isinstance(media, dict):
+        return False
+    typename = media.get("__typename")
+    if typename in VIDEO_TYPENAMES or is_reel_typename(typename):
+        return True
+    if not VIDEO_KEYS.isdisjoint(media):
+        return True
+    for key in URL_KEYS:
+        value = media.get(key)
+        if isinstance(value, str) and REEL_URL.search(value):
+            return True
+    return False
+
+
+def attachment_media(attachment):
+    """Every media dict of one story attachment (direct, styled and album sub-attachments)"""
+    if not isinstance(attachment, dict):
+        return
+    media = attachment.get("media")
+    if isinstance(media, dict):
+        yield media
+    styled = (attachment.get("styles") or {}).get("attachment") or {}
+    media = styled.get("media")
+    if isinstance(media, dict):
+        yield media
+    for source in (attachment, styled):
+        for sub in (source.get("all_subattachments") or {}).get("nodes") or []:
+            media = sub.get("media") if isinstance(sub, dict) else None
+            if isinstance(media, dict):
+                yield media
+
+
+def is_reel_or_video_story(node):
+    """True when a feed Story node is a reel or carries any video/reel attachment"""
+    if not isinstance(node, dict):
+        return False
+    if is_reel_typename(node.get("__typename")):
+        return True
+    content = (node.get("comet_sections") or {}).get("content") or {}
+    if is_reel_typename(content.get("__typename")):
+        return True
+    for attachment in node.get("attachments") or []:
+        for media in attachment_media(attachment):
+            if is_video_or_reel_media(media):
+                return True
+    return False
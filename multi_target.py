@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How many pages/groups are crawled at the same time (override in .env)
+PARALLEL_TARGETS = int(os.getenv('PARALLEL_TARGETS', '4'))
+# Requests in flight across all targets combined (override in .env)
+MAX_IN_FLIGHT_TOTAL = int(os.getenv('MAX_IN_FLIGHT_TOTAL', '16'))
+
+
+class FairScheduler:
+    """
+    Global request cap shared by every target of a multi-target crawl.
+
+    When the cap is reached, free slots are handed out round-robin by
+    target, so a target with many reply workers queued cannot starve
+    the others.
+    """
+
+    def __init__(self, max_in_flight=None):
+        self.max_in_flight = max_in_flight or MAX_IN_FLIGHT_TOTAL
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = {}     # target -> deque of waiting tickets
+        self._turn = deque()   # targets with waiters, in round-robin order
+
+    def acquire(self, target):
+        ticket = object()
+        with self._cond:
+            queue = self._waiting.setdefault(target, deque())
+            queue.append(ticket)
+            if target not in self._turn:
+                self._turn.append(target)
+
+            while not (self._in_flight < self.max_in_flight
+                       and self._turn[0] == target
+                       and queue[0] is ticket):
+                self._cond.wait()
+
+            queue.popleft()
+            self._turn.popleft()
+            if queue:
+                self._turn.append(target)  # back of the line for its next request
+            else:
+                del self._waiting[target]
+            self._in_flight += 1
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, target):
+        self.acquire(target)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def crawl_targets(contexts, crawl_fn, parallel=None, max_in_flight=None):
+    """
+    Run crawl_fn(ctx) for every ScrapeContext in contexts, several at once.
+
+    parallel: number of targets crawled at the same time (PARALLEL_TARGETS)
+    max_in_flight: global request cap shared fairly by all targets (MAX_IN_FLIGHT_TOTAL)
+
+    Returns a list of (ctx, result, error) in the input order; a failing
+    target does not stop the others.
+    """
+    scheduler = FairScheduler(max_in_flight)
+    for ctx in contexts:
+        ctx.scheduler = scheduler
+
+    def run_one(ctx):
+        try:
+            return ctx, crawl_fn(ctx), None
+        except Exception as e:
+            print(f"  ❌ Target {ctx.target_id} failed: {e}")
+            return ctx, None, e
+
+    workers = max(1, parallel or PARALLEL_TARGETS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_one, contexts))
@@ -1,8 +1,14 @@
-import requests
 import json
-import time
 import os
 import uuid
+import http_session
+from field_paths import COMMENT_COUNT_PATHS, PAGE_NAME_PATHS
+from media_types import is_reel_or_video_story
+from fb_parser import parse_fb_response
+from retry_policy import retry_request
+from scrape_context import ScrapeContext
+from storage import get_storage
+from watermark import FeedWatermark
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,53 +21,9 @@ USER_ID = "100019577483175"   # profile / page id
 PAGE_NAME = None  # Will be extracted automatically
 DOC_ID = "25430544756617998" # ProfileCometTimelineFeedRefetchQuery
 
-# ========= RETRY HELPER =========
-def retry_request(url, headers, data, proxies, max_retries=5):
-    """Make a POST request with retry logic"""
-    global PROXIES
-    from proxy_utils import rotate_static_proxy, is_proxy_infra_error, is_ip_blocked
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            r = requests.post(url, headers=headers, data=data, proxies=proxies, cookies=COOKIES, timeout=30)
-            if r.status_code == 200:
-                return r
-            if is_proxy_infra_error(status_code=r.status_code):
-                print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy auth failed (HTTP {r.status_code}) — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            elif is_ip_blocked(status_code=r.status_code, response_text=r.text):
-                print(f"  🛽 Attempt {attempt}/{max_retries}: Facebook blocked this IP (HTTP {r.status_code}) — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            else:
-                print(f"  ⚠️ Attempt {attempt}/{max_retries}: Status {r.status_code}")
-        except requests.exceptions.ProxyError as e:
-            print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy unreachable — rotating static proxy...")
-            new_p = rotate_static_proxy()
-            if new_p:
-                proxies = new_p
-                PROXIES = new_p
-        except Exception as e:
-            if is_proxy_infra_error(exc=e):
-                print(f"  🚫 Attempt {attempt}/{max_retries}: Proxy connection error — rotating static proxy...")
-                new_p = rotate_static_proxy()
-                if new_p:
-                    proxies = new_p
-                    PROXIES = new_p
-            else:
-                print(f"  ⚠️ Attempt {attempt}/{max_retries}: {str(e)}")
-
-        if attempt < max_retries:
-            wait_time = attempt * 2
-            print(f"  ⏳ Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
-
-    raise Exception(f"Failed after {max_retries} attempts")
+def default_context():
+    """Build a ScrapeContext from this module's globals (legacy callers)"""
+    return ScrapeContext(target_id=USER_ID, cookies=COOKIES, fb_dtsg=FB_DTSG, proxies=PROXIES, name=PAGE_NAME)
 
 
 def download_image(url, post_id, image_index=1, save_dir="page_post"):
@@ -86,7 +48,7 @@ def download_image(url, post_id, image_index=1, save_dir="page_post"):
         filepath = os.path.join(post_dir, filename)
         
         # Download the image
-        response = requests.get(url, timeout=30)
+        response = http_session.get(url)
         response.raise_for_status()
         
         # Save the image
@@ -101,10 +63,11 @@ def download_image(url, post_id, image_index=1, save_dir="page_post"):
         return None
 
 
-def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir="page_post"):
+def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir="page_post", ctx=None):
     """Fetch remaining images using media ID iteration (for posts with 5+ images)"""
     if not last_media_id or not post_id:
         return []
+    ctx = ctx or default_context()
     
     print(f"  🔄 Fetching remaining images after image #{current_image_count}...")
     
@@ -139,21 +102,21 @@ def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir
         }
         
         payload = {
-            "av": COOKIES.get("c_user", "0"),
-            "__user": COOKIES.get("c_user", "0"),
+            "av": ctx.user_id,
+            "__user": ctx.user_id,
             "__a": "1",
-            "fb_dtsg": FB_DTSG if FB_DTSG else "",
+            "fb_dtsg": ctx.fb_dtsg,
             "doc_id": DOC_ID_PHOTO,
             "variables": json.dumps(variables)
         }
         
         try:
-            r = requests.post(GRAPHQL_URL, headers=HEADERS_PHOTO, data=payload, proxies=PROXIES, cookies=COOKIES, timeout=30)
+            r = ctx.post(GRAPHQL_URL, headers=HEADERS_PHOTO, data=payload)
             if r.status_code != 200:
                 break
             
             # Parse response
-            cleaned_blocks = parse_fb_response(r.text)
+            cleaned_blocks = parse_fb_response(r.content)
             if not cleaned_blocks:
                 break
             
@@ -185,7 +148,6 @@ def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir
             
             if next_node:
                 current_node = next_node
-                time.sleep(0.5)  # Small delay between requests
             else:
                 break  # No more images
                 
@@ -199,74 +161,6 @@ def fetch_remaining_images(last_media_id, post_id, current_image_count, save_dir
     return remaining_photos
 
 
-# -----------------------------
-# Extract all "data" blocks from raw text
-# -----------------------------
-def extract_data_blocks(raw_text):
-    blocks = []
-    i = 0
-    n = len(raw_text)
-
-    while True:
-        idx = raw_text.find('"data"', i)
-        if idx == -1:
-            break
-
-        brace_start = raw_text.find('{', idx)
-        if brace_start == -1:
-            break
-
-        depth = 0
-        for j in range(brace_start, n):
-            if raw_text[j] == '{':
-                depth += 1
-            elif raw_text[j] == '}':
-                depth -= 1
-                if depth == 0:
-                    block_text = raw_text[brace_start:j+1]
-                    try:
-                        block = json.loads(block_text)
-                        blocks.append(block)
-                    except Exception:
-                        pass
-                    i = j + 1
-                    break
-        else:
-            break
-
-    return blocks
-
-
-# -----------------------------
-# Clean unwanted keys
-# -----------------------------
-def clean_data_blocks(blocks):
-    cleaned = []
-
-    for block in blocks:
-        if not isinstance(block, dict):
-            continue
-
-        block.pop("errors", None)
-        block.pop("extensions", None)
-
-        cleaned.append(block)
-
-    return cleaned
-
-
-# -----------------------------
-# Parse Facebook response using cleaning logic
-# -----------------------------
-def parse_fb_response(text):
-    text = text.replace("for (;;);", "").strip()
-    extracted = extract_data_blocks(text)
-    cleaned = clean_data_blocks(extracted)
-    
-    # Return the cleaned array as-is
-    return cleaned
-
-
 BASE_HEADERS = {
     "user-agent": "Mozilla/5.0",
     "content-type": "application/x-www-form-urlencoded",
@@ -289,120 +183,24 @@ if PROXY:
 
 
 def extract_page_name(node):
-    """Extract page/user name from post node"""
-    try:
-        # Try from actors
-        actors = node.get('comet_sections', {}).get('content', {}).get('story', {}).get('actors', [])
-        if actors and len(actors) > 0:
-            return actors[0].get('name')
-        
-        # Try from feedback > owning_profile
-        feedback = node.get('feedback', {})
-        owning_profile = feedback.get('owning_profile', {})
-        if owning_profile:
-            return owning_profile.get('name') or owning_profile.get('short_name')
-        
-        return None
-    except Exception:
-        return None
+    """Extract page/user name from post node (paths declared in field_paths.PAGE_NAME_PATHS)"""
+    return PAGE_NAME_PATHS.get(node)
 
 
 def extract_comment_count(node):
-    """Extract comment count from post node"""
-    try:
-        # Path 1: feedback.comment_rendering_instance.comments.total_count
-        comment_count = node.get("feedback", {}).get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 2: comet_sections.feedback.story.story_ufi_container.story.feedback_context.feedback_target_with_context.comment_rendering_instance.comments.total_count
-        comet_sections = node.get("comet_sections", {})
-        feedback_section = comet_sections.get("feedback", {})
-        story = feedback_section.get("story", {})
-        story_ufi_container = story.get("story_ufi_container", {})
-        ufi_story = story_ufi_container.get("story", {})
-        feedback_context = ufi_story.get("feedback_context", {})
-        feedback_target = feedback_context.get("feedback_target_with_context", {})
-        comment_count = feedback_target.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 3: comet_sections.feedback.story.story_ufi_container.story.feedback_context.feedback_target_with_context.comet_ufi_summary_and_actions_renderer.feedback.comment_rendering_instance.comments.total_count
-        comet_ufi = feedback_target.get("comet_ufi_summary_and_actions_renderer", {}).get("feedback", {})
-        comment_count = comet_ufi.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 4: comet_sections.feedback.story.feedback_context.feedback_target_with_context.comment_rendering_instance.comments.total_count (old structure)
-        comet_sections = node.get("comet_sections", {})
-        feedback_section = comet_sections.get("feedback", {})
-        story = feedback_section.get("story", {})
-        feedback_context = story.get("feedback_context", {})
-        feedback_target = feedback_context.get("feedback_target_with_context", {})
-        comment_count = feedback_target.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-        
-        # Path 5: feedback.comments_count_summary_renderer.feedback.comment_rendering_instance.comments.total_count
-        comments_renderer = node.get("feedback", {}).get("comments_count_summary_renderer", {}).get("feedback", {})
-        comment_count = comments_renderer.get("comment_rendering_instance", {}).get("comments", {}).get("total_count")
-        if comment_count is not None:
-            return comment_count
-            
-        return 0
-    except Exception:
-        return 0
+    """Extract comment count from post node (paths declared in field_paths.COMMENT_COUNT_PATHS)"""
+    return COMMENT_COUNT_PATHS.get(node, 0)
 
 
 def is_reel_or_video_post(node):
-    """Check if the post is a reel or video post"""
-    # Check for reel in story type
-    story_type = node.get("__typename", "")
-    if "reel" in story_type.lower():
-        return True
-    
-    # Check if comet_sections has content that indicates reel
-    comet_sections = node.get("comet_sections", {})
-    content = comet_sections.get("content", {})
-    
-    # Check for reel in content typename
-    content_typename = content.get("__typename", "")
-    if "reel" in content_typename.lower():
-        return True
-    
-    # Check attachments for video/reel content
-    attachments = node.get("attachments") or []
-    for att in attachments:
-        styles = att.get("styles") or {}
-        attachment = styles.get("attachment") or {}
-        
-        # Check if it's a video attachment
-        single_media = attachment.get("media")
-        if single_media:
-            media_typename = single_media.get("__typename", "")
-            if media_typename == "Video":
-                return True
-            # Check for reel in typename or anywhere in media object
-            if "reel" in str(single_media).lower():
-                return True
-        
-        # Check in all_subattachments for videos
-        all_media = attachment.get("all_subattachments", {}).get("nodes", [])
-        for m in all_media:
-            media_node = m.get("media") or {}
-            if media_node.get("__typename") == "Video":
-                return True
-            # Check for reel substring
-            if "reel" in str(media_node).lower():
-                return True
-    
-    return False
+    """Check if the post is a reel or video post (see media_types.is_reel_or_video_story)"""
+    return is_reel_or_video_story(node)
 
 
 # Global counter for tracking image indices per post
 _image_counters = {}
 
-def extract_media(node, post_id, save_dir="page_post"):
+def extract_media(node, post_id, save_dir="page_post", ctx=None):
     global _image_counters
     
     # Initialize counter for this post if not exists
@@ -473,22 +271,91 @@ def extract_media(node, post_id, save_dir="page_post"):
     # Fetch remaining images if we have exactly 5 photos (indicating there may be more)
     photo_count = sum(1 for m in media if m.get("type") == "photo")
     if photo_count == 5 and last_media_id:
-        remaining_photos = fetch_remaining_images(last_media_id, post_id, _image_counters[post_id], save_dir)
+        remaining_photos = fetch_remaining_images(last_media_id, post_id, _image_counters[post_id], save_dir, ctx=ctx)
         media.extend(remaining_photos)
 
     return media
 
 
 def post_already_exists(post_id, base_folder, name_folder):
-    """Check if a post has already been scraped by checking if its JSON file exists"""
+    """Check if a post has already been scraped (its file or database row exists)"""
     if not post_id or not name_folder:
         return False
     
-    post_file = os.path.join(base_folder, name_folder, str(post_id), f"{post_id}.json")
-    return os.path.exists(post_file)
+    return get_storage().post_exists(base_folder, name_folder, post_id)
+
+
+def timeline_variables(user_id, cursor=None):
+    """GraphQL variables for one ProfileCometTimelineFeedRefetchQuery page"""
+    return {
+        "count": 3,
+        "cursor": cursor,
+        "id": user_id,
+        "feedLocation": "TIMELINE",
+        "renderLocation": "timeline",
+        "scale": 2,
+        "useDefaultActor": False
+    }
+
+
+def collect_story_nodes(cleaned_data):
+    """
+    Collect all Story nodes and the next cursor from a parsed timeline page.
+    Returns (story_nodes, end_cursor).
+
+    Stories can be in two places:
+    1. Inside timeline_list_feed_units.edges[]
+    2. As standalone nodes with __typename: "Story"
+    """
+    story_nodes = []
+    timeline_block = None
+
+    for block in cleaned_data:
+        if not isinstance(block, dict):
+            continue
+
+        node = block.get("node", {})
+        node_typename = node.get("__typename")
+
+        # Check if this block has timeline edges
+        if "timeline_list_feed_units" in node:
+            timeline_block = block
+            edges = node["timeline_list_feed_units"].get("edges", [])
+            for edge in edges:
+                edge_node = edge.get("node")
+                if edge_node and edge_node.get("__typename") == "Story":
+                    story_nodes.append(edge_node)
+
+        # Check if this block itself is a Story node
+        elif node_typename == "Story":
+            story_nodes.append(node)
+
+        # Check for Story nodes inside Group edges (edge case)
+        elif node_typename == "Group":
+            edges = node.get('group_feed', {}).get('edges', [])
+            for edge in edges:
+                edge_node = edge.get('node', {})
+                if edge_node.get('__typename') == 'Story':
+                    story_nodes.append(edge_node)
+
+    # get page_info from timeline_block or find it in cleaned_data
+    page_info = None
+    if timeline_block:
+        page_info = timeline_block["node"]["timeline_list_feed_units"].get("page_info")
+
+    # If not in timeline_block, search for it in cleaned_data array
+    if not page_info:
+        for block in cleaned_data:
+            if isinstance(block, dict) and "page_info" in block:
+                page_info = block["page_info"]
+                break
+
+    page_info = page_info or {}
+    return story_nodes, page_info.get("end_cursor")
 
 
-def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None):
+def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None, ctx=None,
+                stop_after_known=None, checkpoint=None, on_changed=None):
     """Fetch posts from Facebook page
     
     Args:
@@ -496,11 +363,27 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
         min_comments: Minimum number of comments required for a post to be included (0 = no filter)
         batch_size: Number of posts to fetch before calling on_batch_complete callback
         on_batch_complete: Optional callback function(batch_posts, total_so_far, limit) called after each batch
+        ctx: ScrapeContext for the page (defaults to USER_ID/COOKIES/FB_DTSG/PROXIES globals)
+        stop_after_known: Incremental crawl: stop after this many consecutive posts already
+            covered by the page's watermark (defaults to INCREMENTAL_STOP_AFTER, 0 = off)
+        checkpoint: Optional checkpoints.FeedCheckpoint. Pagination starts at its cursor, posts
+            it already collected count towards limit, and it is updated after each post and page
+        on_changed: Optional callback(post_id, comment_count) for already scraped posts whose
+            comment count differs from the saved one (see main.refresh_post_comments)
     """
-    global PAGE_NAME
+    ctx = ctx or default_context()
+    headers = {**BASE_HEADERS, "referer": f"https://www.facebook.com/profile.php?id={ctx.target_id}"}
     all_posts = []
     batch_posts = []
+    scraped = None  # ScrapedIndex of this target, loaded once its name is known
+    watermark = FeedWatermark("page_post", ctx.target_id, stop_after_known)
+    feed_done = False  # reached the watermark or the end of the feed
     cursor = None
+    if checkpoint:
+        cursor = checkpoint.cursor
+        limit -= checkpoint.collected
+        if checkpoint.resumed:
+            print(f"↩️ Resuming the feed after {checkpoint.collected} posts")
     page_num = 1  # Track page number for saving cleaned data
     
     if min_comments > 0:
@@ -510,47 +393,19 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
         print(f"📦 Processing in batches of {batch_size} posts")
 
     while len(all_posts) < limit:
-        variables = {
-            "count": 3,
-            "cursor": cursor,
-            "id": USER_ID,
-            "feedLocation": "TIMELINE",
-            "renderLocation": "timeline",
-            "scale": 2,
-            "useDefaultActor": False
-        }
+        variables = timeline_variables(ctx.target_id, cursor)
 
         payload = {
-        "av": COOKIES.get("c_user", "0"),
-        "__user": COOKIES.get("c_user", "0"),
-        "__a": "1",
-        "fb_dtsg": FB_DTSG if FB_DTSG else "",
+            "av": ctx.user_id,
+            "__user": ctx.user_id,
+            "__a": "1",
+            "fb_dtsg": ctx.fb_dtsg,
             "doc_id": DOC_ID,
             "variables": json.dumps(variables),
         }
 
-        # Retry loop for empty response handling
-        max_empty_retries = 3
-        empty_retry_count = 0
-        cleaned_data = []
-        
-        while empty_retry_count < max_empty_retries:
-            r = retry_request(GRAPHQL_URL, BASE_HEADERS, payload, PROXIES)
-            # with open("response.txt", "w", encoding="utf-8") as f:
-            #     f.write(r.text)
-            print("Status code:", r.status_code)
-            cleaned_data = parse_fb_response(r.text)
-            
-            if cleaned_data and len(cleaned_data) > 0:
-                # Got valid data, break retry loop
-                break
-            else:
-                empty_retry_count += 1
-                if empty_retry_count < max_empty_retries:
-                    print(f"  ⚠️ Empty response, retrying ({empty_retry_count}/{max_empty_retries})...")
-                    time.sleep(2)  # Wait before retry
-                else:
-                    print(f"  ❌ Empty response after {max_empty_retries} attempts, skipping page")
+        # Empty bodies are retried by the shared retry policy
+        cleaned_data = retry_request(GRAPHQL_URL, headers, payload, ctx, parse=parse_fb_response)
         
         # # Save cleaned data for verification
         # with open(f"cleaned_page_{page_num}.json", "w", encoding="utf-8") as f:
@@ -562,41 +417,8 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
             print("  ❌ No data received after retries, stopping pagination")
             break
         
-        # Collect all Story nodes from the response
-        # Stories can be in two places:
-        # 1. Inside timeline_list_feed_units.edges[]
-        # 2. As standalone nodes with __typename: "Story"
-        
-        story_nodes = []
-        timeline_block = None
-        
-        for block in cleaned_data:
-            if not isinstance(block, dict):
-                continue
-            
-            node = block.get("node", {})
-            node_typename = node.get("__typename")
-            
-            # Check if this block has timeline edges
-            if "timeline_list_feed_units" in node:
-                timeline_block = block
-                edges = node["timeline_list_feed_units"].get("edges", [])
-                for edge in edges:
-                    edge_node = edge.get("node")
-                    if edge_node and edge_node.get("__typename") == "Story":
-                        story_nodes.append(edge_node)
-            
-            # Check if this block itself is a Story node
-            elif node_typename == "Story":
-                story_nodes.append(node)
-            
-            # Check for Story nodes inside Group edges (edge case)
-            elif node_typename == "Group":
-                edges = node.get('group_feed', {}).get('edges', [])
-                for edge in edges:
-                    edge_node = edge.get('node', {})
-                    if edge_node.get('__typename') == 'Story':
-                        story_nodes.append(edge_node)
+        # Collect all Story nodes (and the next cursor) from the response
+        story_nodes, next_cursor = collect_story_nodes(cleaned_data)
         
         print(f"Found {len(story_nodes)} posts in page {page_num}")
         
@@ -614,22 +436,31 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
                 continue
             
             # Extract page name from first post if not set
-            if not PAGE_NAME:
-                PAGE_NAME = extract_page_name(node)
-                if PAGE_NAME:
-                    print(f"📂 Page name: {PAGE_NAME}")
+            if not ctx.name:
+                ctx.name = extract_page_name(node)
+                if ctx.name:
+                    print(f"📂 Page name: {ctx.name}")
             
             post_id = node.get("post_id")
             if not post_id:
                 continue
             
-            # Check if post already exists
-            temp_page_name = PAGE_NAME or extract_page_name(node)
-            if temp_page_name:
-                temp_name_folder = "".join(c for c in temp_page_name if c.isalnum() or c in (' ', '-', '_')).strip() or "Unknown"
-                if post_already_exists(post_id, "page_post", temp_name_folder):
-                    print(f"  ⏭️  Skipping already scraped post: {post_id}")
-                    continue
+            # Check if post already exists (index loaded once per page)
+            saved = False
+            if ctx.name:
+                if scraped is None:
+                    scraped = get_storage().scraped_index("page_post", ctx.name_folder)
+                saved = post_id in scraped
+            if watermark.see(node, post_id, saved):
+                print(f"  ⏹️  {watermark.covered_run} posts in a row already crawled, stopping (incremental)")
+                feed_done = True
+                break
+            if saved:
+                if on_changed:
+                    if get_storage().saved_comment_count("page_post", ctx.name_folder, post_id) != comment_count:
+                        on_changed(post_id, comment_count)
+                print(f"  ⏭️  Skipping already scraped post: {post_id}")
+                continue
                 
             feedback_id = node.get("feedback", {}).get("id")
 
@@ -655,34 +486,26 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
                 "text": message,
                 "permalink": permalink,
                 "comment_count": comment_count,
-                "page_name": PAGE_NAME,
+                "page_name": ctx.name,
             }
             
             # Sanitize page name folder
-            if PAGE_NAME:
-                name_folder = "".join(c for c in PAGE_NAME if c.isalnum() or c in (' ', '-', '_')).strip()
-                if not name_folder:
-                    name_folder = "Unknown"
-            else:
-                name_folder = "Unknown"
+            name_folder = ctx.name_folder
             
             # Prepare save directory for media
             media_save_dir = os.path.join("page_post", name_folder)
             
             # Extract media with correct save directory
-            post["media"] = extract_media(node, post_id, media_save_dir)
-            
-            # Save individual post to folder structure: page_post/{page_name}/{post_id}/{post_id}.json
-            post_dir = os.path.join("page_post", name_folder, str(post_id))
-            os.makedirs(post_dir, exist_ok=True)
+            post["media"] = extract_media(node, post_id, media_save_dir, ctx=ctx)
             
-            post_file = os.path.join(post_dir, f"{post_id}.json")
-            with open(post_file, "w", encoding="utf-8") as f:
-                json.dump(post, f, ensure_ascii=False, indent=2)
+            # Save individual post to folder structure: page_post/{page_name}/{post_id}/
+            post_file = get_storage().save_post_header("page_post", post_id, post, ctx.target_id)
             print(f"✓ Saved to {post_file}")
 
             batch_posts.append(post)
             all_posts.append(post)
+            if checkpoint:
+                checkpoint.add_post(post)
             
             # Check if we should process this batch
             if batch_size > 0 and len(batch_posts) >= batch_size and on_batch_complete:
@@ -693,25 +516,22 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
             if len(all_posts) >= limit:
                 break
 
-        # update cursor - get page_info from timeline_block or find it in cleaned_data
-        page_info = timeline_block["node"]["timeline_list_feed_units"].get("page_info")
-        
-        # If not in timeline_block, search for it in cleaned_data array
-        if not page_info:
-            for block in cleaned_data:
-                if isinstance(block, dict) and "page_info" in block:
-                    page_info = block["page_info"]
-                    break
-        
-        page_info = page_info or {}
-        cursor = page_info.get("end_cursor")
+        if feed_done:
+            break
+
+        # Every story of this page was handled: a resumed crawl starts at the next one
+        if checkpoint and next_cursor and len(all_posts) < limit:
+            checkpoint.page_done(next_cursor)
+
+        # update cursor
+        cursor = next_cursor
 
         if not cursor:
             print("No more pages. Stopping pagination.")
+            feed_done = True
             break
 
 
-        time.sleep(1)
         page_num += 1  # Increment page counter
     
     # Process any remaining posts in the final batch
@@ -719,6 +539,7 @@ def fetch_posts(limit=10, min_comments=0, batch_size=10, on_batch_complete=None)
         print(f"\n📦 Final batch: {len(batch_posts)} posts. Total: {len(all_posts)}/{limit}")
         on_batch_complete(batch_posts, len(all_posts), limit)
 
+    watermark.close(complete=feed_done)
     return all_posts
 
 
@@ -0,0 +1,220 @@
+import json
+import os
+import shutil
+from dotenv import load_dotenv
+
+from scrape_context import sanitize_folder_name
+
+load_dotenv()
+
+# "json": one indented {post_id}.json per post (comments included)
+# "jsonl": {post_id}.post.json header + {post_id}.comments.jsonl, one line per comment / reply
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'json').strip().lower()
+
+
+def post_folder(post_type, post_id, post_data=None):
+    """
+    Output folder of one post: simple_post/{post_id}/ or
+    {page_post|group_post}/{page or group name}/{post_id}/
+    """
+    if post_type == "simple_post":
+        return os.path.join(post_type, str(post_id))
+    post_data = post_data or {}
+    name = post_data.get('page_name') or post_data.get('group_name')
+    return os.path.join(post_type, sanitize_folder_name(name), str(post_id))
+
+
+def is_saved(post_dir, post_id):
+    """True when post_dir holds a saved post in either output format"""
+    return (os.path.exists(os.path.join(post_dir, f"{post_id}.json"))
+            or os.path.exists(os.path.join(post_dir, f"{post_id}.post.json")))
+
+
+def clean_comment(comment):
+    """comment without the internal "_" fields (feedback id, expansion token)"""
+    return {k: v for k, v in comment.items() if not k.startswith('_')}
+
+
+def _dumps(value, level):
+    """value as json.dump(..., indent=2) would write it `level` levels deep"""
+    text = json.dumps(value, ensure_ascii=False, indent=2)
+    return text.replace("\n", "\n" + "  " * level)
+
+
+class PostWriter:
+    """
+    Writes {post_id}.json one comment at a time.
+
+    Comments are appended to a spool file next to the output as they
+    arrive, so only one comment is held in memory. close() writes the
+    post fields followed by the spooled comments (the same file
+    json.dump(..., indent=2) of the whole post would produce) and moves
+    it into place atomically. Used as a context manager, the post is
+    saved with the comments written so far even if fetching fails.
+    """
+
+    def __init__(self, post_type, post_id, post_data=None):
+        self.post_type = post_type
+        self.post_id = str(post_id)
+        self.post_data = post_data
+        self.count = 0
+        self.path = None
+        # Called with the output path once the post is saved
+        self.on_close = None
+        self._spool = None
+        self._spool_path = None
+
+    def _open_spool(self):
+        folder = post_folder(self.post_type, self.post_id, self.post_data)
+        os.makedirs(folder, exist_ok=True)
+        self._spool_path = os.path.join(folder, f"{self.post_id}.comments.part")
+        self._spool = open(self._spool_path, "w", encoding="utf-8")
+
+    def add_comment(self, comment):
+        if self._spool is None:
+            self._open_spool()
+        self._spool.write(",\n    " if self.count else "\n    ")
+        self._spool.write(_dumps(clean_comment(comment), 2))
+        self.count += 1
+
+    def close(self, post_data=None):
+        """Write {post_id}.json; post_data replaces the one given at creation. Returns the path"""
+        if post_data is not None:
+            self.post_data = post_data
+        post_data = {k: v for k, v in (self.post_data or {}).items() if k != "comments"}
+        folder = post_folder(self.post_type, self.post_id, post_data)
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"{self.post_id}.json")
+        tmp_path = self.path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("{")
+            for key, value in post_data.items():
+                f.write(f"\n  {json.dumps(key, ensure_ascii=False)}: {_dumps(value, 1)},")
+            if self._spool is None:
+                f.write('\n  "comments": []\n}')
+            else:
+                f.write('\n  "comments": [')
+                self._spool.close()
+                with open(self._spool_path, encoding="utf-8") as spool:
+                    shutil.copyfileobj(spool, f)
+                f.write("\n  ]\n}")
+        os.replace(tmp_path, self.path)
+
+        if self._spool is not None:
+            os.remove(self._spool_path)
+            self._spool = None
+        if self.on_close:
+            self.on_close(self.path)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        print(f"  💾 Saved to {self.path}")
+
+
+def _line(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _write_jsonl_header(path, post_id, post_data, comments_saved, complete):
+    header = {k: v for k, v in (post_data or {}).items() if k != "comments"}
+    header.update({
+        "comments_file": f"{post_id}.comments.jsonl",
+        "comments_saved": comments_saved,
+        "complete": complete,
+    })
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(header, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class JsonlPostWriter:
+    """
+    Writes a post as {post_id}.post.json (the post fields) plus
+    {post_id}.comments.jsonl with one line per comment and per reply:
+
+        {"type": "comment", "index": 0, "text": ..., "reaction_count": ...}
+        {"type": "reply", "comment": 0, "text": ..., "reaction_count": ...}
+
+    Each line is flushed as soon as it is written, so a crash keeps
+    everything fetched before it. The header is written up front with
+    "complete": false and rewritten on close() with the final post
+    fields and the number of comments saved.
+    """
+
+    def __init__(self, post_type, post_id, post_data=None):
+        self.post_type = post_type
+        self.post_id = str(post_id)
+        self.post_data = post_data
+        self.count = 0
+        self.folder = post_folder(post_type, self.post_id, post_data)
+        os.makedirs(self.folder, exist_ok=True)
+        self.path = os.path.join(self.folder, f"{self.post_id}.post.json")
+        self.comments_path = os.path.join(self.folder, f"{self.post_id}.comments.jsonl")
+        self.on_close = None
+        self._write_header(complete=False)
+        # Line buffered: every comment / reply reaches the file right away
+        self._comments = open(self.comments_path, "w", encoding="utf-8", buffering=1)
+
+    def _write_header(self, complete):
+        _write_jsonl_header(self.path, self.post_id, self.post_data, self.count, complete)
+
+    def add_comment(self, comment):
+        fields = clean_comment(comment)
+        replies = fields.pop("replies", None) or []
+        lines = [_line({"type": "comment", "index": self.count, **fields})]
+        lines.extend(_line({"type": "reply", "comment": self.count, **r}) for r in replies)
+        self._comments.write("".join(lines))
+        self.count += 1
+
+    def close(self, post_data=None, complete=True):
+        """Close the comments file and rewrite the header; returns the header path"""
+        if post_data is not None:
+            self.post_data = post_data
+        if not self._comments.closed:
+            self._comments.close()
+        self._write_header(complete)
+        if self.on_close:
+            self.on_close(self.path)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(complete=exc_type is None)
+        print(f"  💾 Saved to {self.path} (+ {os.path.basename(self.comments_path)})")
+
+
+WRITERS = {"json": PostWriter, "jsonl": JsonlPostWriter}
+
+
+def open_writer(post_type, post_id, post_data=None, output_format=None):
+    """Writer for one post in output_format (defaults to OUTPUT_FORMAT)"""
+    output_format = output_format or OUTPUT_FORMAT
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown OUTPUT_FORMAT {output_format!r} (expected one of {', '.join(WRITERS)})")
+    return WRITERS[output_format](post_type, post_id, post_data)
+
+
+def save_post_header(post_type, post_id, post_data, output_format=None):
+    """
+    Save a post before its comments are fetched: {post_id}.json without
+    comments, or an incomplete {post_id}.post.json header. Returns the path.
+    """
+    output_format = output_format or OUTPUT_FORMAT
+    folder = post_folder(post_type, post_id, post_data)
+    os.makedirs(folder, exist_ok=True)
+    if output_format == "jsonl":
+        path = os.path.join(folder, f"{post_id}.post.json")
+        _write_jsonl_header(path, post_id, post_data, 0, complete=False)
+        return path
+    path = os.path.join(folder, f"{post_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(post_data, f, ensure_ascii=False, indent=2)
+    return path
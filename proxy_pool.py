@@ -0,0 +1,191 @@
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Extra proxy endpoints, comma separated (override in .env)
+PROXY_POOL = [p.strip() for p in os.getenv('PROXY_POOL', '').split(',') if p.strip()]
+# First quarantine after a block / proxy failure; doubles on each repeat, up to the max (seconds)
+PROXY_QUARANTINE_SECONDS = float(os.getenv('PROXY_QUARANTINE_SECONDS', '60'))
+PROXY_QUARANTINE_MAX = float(os.getenv('PROXY_QUARANTINE_MAX', '900'))
+# Weight of the newest sample in the success-rate and latency averages
+PROXY_EWMA_ALPHA = float(os.getenv('PROXY_EWMA_ALPHA', '0.2'))
+
+OK = "ok"
+BLOCKED = "blocked"
+PROXY_ERROR = "proxy_error"
+ERROR = "error"
+
+
+def outcome_for(status_code=None, exc=None, url=None):
+    """
+    Map a response status or exception to a pool outcome. With url, a
+    response that did not come from Facebook (CDN images) only counts
+    against the proxy when the proxy itself failed.
+    """
+    from proxy_utils import is_proxy_infra_error, is_ip_blocked, is_facebook_request
+
+    if exc is not None:
+        return PROXY_ERROR if is_proxy_infra_error(exc=exc) else ERROR
+    if is_proxy_infra_error(status_code=status_code):
+        return PROXY_ERROR
+    if url is not None and not is_facebook_request(url):
+        return OK
+    if is_ip_blocked(status_code=status_code):
+        return BLOCKED
+    return OK if status_code < 400 else ERROR
+
+
+class ProxyStats:
+    """Health of one proxy endpoint"""
+
+    def __init__(self):
+        self.success = 1.0       # EWMA of successful requests (1 = all good)
+        self.latency = None      # EWMA of response time in seconds
+        self.requests = 0
+        self.blocks = 0
+        self.failures_in_row = 0
+        self.quarantined_until = 0.0
+
+    def score(self, default_latency=0.0):
+        latency = self.latency if self.latency is not None else default_latency
+        return self.success / (1.0 + latency)
+
+
+class ProxyPool:
+    """
+    Proxy endpoints with health scoring.
+
+    Every request's outcome and latency is recorded. Blocks and proxy
+    failures quarantine the endpoint for a cooldown that doubles on each
+    consecutive failure. best() hands out the endpoint with the highest
+    success-rate / latency score that is not in quarantine.
+
+    A static proxy with a port range (STATIC_PORT_MIN..STATIC_PORT_MAX)
+    is expanded lazily: untried ports compete with a neutral score, so
+    a healthy known port is preferred over a random new one and banned
+    ports are never handed out again while quarantined.
+    """
+
+    def __init__(self, endpoints=(), static_base=None, port_min=None, port_max=None):
+        from proxy_utils import _replace_trailing_port
+
+        self._replace_port = _replace_trailing_port
+        self._endpoints = list(endpoints)
+        self._stats = {url: ProxyStats() for url in self._endpoints}
+        self._static_base = static_base
+        self._ports = (port_min, port_max) if static_base and port_min is not None else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        from proxy_utils import STATIC_PORT_MIN, STATIC_PORT_MAX
+
+        static_base = os.getenv('STATIC_PROXY', '').strip() or os.getenv('PROXY', '').strip()
+        return cls(PROXY_POOL, static_base or None, STATIC_PORT_MIN, STATIC_PORT_MAX)
+
+    @property
+    def per_request(self):
+        """True when several explicit endpoints are configured (PROXY_POOL)"""
+        return len(self._endpoints) > 1
+
+    def __bool__(self):
+        return bool(self._stats or self._static_base)
+
+    def owns(self, proxy_url):
+        """True for PROXY_POOL endpoints and any port of the static proxy"""
+        if proxy_url in self._endpoints:
+            return True
+        if not self._static_base:
+            return False
+        return proxy_url.rpartition(':')[0] == self._static_base.rpartition(':')[0]
+
+    def _stats_for(self, proxy_url):
+        stats = self._stats.get(proxy_url)
+        if stats is None:
+            stats = ProxyStats()
+            self._stats[proxy_url] = stats
+        return stats
+
+    def _untried_port(self):
+        if not self._ports:
+            return None
+        port_min, port_max = self._ports
+        for _ in range(20):
+            url = self._replace_port(self._static_base, random.randint(port_min, port_max))
+            if url not in self._stats:
+                return url
+        return None
+
+    def record(self, proxy_url, outcome, latency=None):
+        """Feed one request's outcome (OK / BLOCKED / PROXY_ERROR / ERROR) into the endpoint's score"""
+        if not proxy_url or not self.owns(proxy_url):
+            return
+        alpha = PROXY_EWMA_ALPHA
+        with self._lock:
+            stats = self._stats_for(proxy_url)
+            stats.requests += 1
+            stats.success = (1 - alpha) * stats.success + alpha * (1.0 if outcome == OK else 0.0)
+            if latency is not None and outcome == OK:
+                stats.latency = latency if stats.latency is None else (1 - alpha) * stats.latency + alpha * latency
+
+            if outcome == OK:
+                stats.failures_in_row = 0
+            elif outcome in (BLOCKED, PROXY_ERROR):
+                stats.blocks += outcome == BLOCKED
+                stats.failures_in_row += 1
+                cooldown = min(PROXY_QUARANTINE_MAX,
+                               PROXY_QUARANTINE_SECONDS * 2 ** (stats.failures_in_row - 1))
+                stats.quarantined_until = time.monotonic() + cooldown
+
+    def best(self, exclude=None):
+        """Proxy URL of the healthiest endpoint not in quarantine (None if the pool is empty)"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [(url, s) for url, s in self._stats.items()
+                       if s.quarantined_until <= now and url != exclude]
+            known = [s.latency for _, s in healthy if s.latency is not None]
+            default_latency = sum(known) / len(known) if known else 0.0
+
+            best_url, best_score = None, -1.0
+            for url, stats in healthy:
+                score = stats.score(default_latency)
+                if score > best_score:
+                    best_url, best_score = url, score
+
+            # A fresh port starts with a perfect success rate and average latency
+            if best_score < 1.0 / (1.0 + default_latency):
+                untried = self._untried_port()
+                if untried:
+                    return untried
+
+            if best_url:
+                return best_url
+
+            # Everything is quarantined: use whichever comes out first
+            waiting = [(s.quarantined_until, url) for url, s in self._stats.items() if url != exclude]
+            if waiting:
+                return min(waiting)[1]
+            return self._untried_port() or exclude
+
+    def snapshot(self):
+        """{proxy_url: stats dict} for logging / the UI"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                url: {
+                    "success": round(s.success, 3),
+                    "latency": round(s.latency, 3) if s.latency is not None else None,
+                    "requests": s.requests,
+                    "blocks": s.blocks,
+                    "quarantined_for": max(0.0, round(s.quarantined_until - now, 1)),
+                }
+                for url, s in self._stats.items()
+            }
+
+
+# Shared by every job in the process
+pool = ProxyPool.from_env()
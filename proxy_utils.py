@@ -1,5 +1,5 @@
 import os
-import random
+from urllib.parse import urlsplit
 import requests
 from dotenv import load_dotenv
 
@@ -21,19 +21,24 @@ def _build_proxy_dict(proxy_url: str):
     return {'http': proxy_url, 'https': proxy_url}
 
 
-def rotate_static_proxy():
+def rotate_static_proxy(current=None):
     """
-    Pick a brand-new random static port and return a fresh proxy dict.
+    Return a fresh proxy dict: the healthiest endpoint in the proxy pool
+    other than `current` (ports that were recently blocked stay in
+    quarantine, see proxy_pool.py).
     Call this whenever a static proxy appears blocked or unreachable.
-    Returns None if STATIC_PROXY (or fallback PROXY) is not configured.
+    Returns None if no proxy (STATIC_PROXY / PROXY / PROXY_POOL) is configured.
     """
-    proxy_base = os.getenv('STATIC_PROXY', '').strip() or os.getenv('PROXY', '').strip()
-    if not proxy_base:
+    from proxy_pool import pool
+
+    if not pool:
         return None
 
-    port = random.randint(STATIC_PORT_MIN, STATIC_PORT_MAX)
-    proxy_url = _replace_trailing_port(proxy_base, port)
-    print(f"  🔁 Static proxy rotated → new port {port}  ({proxy_url})")
+    current_url = (current or {}).get('https') or (current or {}).get('http')
+    proxy_url = pool.best(exclude=current_url)
+    if not proxy_url:
+        return None
+    print(f"  🔁 Static proxy rotated → {proxy_url}")
     return _build_proxy_dict(proxy_url)
 
 
@@ -74,6 +79,18 @@ def is_ip_blocked(status_code=None, response_text=None) -> bool:
     return False
 
 
+def is_facebook_request(url) -> bool:
+    """
+    True when Facebook itself answers this URL (facebook.com pages and the
+    /api/graphql/ endpoint), so its status says something about the
+    outgoing IP. Image CDN hosts (scontent / fbcdn.net) do not: a 403 there
+    is an expired or private image URL, not a block.
+    """
+    parts = urlsplit(url or "")
+    host = (parts.hostname or "").lower()
+    return host == "facebook.com" or host.endswith(".facebook.com") or parts.path.startswith("/api/graphql")
+
+
 # Keep old name as alias so callers we haven't updated yet still work
 is_proxy_error = is_proxy_infra_error
 
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Requests per second and burst size for each scope (0 QPS = unlimited).
+# A request must get a token from every bucket that applies to it.
+RATE_LIMITS = {
+    'proxy': (float(os.getenv('RATE_LIMIT_PROXY_QPS', '10')), int(os.getenv('RATE_LIMIT_PROXY_BURST', '20'))),
+    'account': (float(os.getenv('RATE_LIMIT_ACCOUNT_QPS', '5')), int(os.getenv('RATE_LIMIT_ACCOUNT_BURST', '10'))),
+    'doc_id': (float(os.getenv('RATE_LIMIT_DOC_QPS', '0')), int(os.getenv('RATE_LIMIT_DOC_BURST', '5'))),
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() hands back how long to wait"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens now (the balance may go negative) and return the number
+        of seconds the caller must wait before sending.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Token buckets per proxy, per account and per GraphQL doc_id"""
+
+    def __init__(self, limits=None):
+        self.limits = limits or RATE_LIMITS
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, scope, key):
+        rate, burst = self.limits.get(scope, (0, 0))
+        if not rate or key is None:
+            return None
+        with self._lock:
+            bucket = self._buckets.get((scope, key))
+            if bucket is None:
+                bucket = TokenBucket(rate, burst)
+                self._buckets[(scope, key)] = bucket
+        return bucket
+
+    def reserve(self, proxy=None, account=None, doc_id=None):
+        """
+        Reserve a token in every matching bucket; returns the longest wait.
+        Direct requests (no proxy) have no proxy bucket.
+        """
+        wait = 0.0
+        for scope, key in (('proxy', proxy), ('account', account), ('doc_id', doc_id)):
+            bucket = self._bucket(scope, key)
+            if bucket:
+                wait = max(wait, bucket.reserve())
+        return wait
+
+    def acquire(self, proxy=None, account=None, doc_id=None):
+        """Block until the request may be sent"""
+        wait = self.reserve(proxy, account, doc_id)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, proxy=None, account=None, doc_id=None):
+        """asyncio version of acquire()"""
+        wait = self.reserve(proxy, account, doc_id)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Shared by every request path in the process
+limiter = RateLimiter()
+
+
+def request_keys(proxies=None, cookies=None, data=None):
+    """(proxy, account, doc_id) keys for a request; account is None when logged out"""
+    proxy = (proxies or {}).get('https') or (proxies or {}).get('http')
+    account = (cookies or {}).get('c_user')
+    doc_id = data.get('doc_id') if isinstance(data, dict) else None
+    return proxy, account, doc_id
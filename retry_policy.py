@@ -0,0 +1,302 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from dotenv import load_dotenv
+
+from proxy_utils import is_proxy_infra_error, is_ip_blocked, is_facebook_request
+
+load_dotenv()
+
+# Retries allowed per request for each kind of failure (override in .env)
+RETRY_PROXY_ERRORS = int(os.getenv('RETRY_PROXY_ERRORS', '4'))
+RETRY_BLOCKS = int(os.getenv('RETRY_BLOCKS', '4'))
+RETRY_EMPTY = int(os.getenv('RETRY_EMPTY', '2'))
+RETRY_OTHER = int(os.getenv('RETRY_OTHER', '4'))
+# Retries one scrape job may spend in total before giving up
+JOB_RETRY_BUDGET = int(os.getenv('JOB_RETRY_BUDGET', '200'))
+# Exponential backoff: random wait in [0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**n)]
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '60'))
+# Longest Retry-After we are willing to honour (seconds)
+RETRY_AFTER_MAX = float(os.getenv('RETRY_AFTER_MAX', '300'))
+
+PROXY_ERROR = "proxy"
+BLOCKED = "blocked"
+EMPTY = "empty"
+OTHER = "other"
+
+
+class RetryExhausted(Exception):
+    """Raised when a request used up its retries or the job's retry budget"""
+
+    def __init__(self, message, kind=None):
+        super().__init__(message)
+        self.kind = kind
+
+
+class RetryBudget:
+    """Retries shared by every request of one scrape job (thread-safe)"""
+
+    def __init__(self, total=None):
+        self.remaining = JOB_RETRY_BUDGET if total is None else total
+        self._lock = threading.Lock()
+
+    def spend(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def retry_after_seconds(response):
+    """Seconds asked for by a Retry-After header (delta or HTTP date), or None"""
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), RETRY_AFTER_MAX)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return min(max(0.0, (when - datetime.now(timezone.utc)).total_seconds()), RETRY_AFTER_MAX)
+
+
+def classify_response(response, url=None):
+    """Failure kind for a non-200 response (never BLOCKED for non-Facebook urls, e.g. CDN images)"""
+    if is_proxy_infra_error(status_code=response.status_code):
+        return PROXY_ERROR
+    if url is not None and not is_facebook_request(url):
+        return OTHER
+    if is_ip_blocked(status_code=response.status_code, response_text=response.text):
+        return BLOCKED
+    return OTHER
+
+
+def classify_exception(exc):
+    if isinstance(exc, requests.exceptions.ProxyError) or is_proxy_infra_error(exc=exc):
+        return PROXY_ERROR
+    return OTHER
+
+
+class RetryState:
+    """
+    Retry bookkeeping for one logical request.
+
+    Each failure kind has its own allowance, so a dead proxy cannot use
+    up the retries meant for a Facebook block and vice versa; every retry
+    also spends one unit of the job-wide budget when one is given.
+    Waits use exponential backoff with full jitter, so workers that failed
+    together do not all retry at the same moment. A Retry-After header
+    overrides the computed wait. Proxy errors are retried after a short
+    wait because the caller rotates to a fresh proxy anyway.
+    """
+
+    def __init__(self, budget=None, label=""):
+        self.budget = budget
+        self.label = label
+        self.limits = {
+            PROXY_ERROR: RETRY_PROXY_ERRORS,
+            BLOCKED: RETRY_BLOCKS,
+            EMPTY: RETRY_EMPTY,
+            OTHER: RETRY_OTHER,
+        }
+        self.counts = {kind: 0 for kind in self.limits}
+        self.attempt = 1
+
+    def failed(self, kind, retry_after=None):
+        """Record a failure; returns the delay before the next try or raises RetryExhausted"""
+        self.counts[kind] += 1
+        if self.counts[kind] > self.limits[kind]:
+            raise RetryExhausted(f"Failed after {self.attempt} attempts ({kind}){self.label}", kind)
+        if self.budget is not None and not self.budget.spend():
+            raise RetryExhausted(f"Job retry budget exhausted after {self.attempt} attempts{self.label}", kind)
+
+        if retry_after is not None:
+            delay = retry_after
+        elif kind == PROXY_ERROR:
+            delay = random.uniform(0, RETRY_BASE_DELAY)
+        else:
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** self.attempt))
+        self.attempt += 1
+        return delay
+
+
+# Step of retry_steps asking for the request to be sent
+SEND = "send"
+
+
+def retry_steps(url, parse=None, budget=None, rotate_proxy=None, classify_error=None):
+    """
+    The retry policy for one request, independent of how it is sent
+    (shared by retry_request and async_engine.AsyncEngine.request).
+
+    A generator: it yields SEND and must be sent back (response, None)
+    or (None, exception); it yields a wait in seconds before the next
+    try; it returns the result (see retry_request) or raises
+    RetryExhausted. Drive it with run_retry / run_retry_async.
+    rotate_proxy() is called on proxy errors and IP blocks;
+    classify_error(exc) overrides classify_exception.
+    """
+    state = RetryState(budget)
+    classify_error = classify_error or classify_exception
+    parsed = None
+    while True:
+        retry_after = None
+        r, exc = yield SEND
+        if exc is None:
+            if r.status_code == 200:
+                if parse is None:
+                    return r
+                try:
+                    parsed = parse(r.content)
+                except ValueError:  # not JSON (or cut off)
+                    parsed = None
+                if parsed:
+                    return parsed
+                if is_ip_blocked(response_text=r.text):
+                    # Checkpoint / login wall served with HTTP 200
+                    kind = BLOCKED
+                    print(f"  🛑 Attempt {state.attempt}: Facebook served a checkpoint page — rotating static proxy...")
+                else:
+                    kind = EMPTY
+                    print(f"  ⚠️ Attempt {state.attempt}: Empty response")
+            else:
+                kind = classify_response(r, url)
+                retry_after = retry_after_seconds(r)
+                if kind == PROXY_ERROR:
+                    print(f"  🚫 Attempt {state.attempt}: Proxy auth failed (HTTP {r.status_code}) — rotating static proxy...")
+                elif kind == BLOCKED:
+                    print(f"  🛑 Attempt {state.attempt}: Facebook blocked this IP (HTTP {r.status_code}) — rotating static proxy...")
+                else:
+                    print(f"  ⚠️ Attempt {state.attempt}: Status {r.status_code}")
+        else:
+            kind = classify_error(exc)
+            if kind == PROXY_ERROR:
+                print(f"  🚫 Attempt {state.attempt}: Proxy connection error — rotating static proxy...")
+            else:
+                print(f"  ⚠️ Attempt {state.attempt}: {str(exc)}")
+
+        if kind in (PROXY_ERROR, BLOCKED) and rotate_proxy:
+            rotate_proxy()
+
+        try:
+            wait_time = state.failed(kind, retry_after)
+        except RetryExhausted as e:
+            if kind == EMPTY:
+                print(f"  ❌ {e}")
+                return parsed
+            raise
+        print(f"  ⏳ Retrying in {wait_time:.1f} seconds...")
+        yield wait_time
+
+
+def run_retry(steps, send, sleep=time.sleep):
+    """Drive retry_steps with a blocking send() and sleep(seconds)"""
+    try:
+        step = next(steps)
+        while True:
+            if step == SEND:
+                try:
+                    reply = (send(), None)
+                except Exception as e:
+                    reply = (None, e)
+            else:
+                sleep(step)
+                reply = None
+            step = steps.send(reply)
+    except StopIteration as done:
+        return done.value
+
+
+async def run_retry_async(steps, send, sleep=asyncio.sleep):
+    """run_retry for a coroutine send() and sleep(seconds)"""
+    try:
+        step = next(steps)
+        while True:
+            if step == SEND:
+                try:
+                    reply = (await send(), None)
+                except Exception as e:
+                    reply = (None, e)
+            else:
+                await sleep(step)
+                reply = None
+            step = steps.send(reply)
+    except StopIteration as done:
+        return done.value
+
+
+def retry_request(url, headers, data, ctx, parse=None, method="POST", stream=False):
+    """
+    Send a request through ctx with the shared retry policy.
+
+    Rotates ctx's proxy (only) on proxy errors and IP blocks. Without
+    parse the 200 response is returned. With parse, parse(r.content) is
+    returned; a 200 checkpoint page counts as a block, and an empty or
+    unparsable result is retried on its own (small) budget; if it is
+    still empty after that, the empty result (None if unparsable) is
+    returned.
+    stream=True returns the 200 response before its body is read.
+    """
+    send = ctx.post if method == "POST" else ctx.get
+    kwargs = {"headers": headers}
+    if data is not None:
+        kwargs["data"] = data
+    if stream:
+        kwargs["stream"] = True
+    steps = retry_steps(url, parse, getattr(ctx, "retry_budget", None), ctx.rotate_proxy)
+    return run_retry(steps, lambda: send(url, **kwargs))
+
+
+def retry_stream(url, headers, data, ctx, parse_stream):
+    """
+    Like retry_request(parse=...) for streamed responses: yields the items
+    of parse_stream(r.iter_lines()) as they arrive. A response that yields
+    nothing is retried on the empty budget. A failure part-way through the
+    body (cut-off chunk, reset connection) is retried like any other
+    error: the same request is sent again and the items already yielded
+    are skipped, so the caller sees each item once as long as the server
+    answers the same way (callers should still dedupe, e.g. by post_id).
+    It is raised only once the retries are used up.
+    """
+    state = RetryState(getattr(ctx, "retry_budget", None))
+    yielded = 0
+    while True:
+        r = retry_request(url, headers, data, ctx, stream=True)
+        received = 0
+        try:
+            with r:
+                for item in parse_stream(r.iter_lines()):
+                    received += 1
+                    if received <= yielded:
+                        continue  # already handed out before the failed attempt
+                    yielded += 1
+                    yield item
+            if yielded:
+                return
+            kind = EMPTY
+            print(f"  ⚠️ Attempt {state.attempt}: Empty response")
+        except Exception as e:
+            kind = classify_exception(e)
+            where = f" after {yielded} items" if yielded else ""
+            print(f"  ⚠️ Attempt {state.attempt}: Stream failed{where}: {str(e)}")
+
+        try:
+            wait_time = state.failed(kind)
+        except RetryExhausted as e:
+            if kind == EMPTY:
+                print(f"  ❌ {e}")
+                return
+            raise
+        print(f"  ⏳ Retrying in {wait_time:.1f} seconds...")
+        time.sleep(wait_time)
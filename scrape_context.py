@@ -0,0 +1,93 @@
+from contextlib import nullcontext
+
+import http_session
+import proxy_pool
+from proxy_utils import rotate_static_proxy
+from retry_policy import RetryBudget
+
+
+def sanitize_folder_name(name):
+    """Turn a page/group name into a safe folder name ("Unknown" if empty)"""
+    if not name:
+        return "Unknown"
+    return "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip() or "Unknown"
+
+
+class ScrapeContext:
+    """
+    Everything one scrape job needs: target id, session credentials,
+    current proxy and the cached page/group name.
+
+    Passing a context through the fetch functions (instead of mutating
+    module globals) lets several pages or groups be crawled at the same
+    time in one process, each with its own cookies and proxy.
+    """
+
+    def __init__(self, target_id=None, cookies=None, fb_dtsg="", proxies=None, name=None,
+                 scheduler=None, retry_budget=None):
+        self.target_id = target_id
+        self.cookies = cookies or {}
+        self.fb_dtsg = fb_dtsg or ""
+        self.proxies = proxies
+        self.name = name
+        # Optional multi_target.FairScheduler shared by concurrently crawled targets
+        self.scheduler = scheduler
+        # Retries left for the whole job (see retry_policy.JOB_RETRY_BUDGET)
+        self.retry_budget = retry_budget or RetryBudget()
+
+    @property
+    def user_id(self):
+        return self.cookies.get("c_user", "0")
+
+    @property
+    def name_folder(self):
+        return sanitize_folder_name(self.name)
+
+    @property
+    def session(self):
+        return http_session.get_session(self.proxies, self.cookies)
+
+    def rotate_proxy(self):
+        """Move this job (only) to a fresh static proxy port"""
+        new_p = rotate_static_proxy(self.proxies)
+        if new_p:
+            self.proxies = new_p
+        return new_p
+
+    def _slot(self):
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(self.target_id)
+
+    def request_proxies(self):
+        """
+        Proxy for the next request. Logged-in jobs keep one IP until
+        rotate_proxy(); logged-out jobs take the healthiest PROXY_POOL
+        endpoint per request when several are configured.
+        """
+        if proxy_pool.pool.per_request and not self.cookies.get("c_user"):
+            proxy_url = proxy_pool.pool.best()
+            if proxy_url:
+                return {'http': proxy_url, 'https': proxy_url}
+        return self.proxies
+
+    def post(self, url, **kwargs):
+        with self._slot():
+            return http_session.post(url, proxies=self.request_proxies(), cookies=self.cookies, **kwargs)
+
+    def get(self, url, **kwargs):
+        with self._slot():
+            return http_session.get(url, proxies=self.request_proxies(), cookies=self.cookies, **kwargs)
+
+    def copy(self, **overrides):
+        """New context sharing credentials/proxy, e.g. for another target"""
+        values = {
+            "target_id": self.target_id,
+            "cookies": self.cookies,
+            "fb_dtsg": self.fb_dtsg,
+            "proxies": self.proxies,
+            "name": self.name,
+            "scheduler": self.scheduler,
+        }
+        values.update(overrides)
+        return ScrapeContext(**values)
@@ -1,8 +1,9 @@
-import requests
 import json
 import os
 import uuid
-import time
+from fb_parser import parse_fb_response as process_raw_graphql
+from retry_policy import retry_request, RetryExhausted
+from scrape_context import ScrapeContext
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,11 +29,16 @@ HEADERS = {
     "x-fb-friendly-name": "CometPhotoRootContentQuery"}
 
 
+def default_context(cookies=None):
+    """Build a ScrapeContext from this module's globals (legacy callers)"""
+    return ScrapeContext(cookies=cookies, fb_dtsg=FB_DTSG, proxies=PROXIES)
+
+
 # ======================================
 # BUILD PAYLOAD
 # ======================================
 
-def build_payload(node_id, post_id, cookies=None):
+def build_payload(node_id, post_id, cookies=None, fb_dtsg=None):
     # Extract user ID from cookies if available
     user_id = "0"
     if cookies and "c_user" in cookies:
@@ -56,121 +62,57 @@ def build_payload(node_id, post_id, cookies=None):
         "av": user_id,
         "__user": user_id,
         "__a": "1",
-        "fb_dtsg": FB_DTSG if FB_DTSG else "",
+        "fb_dtsg": fb_dtsg if fb_dtsg is not None else FB_DTSG,
          "doc_id": DOC_ID,
         "variables": json.dumps(variables)
     }
 
 
-# ======================================
-# RAW CLEANING FUNCTIONS (MERGED)
-# ======================================
-
-def extract_data_blocks(raw_text):
-    blocks = []
-    i = 0
-    n = len(raw_text)
-
-    while True:
-        idx = raw_text.find('"data"', i)
-        if idx == -1:
-            break
-
-        brace_start = raw_text.find('{', idx)
-        if brace_start == -1:
-            break
-
-        depth = 0
-        for j in range(brace_start, n):
-            if raw_text[j] == '{':
-                depth += 1
-            elif raw_text[j] == '}':
-                depth -= 1
-                if depth == 0:
-                    block_text = raw_text[brace_start:j+1]
-                    try:
-                        block = json.loads(block_text)
-                        blocks.append(block)
-                    except:
-                        pass
-                    i = j + 1
-                    break
-        else:
-            break
-
-    return blocks
-
-
-def clean_data_blocks(blocks):
-    cleaned = []
-    for block in blocks:
-        if not isinstance(block, dict):
-            continue
-        block.pop("errors", None)
-        block.pop("extensions", None)
-        cleaned.append(block)
-    return cleaned
-
-
-def process_raw_graphql(raw_text):
-
-    extracted = extract_data_blocks(raw_text)
-    cleaned = clean_data_blocks(extracted)
-    return cleaned
-
-
 # ======================================
 # DOWNLOAD IMAGE WITH RETRY
 # ======================================
 
-def download_image(url, folder, post_id, image_index=1, max_retries=3):
+def download_image(url, folder, post_id, image_index=1, ctx=None):
     """Download image with retry logic and proxy support as {post_id}.jpg or {post_id}_2.jpg"""
+    ctx = ctx or default_context()
     os.makedirs(folder, exist_ok=True)
     
     filename = f"{post_id}.jpg" if image_index == 1 else f"{post_id}_{image_index}.jpg"
     path = os.path.join(folder, filename)
     
-    for attempt in range(1, max_retries + 1):
-        try:
-            r = requests.get(url, proxies=PROXIES, timeout=30)
-            r.raise_for_status()
-            
-            with open(path, "wb") as f:
-                f.write(r.content)
-            
-            print(f"📥 Saved {filename}")
-            return filename
-        except Exception as e:
-            print(f"  ⚠️ Download attempt {attempt}/{max_retries} failed: {e}")
-            if attempt < max_retries:
-                wait_time = attempt * 2  # Exponential backoff: 2, 4, 6 seconds
-                print(f"  ⏳ Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                print(f"  ❌ Failed to download after {max_retries} attempts")
-                return None
+    try:
+        r = retry_request(url, None, None, ctx, method="GET")
+    except RetryExhausted as e:
+        print(f"  ❌ Failed to download: {e}")
+        return None
+    
+    with open(path, "wb") as f:
+        f.write(r.content)
     
-    return None
+    print(f"📥 Saved {filename}")
+    return filename
 
 
 # ======================================
 # FETCH ALL IMAGES LOOP
 # ======================================
 
-def fetch_all_images(start_node_id, post_id):
+def fetch_all_images(start_node_id, post_id, ctx=None):
 
+    ctx = ctx or default_context()
     current_node = start_node_id
     visited = set()
     folder = f"album_{post_id}"
+    image_index = 0
 
     while current_node and current_node not in visited:
 
         print(f"\n➡ Fetching node: {current_node}")
         visited.add(current_node)
 
-        payload = build_payload(current_node, post_id)
+        payload = build_payload(current_node, post_id, ctx.cookies, ctx.fb_dtsg)
 
-        r = requests.post(GRAPHQL_URL, headers=HEADERS, data=payload, proxies=PROXIES)
+        r = ctx.post(GRAPHQL_URL, headers=HEADERS, data=payload)
 
         # Save RAW response
         os.makedirs("photo_raw", exist_ok=True)
@@ -181,7 +123,7 @@ def fetch_all_images(start_node_id, post_id):
         print(f"💾 Raw saved → {raw_path}")
 
         # Clean using your parser
-        cleaned_blocks = process_raw_graphql(r.text)
+        cleaned_blocks = process_raw_graphql(r.content)
 
         if not cleaned_blocks:
             print("❌ No cleaned data found")
@@ -203,7 +145,8 @@ def fetch_all_images(start_node_id, post_id):
                 break
 
         if image_url:
-            download_image(image_url, folder)
+            image_index += 1
+            download_image(image_url, folder, post_id, image_index, ctx=ctx)
         else:
             print("❌ No image found")
 
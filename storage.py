@@ -0,0 +1,508 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+from post_writer import (open_writer, is_saved, save_post_header as save_file_header,
+                         clean_comment, post_folder)
+
+load_dotenv()
+
+# Where scraped posts go: "files" (JSON / JSONL tree, see post_writer) or "sqlite"
+STORAGE = os.getenv('STORAGE', 'files').strip().lower()
+# Database file for STORAGE=sqlite
+STORAGE_PATH = os.getenv('STORAGE_PATH', 'scraped.db')
+# Comment / reply rows written per transaction
+STORAGE_BATCH_SIZE = int(os.getenv('STORAGE_BATCH_SIZE', '500'))
+# Posts saved in a {post_type}/{name}/ folder, one "post_id comment_count"
+# line each (the count may be missing); a later line for an id wins
+SCRAPED_MANIFEST = '.scraped'
+# Feed high-water marks of every target of a post type, in {post_type}/
+WATERMARKS_FILE = '.watermarks.json'
+
+
+class ScrapedIndex:
+    """
+    Ids of the posts already saved for one target, with the comment
+    count each was saved with (None if not known), held in a dict.
+
+    With a manifest path, every added or changed entry is also appended
+    to that file so the next run can load the index with one read.
+    """
+
+    def __init__(self, counts=None, manifest=None):
+        self.counts = dict(counts or {})
+        self.manifest = manifest
+        self._lock = threading.Lock()
+
+    def __contains__(self, post_id):
+        return str(post_id) in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def comment_count(self, post_id):
+        """Comment count the post was saved with, or None"""
+        return self.counts.get(str(post_id))
+
+    def add(self, post_id, comment_count=None):
+        post_id = str(post_id)
+        with self._lock:
+            if post_id in self.counts and comment_count in (None, self.counts[post_id]):
+                return
+            self.counts[post_id] = comment_count
+            if self.manifest:
+                with open(self.manifest, "a", encoding="utf-8") as f:
+                    f.write(_manifest_line(post_id, comment_count))
+
+    def write_manifest(self):
+        """Rewrite the manifest with the current entries (drops duplicates and stale lines)"""
+        tmp_path = self.manifest + ".tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(_manifest_line(post_id, self.counts[post_id]) for post_id in sorted(self.counts))
+            os.replace(tmp_path, self.manifest)
+
+
+def _manifest_line(post_id, comment_count):
+    return f"{post_id} {comment_count}\n" if comment_count is not None else f"{post_id}\n"
+
+
+def _read_manifest(path):
+    """({post_id: comment_count or None}, number of lines) of a manifest"""
+    listed = {}
+    lines = 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                lines += 1
+                count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+                listed[parts[0]] = count if count is not None else listed.get(parts[0])
+    except FileNotFoundError:
+        pass
+    return listed, lines
+
+
+class FileStorage:
+    """Posts as files under {post_type}/{name}/{post_id}/ (the original layout)"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def scraped_index(self, post_type, name_folder):
+        """ScrapedIndex of {post_type}/{name_folder}/, loaded on first use"""
+        # Keyed by absolute path: the output tree is relative to the working
+        # directory, which may change between crawls of one process
+        folder = os.path.abspath(os.path.join(post_type, name_folder))
+        with self._lock:
+            if folder not in self._indexes:
+                self._indexes[folder] = self._load_index(folder)
+            return self._indexes[folder]
+
+    def _load_index(self, folder):
+        """
+        Index of the post folders in folder. Folders listed in the manifest
+        are taken as saved; any others (e.g. saved before the manifest
+        existed) are checked once and the manifest is rewritten to match.
+        """
+        manifest = os.path.join(folder, SCRAPED_MANIFEST)
+        try:
+            entries = [e.name for e in os.scandir(folder) if e.is_dir()]
+        except FileNotFoundError:
+            return ScrapedIndex(manifest=manifest)
+        listed, lines = _read_manifest(manifest)
+        counts = {name: listed.get(name) for name in entries
+                  if name in listed or is_saved(os.path.join(folder, name), name)}
+        index = ScrapedIndex(counts, manifest)
+        if counts.keys() != listed.keys() or lines != len(listed):
+            index.write_manifest()
+        return index
+
+    def _mark_saved(self, post_type, post_id, post_data):
+        if post_type == "simple_post":
+            return
+        folder = os.path.dirname(post_folder(post_type, post_id, post_data))
+        name_folder = os.path.basename(folder)
+        self.scraped_index(post_type, name_folder).add(post_id, (post_data or {}).get("comment_count"))
+
+    def saved_comment_count(self, post_type, name_folder, post_id):
+        """
+        Comment count a saved post was stored with, from the scraped index.
+        Posts indexed before counts were kept are read once and the count
+        is added to the manifest.
+        """
+        index = self.scraped_index(post_type, name_folder)
+        count = index.comment_count(post_id)
+        if count is None and post_id in index:
+            count = (self.load_post(post_type, name_folder, post_id, comments=False) or {}).get("comment_count")
+            if count is not None:
+                index.add(post_id, count)
+        return count
+
+    def get_watermark(self, post_type, target_id):
+        """High-water mark of a target's feed ({post_id, creation_time, updated_at}) or None"""
+        return self._read_watermarks(post_type).get(str(target_id))
+
+    def save_watermark(self, post_type, target_id, mark):
+        with self._lock:
+            marks = self._read_watermarks(post_type)
+            marks[str(target_id)] = mark
+            os.makedirs(post_type, exist_ok=True)
+            path = os.path.join(post_type, WATERMARKS_FILE)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(marks, f, ensure_ascii=False, indent=2)
+            os.replace(path + ".tmp", path)
+
+    def _read_watermarks(self, post_type):
+        try:
+            with open(os.path.join(post_type, WATERMARKS_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def load_post(self, post_type, name_folder, post_id, comments=True):
+        """
+        A saved post as written (post fields plus, with comments, its
+        "comments" list) or None. name_folder is ignored for simple posts.
+        """
+        post_id = str(post_id)
+        if post_type == "simple_post":
+            folder = os.path.join(post_type, post_id)
+        else:
+            folder = os.path.join(post_type, name_folder, post_id)
+        path = os.path.join(folder, f"{post_id}.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                post = json.load(f)
+            if not comments:
+                post.pop("comments", None)
+            return post
+        return self._load_jsonl_post(folder, post_id, comments)
+
+    def _load_jsonl_post(self, folder, post_id, comments):
+        try:
+            with open(os.path.join(folder, f"{post_id}.post.json"), encoding="utf-8") as f:
+                post = json.load(f)
+        except FileNotFoundError:
+            return None
+        comments_file = post.pop("comments_file", None)
+        post.pop("comments_saved", None)
+        post.pop("complete", None)
+        if not comments:
+            return post
+        post["comments"] = []
+        try:
+            with open(os.path.join(folder, comments_file or f"{post_id}.comments.jsonl"), encoding="utf-8") as f:
+                for line in f:
+                    item = json.loads(line)
+                    kind = item.pop("type")
+                    if kind == "comment":
+                        item.pop("index", None)
+                        item["replies"] = []
+                        post["comments"].append(item)
+                    elif post["comments"]:
+                        item.pop("comment", None)
+                        post["comments"][-1]["replies"].append(item)
+        except FileNotFoundError:
+            pass
+        return post
+
+    def post_exists(self, post_type, name_folder, post_id):
+        if post_type == "simple_post":
+            return is_saved(os.path.join(post_type, str(post_id)), post_id)
+        return post_id in self.scraped_index(post_type, name_folder)
+
+    def save_post_header(self, post_type, post_id, post_data, target_id=None):
+        """Save a post before its comments are fetched; returns where it went"""
+        path = save_file_header(post_type, post_id, post_data)
+        self._mark_saved(post_type, post_id, post_data)
+        return path
+
+    def open_post(self, post_type, post_id, post_data, target_id=None):
+        """Writer taking the post's comments one by one (add_comment / close)"""
+        writer = open_writer(post_type, post_id, post_data)
+        writer.on_close = lambda path: self._mark_saved(post_type, post_id, writer.post_data)
+        return writer
+
+    def close(self):
+        pass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_type      TEXT NOT NULL,
+    post_id        TEXT NOT NULL,
+    target_id      TEXT,
+    target_name    TEXT,
+    feedback_id    TEXT,
+    text           TEXT,
+    permalink      TEXT,
+    comment_count  INTEGER,
+    comments_saved INTEGER NOT NULL DEFAULT 0,
+    complete       INTEGER NOT NULL DEFAULT 0,
+    data           TEXT,
+    scraped_at     REAL,
+    PRIMARY KEY (post_type, post_id)
+);
+CREATE INDEX IF NOT EXISTS posts_post_id ON posts (post_id);
+CREATE INDEX IF NOT EXISTS posts_target ON posts (target_id);
+CREATE INDEX IF NOT EXISTS posts_feedback ON posts (feedback_id);
+
+CREATE TABLE IF NOT EXISTS comments (
+    post_type      TEXT NOT NULL,
+    post_id        TEXT NOT NULL,
+    idx            INTEGER NOT NULL,
+    feedback_id    TEXT,
+    text           TEXT,
+    reaction_count TEXT,
+    data           TEXT,
+    PRIMARY KEY (post_type, post_id, idx)
+);
+CREATE INDEX IF NOT EXISTS comments_post_id ON comments (post_id);
+CREATE INDEX IF NOT EXISTS comments_feedback ON comments (feedback_id);
+
+CREATE TABLE IF NOT EXISTS replies (
+    post_type      TEXT NOT NULL,
+    post_id        TEXT NOT NULL,
+    comment_idx    INTEGER NOT NULL,
+    idx            INTEGER NOT NULL,
+    text           TEXT,
+    reaction_count TEXT,
+    data           TEXT,
+    PRIMARY KEY (post_type, post_id, comment_idx, idx)
+);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    post_type     TEXT NOT NULL,
+    target_id     TEXT NOT NULL,
+    post_id       TEXT,
+    creation_time INTEGER,
+    updated_at    REAL,
+    PRIMARY KEY (post_type, target_id)
+);
+
+CREATE TABLE IF NOT EXISTS media (
+    post_type TEXT NOT NULL,
+    post_id   TEXT NOT NULL,
+    idx       INTEGER NOT NULL,
+    type      TEXT,
+    url       TEXT,
+    saved_as  TEXT,
+    PRIMARY KEY (post_type, post_id, idx)
+);
+"""
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SqlitePostWriter:
+    """
+    Comments of one post into SqliteStorage. Rows are buffered and
+    written STORAGE_BATCH_SIZE at a time, each batch in one transaction;
+    close() writes the rest and marks the post complete.
+    """
+
+    def __init__(self, storage, post_type, post_id, post_data, target_id=None):
+        self.storage = storage
+        self.post_type = post_type
+        self.post_id = str(post_id)
+        self.post_data = post_data
+        self.target_id = target_id
+        self.count = 0
+        self.path = f"{storage.path}:{post_type}/{self.post_id}"
+        self._comments = []
+        self._replies = []
+        # A re-scrape replaces the post's comments
+        storage._write_post(post_type, self.post_id, post_data, target_id, replace_comments=True)
+
+    def add_comment(self, comment):
+        fields = clean_comment(comment)
+        replies = fields.pop("replies", None) or []
+        self._comments.append((self.post_type, self.post_id, self.count, comment.get("_feedback_id"),
+                               fields.get("text"), fields.get("reaction_count"), _json(fields)))
+        self._replies.extend(
+            (self.post_type, self.post_id, self.count, i, r.get("text"), r.get("reaction_count"), _json(r))
+            for i, r in enumerate(replies))
+        self.count += 1
+        if len(self._comments) + len(self._replies) >= STORAGE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._comments or self._replies:
+            self.storage._write_comments(self._comments, self._replies)
+            self._comments, self._replies = [], []
+
+    def close(self, post_data=None, complete=True):
+        if post_data is not None:
+            self.post_data = post_data
+        self.flush()
+        self.storage._write_post(self.post_type, self.post_id, self.post_data, self.target_id,
+                                 comments_saved=self.count, complete=complete)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(complete=exc_type is None)
+        print(f"  💾 Saved to {self.path} ({self.count} comments)")
+
+
+class SqliteStorage:
+    """
+    Posts, comments, replies and media rows in one SQLite database.
+
+    The database runs in WAL mode so it can be queried while a crawl is
+    writing to it. One connection is shared by all crawl threads; every
+    write takes the lock and runs as a single transaction.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or STORAGE_PATH
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def scraped_index(self, post_type, name_folder=None):
+        """ScrapedIndex of every saved post of post_type, loaded on first use"""
+        with self._lock:
+            if post_type not in self._indexes:
+                rows = self._conn.execute("SELECT post_id, comment_count FROM posts WHERE post_type = ?",
+                                          (post_type,))
+                self._indexes[post_type] = ScrapedIndex(dict(rows))
+            return self._indexes[post_type]
+
+    def post_exists(self, post_type, name_folder, post_id):
+        return post_id in self.scraped_index(post_type)
+
+    def saved_comment_count(self, post_type, name_folder, post_id):
+        """Comment count a saved post was stored with (posts.comment_count), or None"""
+        return self.scraped_index(post_type).comment_count(post_id)
+
+    def load_post(self, post_type, name_folder, post_id, comments=True):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM posts WHERE post_type = ? AND post_id = ?",
+                                     (post_type, str(post_id))).fetchone()
+        if row is None:
+            return None
+        post = json.loads(row[0])
+        if comments:
+            post["comments"] = list(self.iter_comments(post_id, post_type))
+        return post
+
+    def get_watermark(self, post_type, target_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT post_id, creation_time, updated_at FROM watermarks WHERE post_type = ? AND target_id = ?",
+                (post_type, str(target_id))).fetchone()
+        return dict(zip(("post_id", "creation_time", "updated_at"), row)) if row else None
+
+    def save_watermark(self, post_type, target_id, mark):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (post_type, target_id, post_id, creation_time, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (post_type, str(target_id), mark.get("post_id"), mark.get("creation_time"), mark.get("updated_at")))
+
+    def save_post_header(self, post_type, post_id, post_data, target_id=None):
+        self._write_post(post_type, str(post_id), post_data, target_id)
+        return f"{self.path}:{post_type}/{post_id}"
+
+    def open_post(self, post_type, post_id, post_data, target_id=None):
+        return SqlitePostWriter(self, post_type, post_id, post_data, target_id)
+
+    def _write_post(self, post_type, post_id, post_data, target_id=None, comments_saved=0,
+                    complete=False, replace_comments=False):
+        post_data = {k: v for k, v in (post_data or {}).items() if k != "comments"}
+        media = post_data.get("media") or []
+        row = (post_type, post_id, target_id,
+               post_data.get("page_name") or post_data.get("group_name"),
+               post_data.get("feedback_id"), post_data.get("text"), post_data.get("permalink"),
+               post_data.get("comment_count"), comments_saved, int(complete), _json(post_data), time.time())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO posts (post_type, post_id, target_id, target_name, feedback_id, text, permalink, "
+                "comment_count, comments_saved, complete, data, scraped_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (post_type, post_id) DO UPDATE SET "
+                "target_id = COALESCE(excluded.target_id, target_id), target_name = excluded.target_name, "
+                "feedback_id = excluded.feedback_id, text = excluded.text, permalink = excluded.permalink, "
+                "comment_count = excluded.comment_count, comments_saved = excluded.comments_saved, "
+                "complete = excluded.complete, data = excluded.data, scraped_at = excluded.scraped_at",
+                row)
+            self._conn.execute("DELETE FROM media WHERE post_type = ? AND post_id = ?", (post_type, post_id))
+            self._conn.executemany(
+                "INSERT INTO media (post_type, post_id, idx, type, url, saved_as) VALUES (?, ?, ?, ?, ?, ?)",
+                [(post_type, post_id, i, m.get("type"), m.get("url"), m.get("saved_as"))
+                 for i, m in enumerate(media) if isinstance(m, dict)])
+            if replace_comments:
+                for table in ("comments", "replies"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE post_type = ? AND post_id = ?",
+                                       (post_type, post_id))
+        if post_type in self._indexes:
+            self._indexes[post_type].add(post_id, post_data.get("comment_count"))
+
+    def _write_comments(self, comments, replies):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO comments (post_type, post_id, idx, feedback_id, text, reaction_count, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", comments)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO replies (post_type, post_id, comment_idx, idx, text, reaction_count, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", replies)
+
+    def iter_comments(self, post_id, post_type=None):
+        """Saved comments of a post, in order, each with its replies"""
+        where = "post_id = ?" + (" AND post_type = ?" if post_type else "")
+        params = (str(post_id), post_type) if post_type else (str(post_id),)
+        with self._lock:
+            comments = self._conn.execute(
+                f"SELECT post_type, idx, data FROM comments WHERE {where} ORDER BY post_type, idx", params).fetchall()
+        for comment_type, idx, data in comments:
+            comment = json.loads(data)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT data FROM replies WHERE post_type = ? AND post_id = ? AND comment_idx = ? ORDER BY idx",
+                    (comment_type, str(post_id), idx)).fetchall()
+            comment["replies"] = [json.loads(r[0]) for r in rows]
+            yield comment
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The configured storage backend (STORAGE / STORAGE_PATH), opened on first use"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE == "sqlite":
+                _storage = SqliteStorage()
+            elif STORAGE == "files":
+                _storage = FileStorage()
+            else:
+                raise ValueError(f"Unknown STORAGE {STORAGE!r} (expected files or sqlite)")
+        return _storage
+
+
+def set_storage(storage):
+    """Use another backend (e.g. SqliteStorage(path)) for the rest of the process"""
+    global _storage
+    with _storage_lock:
+        _storage = storage
@@ -0,0 +1,81 @@
+import os
+import time
+from dotenv import load_dotenv
+
+from field_paths import CREATION_TIME_PATHS
+from storage import get_storage
+
+load_dotenv()
+
+# Incremental crawls: stop paginating a feed after this many consecutive
+# posts the last complete crawl already covered (0 = always crawl the whole feed)
+INCREMENTAL_STOP_AFTER = int(os.getenv('INCREMENTAL_STOP_AFTER', '0'))
+
+
+def extract_creation_time(node):
+    """Creation time of a Story node (paths declared in field_paths.CREATION_TIME_PATHS)"""
+    return CREATION_TIME_PATHS.get(node)
+
+
+class FeedWatermark:
+    """
+    High-water mark of one target's feed, for incremental crawls.
+
+    The mark is the newest post (id and creation time) of the last crawl
+    that covered the feed from the top down to the previous mark, or to
+    the end of the feed. Posts at or below the mark were all seen then.
+    A post counts as covered when its creation time is not newer than
+    the mark's or, on feeds without creation times, when the mark post
+    has gone by and the post is already saved. After stop_after
+    consecutive covered posts the crawl stops paginating.
+
+    A crawl that stops on its post limit leaves the mark alone: the posts
+    between where it stopped and the old mark were never seen.
+    """
+
+    def __init__(self, post_type, target_id, stop_after=None):
+        self.post_type = post_type
+        self.target_id = target_id
+        self.stop_after = INCREMENTAL_STOP_AFTER if stop_after is None else stop_after
+        self.mark = get_storage().get_watermark(post_type, target_id) if self.stop_after > 0 else None
+        self.newest = None
+        self.covered_run = 0
+        self._mark_seen = False
+
+    @property
+    def enabled(self):
+        return self.stop_after > 0
+
+    def see(self, node, post_id, saved):
+        """
+        Record one feed post (saved: already scraped). Returns True once
+        stop_after covered posts in a row have been seen.
+        """
+        if not self.enabled:
+            return False
+        creation_time = extract_creation_time(node)
+        if self.newest is None or (creation_time or 0) > (self.newest["creation_time"] or 0):
+            self.newest = {"post_id": str(post_id), "creation_time": creation_time}
+        if self.mark is None:
+            return False
+
+        mark_time = self.mark.get("creation_time")
+        if str(post_id) == self.mark.get("post_id"):
+            self._mark_seen = True
+        if creation_time and mark_time:
+            covered = creation_time <= mark_time
+        else:
+            covered = self._mark_seen and saved
+        self.covered_run = self.covered_run + 1 if covered else 0
+        return self.covered_run >= self.stop_after
+
+    def close(self, complete):
+        """
+        Save the newest post seen as the new mark when the crawl reached
+        the old mark (or the end of the feed) without gaps
+        """
+        if not self.enabled or not complete or self.newest is None:
+            return
+        if self.mark and (self.newest["creation_time"] or 0) < (self.mark.get("creation_time") or 0):
+            return
+        get_storage().save_watermark(self.post_type, self.target_id, {**self.newest, "updated_at": time.time()})